@@ -2,17 +2,25 @@
 Analyse ROC pour déterminer le seuil optimal de détection critique
 """
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.metrics import roc_curve, auc, confusion_matrix, classification_report
-from model import AsthmaPredictor
-import pandas as pd
+from evaluation_bundle import load_or_score, critical_scores
+from threshold_eval import ThresholdCurve, bootstrap
+from generate_report import render_figure, roc_threshold_data
+
+MODEL_PATH = 'models/asthma_model.pkl'
+DATA_PATH = 'data/asthma_detection_final.csv'
+
+# Coût relatif d'un cas critique manqué par rapport à une fausse alerte
+COST_FALSE_NEGATIVE = 10.0
+
+# Rééchantillonnages du bootstrap (intervalles de confiance à 95%)
+N_BOOTSTRAP = 2000
 
 def find_optimal_threshold():
     """
     Trouve le seuil optimal en utilisant la courbe ROC
     
     Méthode:
-    1. Entraîner le modèle
+    1. Charger les probabilités du test set enregistrées à l'entraînement
     2. Calculer sensibilité/spécificité pour différents seuils
     3. Tracer la courbe ROC
     4. Choisir le seuil optimal (maximise sensibilité, faux positifs acceptables)
@@ -22,94 +30,67 @@ def find_optimal_threshold():
     print("ANALYSE ROC - DÉTERMINATION DU SEUIL OPTIMAL")
     print("="*70)
     
-    # 1. Charger le modèle entraîné
-    print("\n1️⃣ Chargement du modèle...")
-    predictor = AsthmaPredictor(model_path='models/asthma_model.pkl')
-    
-    # Charger les données
-    X, y = predictor.load_data('data/asthma_detection_final.csv')
-    
-    # Split train/test (même que l'entraînement)
-    from sklearn.model_selection import train_test_split
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-    
-    # Charger le modèle
-    predictor.load_model()
-    print(f"   ✅ Modèle chargé: {predictor.model_path}")
-    
-    # 2. Obtenir les probabilités pour la classe 3 (Élevé)
-    print("\n2️⃣ Calcul des probabilités...")
-    y_proba = predictor.model.predict_proba(X_test)
+    # 1. Charger l'évaluation enregistrée par l'entraînement (ni CSV, ni modèle)
+    print("\n1️⃣ Chargement de l'évaluation du modèle...")
+    header, arrays = load_or_score(MODEL_PATH, DATA_PATH)
+    y_test = np.asarray(arrays['y_test'])
     
-    # Probabilités pour chaque classe
-    proba_classe_1 = y_proba[:, 0]  # Faible
-    proba_classe_2 = y_proba[:, 1]  # Modéré
-    proba_classe_3 = y_proba[:, 2]  # Élevé
+    # 2. Probabilités pour la classe 3 (Élevé), calculées à l'entraînement
+    print("\n2️⃣ Probabilités du test set...")
+    proba_classe_3 = critical_scores(header, arrays)
     
-    print(f"   ✅ Probabilités calculées pour {len(X_test)} patients")
+    print(f"   ✅ Probabilités de {len(y_test)} patients (modèle {header['model_version']})")
     
     # 3. Analyse ROC pour la classe 3 (Élevé) - One-vs-Rest
     print("\n3️⃣ Analyse ROC pour la classe ÉLEVÉ (critique)...")
     
     # Transformer y_test en binaire: 1 si classe 3, 0 sinon
-    y_test_binary = (y_test == 3).astype(int)
+    y_test_binary = y_test == 3
     
-    # Calculer la courbe ROC
-    fpr, tpr, thresholds = roc_curve(y_test_binary, proba_classe_3)
-    roc_auc = auc(fpr, tpr)
+    # VP/FP/FN/VN de tous les seuils en un seul tri + somme cumulée
+    curve = ThresholdCurve(y_test_binary, proba_classe_3)
+    roc_auc = curve.auc()
     
-    print(f"   ✅ AUC (Area Under Curve): {roc_auc:.4f}")
+    print(f"   ✅ AUC (Area Under Curve): {roc_auc:.4f} ({len(curve) - 1} seuils distincts)")
     
     # 4. Trouver le seuil optimal
     print("\n4️⃣ Recherche du seuil optimal...")
     
     # Méthode 1: Indice de Youden (maximise sensibilité + spécificité)
-    youden_index = tpr - fpr
-    optimal_idx_youden = np.argmax(youden_index)
-    optimal_threshold_youden = thresholds[optimal_idx_youden]
+    youden = curve.youden()
+    optimal_threshold_youden = youden['threshold']
     
     print(f"\n   📊 Méthode 1 - Indice de Youden (équilibre sensibilité/spécificité):")
     print(f"      Seuil optimal: {optimal_threshold_youden:.4f}")
-    print(f"      Sensibilité (Recall): {tpr[optimal_idx_youden]:.4f}")
-    print(f"      Spécificité: {1 - fpr[optimal_idx_youden]:.4f}")
-    print(f"      Indice de Youden: {youden_index[optimal_idx_youden]:.4f}")
-    
-    # Méthode 2: Maximiser sensibilité avec faux positifs < 15%
-    print(f"\n   📊 Méthode 2 - Priorité MÉDICALE (sensibilité max, FPR < 15%):")
-    
-    # Trouver les seuils où FPR < 0.15 (moins de 15% de faux positifs)
-    medical_constraint = fpr < 0.15
-    if np.any(medical_constraint):
-        # Parmi ces seuils, choisir celui qui maximise la sensibilité
-        valid_indices = np.where(medical_constraint)[0]
-        optimal_idx_medical = valid_indices[np.argmax(tpr[medical_constraint])]
-        optimal_threshold_medical = thresholds[optimal_idx_medical]
-        
-        print(f"      Seuil optimal: {optimal_threshold_medical:.4f}")
-        print(f"      Sensibilité (Recall): {tpr[optimal_idx_medical]:.4f}")
-        print(f"      Spécificité: {1 - fpr[optimal_idx_medical]:.4f}")
-        print(f"      Taux de faux positifs: {fpr[optimal_idx_medical]:.4f}")
-    else:
-        print(f"      ⚠️ Aucun seuil ne satisfait FPR < 15%")
-        optimal_threshold_medical = optimal_threshold_youden
-    
-    # Méthode 3: Maximiser sensibilité avec faux positifs < 20%
-    print(f"\n   📊 Méthode 3 - Compromis (sensibilité max, FPR < 20%):")
-    
-    medical_constraint_20 = fpr < 0.20
-    if np.any(medical_constraint_20):
-        valid_indices = np.where(medical_constraint_20)[0]
-        optimal_idx_compromise = valid_indices[np.argmax(tpr[medical_constraint_20])]
-        optimal_threshold_compromise = thresholds[optimal_idx_compromise]
-        
-        print(f"      Seuil optimal: {optimal_threshold_compromise:.4f}")
-        print(f"      Sensibilité (Recall): {tpr[optimal_idx_compromise]:.4f}")
-        print(f"      Spécificité: {1 - fpr[optimal_idx_compromise]:.4f}")
-        print(f"      Taux de faux positifs: {fpr[optimal_idx_compromise]:.4f}")
-    else:
-        optimal_threshold_compromise = optimal_threshold_youden
+    print(f"      Sensibilité (Recall): {youden['sensitivity']:.4f}")
+    print(f"      Spécificité: {youden['specificity']:.4f}")
+    print(f"      Indice de Youden: {youden['youden']:.4f}")
+    
+    # Méthodes 2 et 3: sensibilité maximale sous contrainte de faux positifs
+    constrained = {}
+    for method, (title, max_fpr) in enumerate([("Priorité MÉDICALE", 0.15), ("Compromis", 0.20)], 2):
+        print(f"\n   📊 Méthode {method} - {title} (sensibilité max, FPR < {max_fpr:.0%}):")
+        best = curve.best_at_fpr(max_fpr)
+        if best is None:
+            print(f"      ⚠️ Aucun seuil ne satisfait FPR < {max_fpr:.0%}")
+            best = youden
+        else:
+            print(f"      Seuil optimal: {best['threshold']:.4f}")
+            print(f"      Sensibilité (Recall): {best['sensitivity']:.4f}")
+            print(f"      Spécificité: {best['specificity']:.4f}")
+            print(f"      Taux de faux positifs: {best['fpr']:.4f}")
+        constrained[max_fpr] = best
+    medical, compromise = constrained[0.15], constrained[0.20]
+    optimal_threshold_medical = medical['threshold']
+    optimal_threshold_compromise = compromise['threshold']
+    
+    # Méthode 4: coût minimal (un cas critique manqué coûte COST_FALSE_NEGATIVE fausses alertes)
+    cost = curve.min_cost(cost_fn=COST_FALSE_NEGATIVE)
+    print(f"\n   📊 Méthode 4 - Coût minimal (faux négatif = {COST_FALSE_NEGATIVE:.0f} x faux positif):")
+    print(f"      Seuil optimal: {cost['threshold']:.4f}")
+    print(f"      Sensibilité (Recall): {cost['sensitivity']:.4f}")
+    print(f"      Spécificité: {cost['specificity']:.4f}")
+    print(f"      Coût total: {cost['cost']:.0f} (FN={cost['fn']}, FP={cost['fp']})")
     
     # 5. Tester différents seuils
     print("\n5️⃣ Comparaison de différents seuils:")
@@ -126,24 +107,11 @@ def find_optimal_threshold():
     
     results = []
     for threshold in test_thresholds:
-        # Appliquer le seuil
-        y_pred_threshold = (proba_classe_3 >= threshold).astype(int)
-        
-        # Calculer les métriques
-        tn, fp, fn, tp = confusion_matrix(y_test_binary, y_pred_threshold).ravel()
-        sensitivity = tp / (tp + fn) if (tp + fn) > 0 else 0
-        specificity = tn / (tn + fp) if (tn + fp) > 0 else 0
-        fpr_rate = fp / (fp + tn) if (fp + tn) > 0 else 0
-        
-        results.append({
-            'threshold': threshold,
-            'sensitivity': sensitivity,
-            'specificity': specificity,
-            'fpr': fpr_rate,
-            'tp': tp,
-            'fp': fp,
-            'fn': fn
-        })
+        # Lecture directe dans la courbe (pas de matrice de confusion par seuil)
+        point = curve.at(threshold)
+        results.append({key: point[key] for key in ('threshold', 'sensitivity', 'specificity', 'fpr', 'tp', 'fp', 'fn')})
+        sensitivity, specificity, fpr_rate = point['sensitivity'], point['specificity'], point['fpr']
+        tp, fp, fn = point['tp'], point['fp'], point['fn']
         
         marker = ""
         if abs(threshold - optimal_threshold_youden) < 0.01:
@@ -157,55 +125,22 @@ def find_optimal_threshold():
         
         print(f"{threshold:.4f}    {sensitivity:.4f} ({sensitivity*100:5.1f}%)  {specificity:.4f} ({specificity*100:5.1f}%)  {fpr_rate:.4f}   {tp:4d}    {fp:4d}    {fn:4d}  {marker}")
     
-    # 6. Visualisation
+    # Intervalles de confiance bootstrap (tous les rééchantillonnages en un calcul matriciel)
+    print(f"\n   📏 Intervalles de confiance à 95% ({N_BOOTSTRAP} rééchantillonnages bootstrap):")
+    intervals = bootstrap(y_test_binary, proba_classe_3, thresholds=(optimal_threshold_youden, 0.65),
+                          n_resamples=N_BOOTSTRAP)
+    print(f"      AUC: [{intervals['auc'][0]:.4f}, {intervals['auc'][1]:.4f}]")
+    print(f"      Seuil de Youden: [{intervals['youden_threshold'][0]:.4f}, {intervals['youden_threshold'][1]:.4f}]")
+    for threshold in (optimal_threshold_youden, 0.65):
+        low, high = intervals[f'sensitivity@{threshold}']
+        print(f"      Sensibilité au seuil {threshold:.4f}: [{low:.4f}, {high:.4f}]")
+    
+    # 6. Visualisation (backend Agg, même rendu que generate_report.py)
     print("\n6️⃣ Génération de la courbe ROC...")
     
-    plt.figure(figsize=(12, 5))
-    
-    # Subplot 1: Courbe ROC
-    plt.subplot(1, 2, 1)
-    plt.plot(fpr, tpr, color='darkorange', lw=2, label=f'ROC curve (AUC = {roc_auc:.4f})')
-    plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--', label='Chance (AUC = 0.50)')
-    
-    # Marquer les seuils intéressants
-    plt.plot(fpr[optimal_idx_youden], tpr[optimal_idx_youden], 'ro', markersize=10, label=f'Youden ({optimal_threshold_youden:.3f})')
-    if optimal_threshold_medical != optimal_threshold_youden:
-        plt.plot(fpr[optimal_idx_medical], tpr[optimal_idx_medical], 'go', markersize=10, label=f'Médical ({optimal_threshold_medical:.3f})')
-    if optimal_threshold_compromise != optimal_threshold_youden:
-        plt.plot(fpr[optimal_idx_compromise], tpr[optimal_idx_compromise], 'bo', markersize=10, label=f'Compromis ({optimal_threshold_compromise:.3f})')
-    
-    # Marquer le seuil actuel (0.65)
-    idx_065 = np.argmin(np.abs(thresholds - 0.65))
-    plt.plot(fpr[idx_065], tpr[idx_065], 'ms', markersize=10, label=f'Actuel 0.65')
-    
-    plt.xlim([0.0, 1.0])
-    plt.ylim([0.0, 1.05])
-    plt.xlabel('Taux de Faux Positifs (1 - Spécificité)', fontsize=12)
-    plt.ylabel('Taux de Vrais Positifs (Sensibilité)', fontsize=12)
-    plt.title('Courbe ROC - Classe ÉLEVÉ', fontsize=14, fontweight='bold')
-    plt.legend(loc="lower right")
-    plt.grid(True, alpha=0.3)
-    
-    # Subplot 2: Sensibilité vs Seuil
-    plt.subplot(1, 2, 2)
-    plt.plot(thresholds, tpr, label='Sensibilité (Recall)', color='green', lw=2)
-    plt.plot(thresholds, 1 - fpr, label='Spécificité', color='blue', lw=2)
-    
-    plt.axvline(x=optimal_threshold_youden, color='red', linestyle='--', label=f'Youden: {optimal_threshold_youden:.3f}')
-    if optimal_threshold_medical != optimal_threshold_youden:
-        plt.axvline(x=optimal_threshold_medical, color='green', linestyle='--', label=f'Médical: {optimal_threshold_medical:.3f}')
-    plt.axvline(x=0.65, color='magenta', linestyle='--', label='Actuel: 0.65')
-    
-    plt.xlabel('Seuil de Probabilité', fontsize=12)
-    plt.ylabel('Score', fontsize=12)
-    plt.title('Sensibilité et Spécificité vs Seuil', fontsize=14, fontweight='bold')
-    plt.legend(loc="best")
-    plt.grid(True, alpha=0.3)
-    plt.xlim([0.3, 1.0])
-    
-    plt.tight_layout()
-    plt.savefig('visualizations/roc_analysis_threshold.png', dpi=300, bbox_inches='tight')
-    print(f"   ✅ Graphique sauvegardé: visualizations/roc_analysis_threshold.png")
+    current = curve.at(0.65)
+    filename, elapsed = render_figure('roc_analysis_threshold.png', roc_threshold_data(y_test_binary, proba_classe_3))
+    print(f"   ✅ Graphique sauvegardé: visualizations/{filename} ({elapsed:.2f} s)")
     
     # 7. Recommandation finale
     print("\n" + "="*70)
@@ -214,21 +149,20 @@ def find_optimal_threshold():
     
     print(f"\n🎯 Seuil optimal selon Youden: {optimal_threshold_youden:.4f}")
     print(f"   - Équilibre mathématique parfait sensibilité/spécificité")
-    print(f"   - Sensibilité: {tpr[optimal_idx_youden]:.4f} ({tpr[optimal_idx_youden]*100:.1f}%)")
-    print(f"   - Spécificité: {1-fpr[optimal_idx_youden]:.4f} ({(1-fpr[optimal_idx_youden])*100:.1f}%)")
+    print(f"   - Sensibilité: {youden['sensitivity']:.4f} ({youden['sensitivity']*100:.1f}%)")
+    print(f"   - Spécificité: {youden['specificity']:.4f} ({youden['specificity']*100:.1f}%)")
     
     if optimal_threshold_medical != optimal_threshold_youden:
         print(f"\n🏥 Seuil optimal MÉDICAL: {optimal_threshold_medical:.4f}")
         print(f"   - Maximise sensibilité avec FPR < 15%")
-        print(f"   - Sensibilité: {tpr[optimal_idx_medical]:.4f} ({tpr[optimal_idx_medical]*100:.1f}%)")
-        print(f"   - Taux faux positifs: {fpr[optimal_idx_medical]:.4f} ({fpr[optimal_idx_medical]*100:.1f}%)")
+        print(f"   - Sensibilité: {medical['sensitivity']:.4f} ({medical['sensitivity']*100:.1f}%)")
+        print(f"   - Taux faux positifs: {medical['fpr']:.4f} ({medical['fpr']*100:.1f}%)")
         print(f"   - ✅ RECOMMANDÉ pour application médicale")
     
     print(f"\n⚖️ Seuil actuel (0.65): ")
-    idx_065 = np.argmin(np.abs(thresholds - 0.65))
-    print(f"   - Sensibilité: {tpr[idx_065]:.4f} ({tpr[idx_065]*100:.1f}%)")
-    print(f"   - Spécificité: {1-fpr[idx_065]:.4f} ({(1-fpr[idx_065])*100:.1f}%)")
-    print(f"   - Taux faux positifs: {fpr[idx_065]:.4f} ({fpr[idx_065]*100:.1f}%)")
+    print(f"   - Sensibilité: {current['sensitivity']:.4f} ({current['sensitivity']*100:.1f}%)")
+    print(f"   - Spécificité: {current['specificity']:.4f} ({current['specificity']*100:.1f}%)")
+    print(f"   - Taux faux positifs: {current['fpr']:.4f} ({current['fpr']*100:.1f}%)")
     
     # Conclusion
     print("\n" + "="*70)
@@ -262,9 +196,11 @@ def find_optimal_threshold():
         'optimal_youden': optimal_threshold_youden,
         'optimal_medical': optimal_threshold_medical,
         'optimal_compromise': optimal_threshold_compromise,
+        'optimal_cost': cost['threshold'],
         'recommended': recommended_threshold,
         'current': 0.65,
         'roc_auc': roc_auc,
+        'confidence_intervals': intervals,
         'results': results
     }
 
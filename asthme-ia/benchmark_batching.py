@@ -0,0 +1,98 @@
+"""
+Benchmark du regroupement des prédictions concurrentes (micro-batching)
+
+Simule de nombreux clients concurrents qui envoient chacun une petite
+requête, et compare:
+- une prédiction par requête (predict dans un pool de threads, comme un
+  serveur synchrone multi-threads)
+- le regroupement par MicroBatcher (un predict_batch pour les requêtes
+  arrivées pendant max_wait)
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from model import AsthmaPredictor
+from micro_batcher import MicroBatcher
+
+N_CLIENTS = 200
+REQUESTS_PER_CLIENT = 20
+THREADS = 2
+
+PATIENT = {
+    'Tiredness': 1, 'Dry-Cough': 0, 'Difficulty-in-Breathing': 0,
+    'Sore-Throat': 1, 'Pains': 0, 'Nasal-Congestion': 1, 'Runny-Nose': 1,
+    'Age_0-9': 0, 'Age_10-19': 0, 'Age_20-24': 1, 'Age_25-59': 0, 'Age_60+': 0,
+    'Gender_Female': 1, 'Gender_Male': 0,
+    'Humidity': 55.0, 'Temperature': 36.8, 'PM25': 12.0, 'RespiratoryRate': 16.0
+}
+
+
+async def run_clients(call):
+    """
+    Lance N_CLIENTS clients concurrents qui enchaînent REQUESTS_PER_CLIENT appels
+
+    Returns:
+        (requêtes par seconde, latences en millisecondes)
+    """
+    latencies = []
+
+    async def client():
+        for _ in range(REQUESTS_PER_CLIENT):
+            start = time.perf_counter()
+            await call(dict(PATIENT))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(N_CLIENTS)))
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, np.array(latencies)
+
+
+async def benchmark_per_request(predictor):
+    """Une évaluation de la forêt par requête"""
+    executor = ThreadPoolExecutor(max_workers=THREADS)
+    loop = asyncio.get_running_loop()
+    try:
+        return await run_clients(lambda features: loop.run_in_executor(executor, predictor.predict, features))
+    finally:
+        executor.shutdown()
+
+
+async def benchmark_batched(predictor, max_wait):
+    """Requêtes regroupées par MicroBatcher"""
+    batcher = MicroBatcher(predictor.predict_batch, max_batch_size=256,
+                           max_wait=max_wait, max_concurrency=THREADS)
+    await batcher.start()
+    try:
+        result = await run_clients(batcher.predict)
+    finally:
+        await batcher.stop()
+    stats = batcher.stats()
+    print(f"   (batchs: {stats['batches']}, taille moyenne {stats['mean_batch_size']:.1f})")
+    return result
+
+
+def print_result(title, result):
+    """Affiche débit et latences"""
+    throughput, latencies = result
+    print(f"{title}: {throughput:8.0f} req/s | p50 {np.percentile(latencies, 50):6.1f} ms"
+          f" | p99 {np.percentile(latencies, 99):6.1f} ms")
+
+
+async def main():
+    predictor = AsthmaPredictor(model_path='models/asthma_model.pkl', high_risk_threshold=0.443)
+    predictor.warmup()
+
+    print(f"\n📊 {N_CLIENTS} clients x {REQUESTS_PER_CLIENT} requêtes, {THREADS} threads")
+    print_result("   Une prédiction par requête", await benchmark_per_request(predictor))
+    for max_wait_ms in (1, 5, 10):
+        print_result(f"   Micro-batching (max {max_wait_ms:>2} ms)",
+                     await benchmark_batched(predictor, max_wait_ms / 1000))
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("BENCHMARK DU MICRO-BATCHING DES PRÉDICTIONS")
+    print("="*70)
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Benchmark du débit d'ingestion des lectures capteurs (lectures/seconde)
+
+Compare l'envoi lecture par lecture (/api/sensors) à l'envoi groupé
+(/api/sensors/bulk) en JSON par lignes, JSON en colonnes et binaire.
+"""
+import contextlib
+import io
+import time
+import numpy as np
+import main
+from sensor_ingest import BINARY_RECORD
+
+N_READINGS = 2000
+BULK_SIZE = 500
+
+
+def make_readings(n, seed=0):
+    """Génère n lectures capteurs aléatoires réalistes"""
+    rng = np.random.default_rng(seed)
+    return {
+        'timestamp': time.time() + np.arange(n, dtype=np.float64),
+        'temperature': rng.uniform(18, 30, n).round(1),
+        'humidity': rng.uniform(30, 90, n).round(1),
+        'pm25': rng.uniform(0, 120, n).round(1),
+        'respiratory_rate': rng.uniform(12, 24, n).round(1),
+    }
+
+
+def measure(label, send, n_readings):
+    """Mesure et affiche le débit d'une fonction d'envoi"""
+    with contextlib.redirect_stdout(io.StringIO()):  # Ignorer les logs par requête
+        start = time.perf_counter()
+        send()
+        elapsed = time.perf_counter() - start
+    rate = n_readings / elapsed
+    print(f"   {label:<28} {elapsed * 1000:8.1f} ms   {rate:10.0f} lectures/s")
+    return rate
+
+
+def main_benchmark():
+    client = main.app.test_client()
+    data = make_readings(N_READINGS)
+    rows = [
+        {
+            'timestamp': float(data['timestamp'][i]),
+            'temperature': float(data['temperature'][i]),
+            'humidity': float(data['humidity'][i]),
+            'pm25': float(data['pm25'][i]),
+            'respiratoryRate': float(data['respiratory_rate'][i]),
+        }
+        for i in range(N_READINGS)
+    ]
+    batches = [slice(i, i + BULK_SIZE) for i in range(0, N_READINGS, BULK_SIZE)]
+    
+    def send_single():
+        for row in rows:
+            client.post('/api/sensors', json=dict(row, device_id='bench-single'))
+    
+    def send_bulk_rows():
+        for batch in batches:
+            client.post('/api/sensors/bulk', json={'device_id': 'bench-rows', 'readings': rows[batch]})
+    
+    def send_bulk_columns():
+        for batch in batches:
+            client.post('/api/sensors/bulk', json={
+                'device_id': 'bench-columns',
+                'columns': {
+                    'timestamp': data['timestamp'][batch].tolist(),
+                    'temperature': data['temperature'][batch].tolist(),
+                    'humidity': data['humidity'][batch].tolist(),
+                    'pm25': data['pm25'][batch].tolist(),
+                    'respiratoryRate': data['respiratory_rate'][batch].tolist(),
+                }
+            })
+    
+    records = np.zeros(N_READINGS, dtype=BINARY_RECORD)
+    for name in BINARY_RECORD.names:
+        records[name] = data[name]
+    
+    def send_bulk_binary():
+        for batch in batches:
+            client.post('/api/sensors/bulk?device_id=bench-binary', data=records[batch].tobytes(),
+                        content_type='application/octet-stream')
+    
+    print("="*70)
+    print(f"BENCHMARK INGESTION CAPTEURS ({N_READINGS} lectures, paquets de {BULK_SIZE})")
+    print("="*70)
+    reference = measure("Lecture par lecture", send_single, N_READINGS)
+    for label, send in [("Groupé JSON (lignes)", send_bulk_rows),
+                        ("Groupé JSON (colonnes)", send_bulk_columns),
+                        ("Groupé binaire", send_bulk_binary)]:
+        rate = measure(label, send, N_READINGS)
+        print(f"      → x{rate / reference:.1f} par rapport à l'envoi unitaire")
+
+
+if __name__ == '__main__':
+    main_benchmark()
@@ -0,0 +1,51 @@
+"""
+Benchmark de l'évaluation pendant l'entraînement: out-of-bag vs k-fold
+
+Scénarios (même forêt DEFAULT_FOREST_PARAMS, même split train/test):
+- cross-validation 10-fold: 1 entraînement + 10 réentraînements
+- out-of-bag: 1 entraînement, métriques sur les prédictions hors-sac
+- out-of-bag répété (3 seeds): variance des métriques OOB
+"""
+import contextlib
+import io
+import time
+from model import AsthmaPredictor
+
+DATA_PATH = 'data/asthma_detection_final.csv'
+
+SCENARIOS = [
+    ("Cross-validation 10-fold (avant)", {'evaluation': 'cv', 'cv_folds': 10}),
+    ("Out-of-bag", {'evaluation': 'oob'}),
+    ("Out-of-bag, 3 seeds", {'evaluation': 'oob', 'oob_repeats': 3}),
+]
+
+
+def main():
+    predictor = AsthmaPredictor(model_path='models/benchmark_oob.pkl')
+    with contextlib.redirect_stdout(io.StringIO()):
+        X, y = predictor.load_data(DATA_PATH)
+
+    print(f"\n📊 Entraînement + évaluation sur {len(X)} échantillons")
+    reference = None
+    for title, options in SCENARIOS:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            metrics = predictor.train(X, y, test_size=0.2, random_state=42, **options)
+        elapsed = time.perf_counter() - start
+        reference = reference or elapsed
+
+        if metrics['oob']:
+            oob = metrics['oob']
+            estimate = (f"accuracy OOB {oob['accuracy']:.4f} (+/- {oob['accuracy_std']:.4f}) "
+                        f"| AUC classe 3 {oob['roc_auc_critical']:.4f}")
+        else:
+            estimate = f"accuracy CV {metrics['cv_mean']:.4f} (+/- {metrics['cv_std']:.4f})"
+        print(f"   {title:<34} {elapsed:6.2f} s (x{reference / elapsed:4.1f}) | {estimate} "
+              f"| test {metrics['accuracy']:.4f}")
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("BENCHMARK OUT-OF-BAG VS CROSS-VALIDATION")
+    print("="*70)
+    main()
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark de la latence de prédiction
+
+Compare le chemin actuel (un seul passage sur la forêt) à l'ancien chemin
+de référence (predict_proba + predict sklearn), directement sur
+AsthmaPredictor puis à travers l'endpoint /api/predict.
+"""
+import time
+import numpy as np
+from model import AsthmaPredictor
+
+N_RUNS = 200
+
+PATIENT = {
+    'Tiredness': 1, 'Dry-Cough': 1, 'Difficulty-in-Breathing': 1,
+    'Sore-Throat': 1, 'Pains': 0, 'Nasal-Congestion': 1, 'Runny-Nose': 0,
+    'Age_0-9': 0, 'Age_10-19': 0, 'Age_20-24': 1, 'Age_25-59': 0, 'Age_60+': 0,
+    'Gender_Female': 0, 'Gender_Male': 1,
+    'Humidity': 75.0, 'Temperature': 36.8, 'PM25': 45.0, 'RespiratoryRate': 22.0
+}
+
+API_REQUEST = {
+    'symptoms': {
+        'Tiredness': 1, 'Dry-Cough': 1, 'Difficulty-in-Breathing': 1,
+        'Sore-Throat': 1, 'Pains': 0, 'Nasal-Congestion': 1, 'Runny-Nose': 0
+    },
+    'demographics': {'age': '20-24', 'gender': 'Male'}
+}
+
+API_SENSORS = {'temperature': 36.8, 'humidity': 75.0, 'pm25': 45.0, 'respiratoryRate': 22.0}
+
+
+def measure(func, n_runs=N_RUNS):
+    """
+    Mesure la latence d'une fonction sans argument
+    
+    Returns:
+        (médiane, p95) en millisecondes
+    """
+    func()  # Échauffement
+    timings = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.median(timings), np.percentile(timings, 95)
+
+
+def print_comparison(title, reference, current):
+    """Affiche la comparaison référence / actuel"""
+    print(f"\n{title}")
+    print(f"   Référence (2 passages): médiane {reference[0]:.3f} ms | p95 {reference[1]:.3f} ms")
+    print(f"   Actuel    (1 passage) : médiane {current[0]:.3f} ms | p95 {current[1]:.3f} ms")
+    print(f"   Gain: x{reference[0] / current[0]:.1f}")
+
+
+def benchmark_predictor():
+    """Benchmark direct de AsthmaPredictor"""
+    predictor = AsthmaPredictor(model_path='models/asthma_model.pkl', high_risk_threshold=0.443)
+    predictor.load_model()
+    
+    reference = measure(lambda: predictor._predict_reference(PATIENT))
+    current = measure(lambda: predictor.predict(PATIENT))
+    print_comparison("📊 AsthmaPredictor.predict", reference, current)
+
+
+def benchmark_api():
+    """Benchmark de bout en bout de /api/predict via le client de test Flask"""
+    import main
+    
+    client = main.app.test_client()
+    client.post('/api/sensors', json=API_SENSORS)
+    predictor = main.model_manager.current()
+    predictor.cache = None  # Mesurer l'évaluation de la forêt, pas le cache
+    
+    def call_api():
+        response = client.post('/api/predict', json=API_REQUEST)
+        assert response.status_code == 200, response.get_json()
+    
+    fast_predict = predictor.predict
+    predictor.predict = predictor._predict_reference
+    try:
+        reference = measure(call_api)
+    finally:
+        predictor.predict = fast_predict
+    current = measure(call_api)
+    print_comparison("📊 POST /api/predict", reference, current)
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("BENCHMARK DE LA LATENCE DE PRÉDICTION")
+    print("="*70)
+    benchmark_predictor()
+    benchmark_api()
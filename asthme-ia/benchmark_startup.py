@@ -0,0 +1,101 @@
+"""
+Benchmark du démarrage à froid: temps jusqu'à la première prédiction
+
+Chaque scénario lance un nouvel interpréteur Python qui importe main.py,
+reçoit une lecture capteurs puis sert une première requête /api/predict
+(client de test Flask). Le temps mesuré va du lancement du processus à la
+réponse de cette première prédiction.
+
+Scénarios:
+- imports anticipés + pickle: reproduit l'ancien model.py, qui importait
+  pandas et scikit-learn (ensemble, model_selection, metrics) au chargement
+- imports à la demande + pickle: sklearn n'est importé que par joblib.load
+- imports à la demande + bundle memmap: ni pandas, ni sklearn, ni joblib
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+N_RUNS = 5
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+EAGER_IMPORTS = """
+import pandas
+import joblib
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
+from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
+"""
+
+FIRST_PREDICTION = """
+import sys
+import main
+client = main.app.test_client()
+client.post('/api/sensors', json={'temperature': 36.8, 'humidity': 60.0, 'pm25': 20.0, 'respiratoryRate': 18.0})
+response = client.post('/api/predict', json={
+    'symptoms': {'Tiredness': 1, 'Dry-Cough': 0, 'Difficulty-in-Breathing': 0, 'Sore-Throat': 0,
+                 'Pains': 0, 'Nasal-Congestion': 1, 'Runny-Nose': 1},
+    'demographics': {'age': '25-59', 'gender': 'Female'}
+})
+assert response.status_code == 200, response.get_json()
+loaded = [m for m in ('pandas', 'sklearn', 'joblib') if m in sys.modules]
+sys.stderr.write('MODULES:' + ','.join(loaded) + '\\n')
+"""
+
+
+def time_to_first_prediction(code, model_path):
+    """
+    Lance un processus Python et mesure le temps jusqu'à sa fin
+
+    Returns:
+        (durées en secondes, modules lourds chargés)
+    """
+    env = dict(os.environ, ASTHMA_MODEL_PATH=model_path, ASTHMA_MODEL_WATCH_INTERVAL='0')
+    timings, modules = [], ''
+    for _ in range(N_RUNS):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, env=env,
+                                capture_output=True, text=True)
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr)
+        modules = next((line[len('MODULES:'):] for line in result.stderr.splitlines()
+                        if line.startswith('MODULES:')), '')
+    return np.array(timings), modules or 'aucun'
+
+
+def print_result(title, result):
+    """Affiche médiane et minimum des temps de démarrage"""
+    timings, modules = result
+    print(f"   {title:<38} médiane {np.median(timings) * 1000:7.0f} ms | min {timings.min() * 1000:7.0f} ms"
+          f" | modules: {modules}")
+
+
+def main():
+    from model import AsthmaPredictor
+
+    pickle_path = os.path.join(BASE_DIR, 'models', 'asthma_model.pkl')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = AsthmaPredictor(model_path=pickle_path)
+        predictor.load_model()
+        bundle_path = predictor.save_bundle(os.path.join(tmp, 'asthma_model.bundle'))
+
+        print(f"\n📊 Temps jusqu'à la première prédiction ({N_RUNS} démarrages par scénario)")
+        print_result("Imports anticipés + pickle (avant)",
+                     time_to_first_prediction(EAGER_IMPORTS + FIRST_PREDICTION, pickle_path))
+        print_result("Imports à la demande + pickle",
+                     time_to_first_prediction(FIRST_PREDICTION, pickle_path))
+        print_result("Imports à la demande + bundle memmap",
+                     time_to_first_prediction(FIRST_PREDICTION, bundle_path))
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("BENCHMARK DU DÉMARRAGE À FROID")
+    print("="*70)
+    main()
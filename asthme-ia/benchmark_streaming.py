@@ -0,0 +1,102 @@
+"""
+Benchmark du chargement et de l'entraînement sur un grand dataset: pic de mémoire et durée
+
+Usage: python benchmark_streaming.py [nombre de lignes, défaut 2000000] [arbres, défaut 5]
+
+Un CSV synthétique est généré à partir du dataset (lignes tirées avec
+remise, capteurs bruités). Chaque scénario s'exécute dans un nouveau
+processus et prépare la matrice float32 consommée par le fit des arbres:
+- load_data (pandas): DataFrame int64/float64 complet, puis conversion
+- load_data_streaming: matrice float32 préallouée, remplie par morceaux
+- load_data_streaming + échantillon stratifié (50 000 lignes par classe)
+
+Chaque scénario enchaîne ensuite AsthmaPredictor.train (forêt réduite,
+évaluation out-of-bag comme train_model.py): découpe train/test, fit,
+empreinte des données et évaluation doivent tenir dans la même mémoire
+que le chargement.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, 'data', 'asthma_detection_final.csv')
+
+SCENARIO = """
+import contextlib, io, sys, time
+import numpy as np
+from model import AsthmaPredictor
+from streaming_loader import peak_rss_mb
+baseline = peak_rss_mb()
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    predictor = AsthmaPredictor()
+    X, y = predictor.{call}
+    matrix = np.asarray(X, dtype=np.float32)  # Conversion faite par RandomForestClassifier.fit
+    load_time, load_peak = time.perf_counter() - start, peak_rss_mb() - baseline
+    del matrix
+    start = time.perf_counter()
+    predictor.train(X, y, forest_params={{'n_estimators': {trees}}})
+print(f"{{load_time}} {{load_peak}} {{time.perf_counter() - start}} {{peak_rss_mb() - baseline}} {{len(y)}}")
+"""
+
+SCENARIOS = [
+    ("load_data (pandas, avant)", "load_data({path!r}, use_cache=False)"),
+    ("load_data_streaming", "load_data_streaming({path!r})"),
+    ("load_data_streaming, 50k/classe", "load_data_streaming({path!r}, max_per_class=50_000)"),
+]
+
+
+def generate_dataset(path, n_rows, chunk_rows=250_000):
+    """Écrit un CSV synthétique de n_rows lignes, par morceaux"""
+    source = pd.read_csv(DATA_PATH)
+    rng = np.random.default_rng(0)
+    sensors = ['Humidity', 'Temperature', 'PM25', 'RespiratoryRate']
+    for start in range(0, n_rows, chunk_rows):
+        chunk = source.sample(min(chunk_rows, n_rows - start), replace=True, random_state=start).reset_index(drop=True)
+        chunk[sensors] = (chunk[sensors] + rng.normal(0, 0.5, (len(chunk), len(sensors)))).round(1)
+        chunk.to_csv(path, mode='a', header=start == 0, index=False)
+
+
+def run_scenario(call, trees):
+    """
+    Exécute un scénario dans un nouveau processus
+
+    Returns:
+        (durée du chargement s, pic mémoire Mo, durée de l'entraînement s, pic mémoire Mo, lignes)
+    """
+    result = subprocess.run([sys.executable, '-c', SCENARIO.format(call=call, trees=trees)], cwd=BASE_DIR,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    load_time, load_peak, train_time, train_peak, rows = result.stdout.split()
+    return float(load_time), float(load_peak), float(train_time), float(train_peak), int(rows)
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    trees = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'large_dataset.csv')
+        start = time.perf_counter()
+        generate_dataset(path, n_rows)
+        print(f"\n📊 CSV synthétique: {n_rows} lignes, {os.path.getsize(path) / 2**20:.0f} Mo "
+              f"(généré en {time.perf_counter() - start:.1f} s)")
+        print(f"   Pic mémoire au-delà de l'interpréteur (imports compris), entraînement de {trees} arbres")
+
+        for title, call in SCENARIOS:
+            load_time, load_peak, train_time, train_peak, rows = run_scenario(call.format(path=path), trees)
+            print(f"   {title:<34} chargement {load_time:6.2f} s, pic +{load_peak:6.0f} Mo | "
+                  f"entraînement {train_time:6.2f} s, pic +{train_peak:6.0f} Mo | {rows} lignes")
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("BENCHMARK DU CHARGEMENT EN FLUX ET DE L'ENTRAÎNEMENT")
+    print("="*70)
+    main()
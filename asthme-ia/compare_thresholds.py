@@ -1,7 +1,16 @@
 """
 Comparaison des seuils : 0.65 (ancien) vs 0.443 (Youden optimal)
 """
+import copy
+import numpy as np
 from model import AsthmaPredictor
+from evaluation_bundle import load_or_score, critical_scores
+from threshold_eval import ThresholdCurve
+
+DATA_PATH = 'data/asthma_detection_final.csv'
+
+OLD_THRESHOLD = 0.650
+NEW_THRESHOLD = 0.443
 
 def compare_thresholds():
     """Compare les prédictions avec différents seuils"""
@@ -44,13 +53,13 @@ def compare_thresholds():
         }
     ]
     
-    # Charger le modèle avec les deux seuils
-    predictor_old = AsthmaPredictor(high_risk_threshold=0.650)
-    predictor_new = AsthmaPredictor(high_risk_threshold=0.443)
-    
-    predictor_old.load_model()
+    # Charger le modèle une seule fois: l'ancien seuil ne change que la décision finale
+    predictor_new = AsthmaPredictor(high_risk_threshold=NEW_THRESHOLD)
     predictor_new.load_model()
     
+    predictor_old = copy.copy(predictor_new)
+    predictor_old.high_risk_threshold = OLD_THRESHOLD
+    
     for i, test_case in enumerate(test_cases, 1):
         print(f"\n{'='*80}")
         print(f"{test_case['name']}")
@@ -104,36 +113,25 @@ def compare_thresholds():
     
     # Statistiques sur le test set complet
     print(f"\n{'='*80}")
-    print("📊 IMPACT SUR LE TEST SET COMPLET (733 patients)")
+    print("📊 IMPACT SUR LE TEST SET COMPLET")
     print(f"{'='*80}")
     
-    from sklearn.model_selection import train_test_split
-    
-    X, y = predictor_new.load_data('data/asthma_detection_final.csv')
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-    
-    # Prédictions avec les deux seuils
-    y_proba = predictor_new.model.predict_proba(X_test)
-    prob_elevé = y_proba[:, 2]
-    
-    # Comptage
-    ancien_seuil_alertes = (prob_elevé >= 0.650).sum()
-    nouveau_seuil_alertes = (prob_elevé >= 0.443).sum()
+    # Probabilités enregistrées à l'entraînement: ni CSV, ni split, ni rescoring
+    header, arrays = load_or_score(predictor_new.model_path, DATA_PATH)
+    y_test = np.asarray(arrays['y_test'])
+    curve = ThresholdCurve(y_test == 3, critical_scores(header, arrays))
+    ancien, nouveau = curve.at(OLD_THRESHOLD), curve.at(NEW_THRESHOLD)
     
     # Vrais cas Élevé
-    vrais_eleves = (y_test == 3).sum()
-    
-    # Détection avec ancien seuil
-    detectes_ancien = ((prob_elevé >= 0.650) & (y_test == 3)).sum()
-    manques_ancien = vrais_eleves - detectes_ancien
+    vrais_eleves = curve.n_pos
     
-    # Détection avec nouveau seuil
-    detectes_nouveau = ((prob_elevé >= 0.443) & (y_test == 3)).sum()
-    manques_nouveau = vrais_eleves - detectes_nouveau
+    # Alertes, détections et cas manqués par seuil
+    ancien_seuil_alertes = ancien['tp'] + ancien['fp']
+    nouveau_seuil_alertes = nouveau['tp'] + nouveau['fp']
+    detectes_ancien, manques_ancien = ancien['tp'], ancien['fn']
+    detectes_nouveau, manques_nouveau = nouveau['tp'], nouveau['fn']
     
-    print(f"\nCas ÉLEVÉ dans le test set : {vrais_eleves}")
+    print(f"\nCas ÉLEVÉ dans le test set : {vrais_eleves} ({len(y_test)} patients)")
     print(f"\n📊 ANCIEN SEUIL (0.650):")
     print(f"   Alertes déclenchées : {ancien_seuil_alertes}")
     print(f"   Cas Élevé détectés  : {detectes_ancien}/{vrais_eleves} ({detectes_ancien/vrais_eleves*100:.1f}%)")
@@ -154,8 +152,9 @@ def compare_thresholds():
     print(f"{'='*80}")
     print(f"\nLe nouveau seuil (0.443) basé sur l'analyse ROC permet:")
     print(f"  ✅ Détection de {detectes_nouveau - detectes_ancien} cas supplémentaires")
-    print(f"  ✅ Réduction de {(manques_ancien - manques_nouveau)/manques_ancien*100:.0f}% des faux négatifs")
-    print(f"  ✅ Maintien d'une excellente spécificité (98.8%)")
+    if manques_ancien:
+        print(f"  ✅ Réduction de {(manques_ancien - manques_nouveau)/manques_ancien*100:.0f}% des faux négatifs")
+    print(f"  ✅ Spécificité: {ancien['specificity']:.1%} → {nouveau['specificity']:.1%}")
     print(f"  ✅ Équilibre optimal sensibilité/spécificité")
 
 if __name__ == '__main__':
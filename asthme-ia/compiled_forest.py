@@ -0,0 +1,137 @@
+"""
+Moteur d'inférence compilé pour la Random Forest
+
+Les arbres du RandomForestClassifier sont aplatis dans des tableaux NumPy
+contigus (feature, seuil, enfants, valeur des feuilles), puis parcourus de
+manière vectorisée pour tous les arbres et tous les échantillons à la fois.
+On évite ainsi la validation et le dispatch joblib de sklearn à chaque requête.
+"""
+import numpy as np
+
+
+class CompiledForest:
+    """Forêt aplatie en tableaux NumPy pour une inférence rapide"""
+
+    def __init__(self, feature, threshold, children_left, children_right,
+                 value, roots, classes, max_depth):
+        """
+        Initialise le moteur à partir des tableaux de noeuds
+
+        Args:
+            feature: Index de la feature testée par noeud (int32)
+            threshold: Seuil de split par noeud (float64)
+            children_left: Index global de l'enfant gauche (les feuilles pointent sur elles-mêmes)
+            children_right: Index global de l'enfant droit (les feuilles pointent sur elles-mêmes)
+            value: Probabilités normalisées par noeud, shape (n_nodes, n_classes)
+            roots: Index global de la racine de chaque arbre
+            classes: Classes du modèle (ex: [1, 2, 3])
+            max_depth: Profondeur maximale de la forêt (nombre d'itérations du parcours)
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        self.n_estimators = len(roots)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Aplatit un RandomForestClassifier entraîné
+
+        Args:
+            model: RandomForestClassifier sklearn déjà entraîné
+
+        Returns:
+            CompiledForest équivalent
+        """
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            # Les feuilles bouclent sur elles-mêmes: le parcours peut donc
+            # toujours faire max_depth itérations sans branchement
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            # Depuis sklearn 1.4 les valeurs sont déjà des fractions; les
+            # versions antérieures stockent des effectifs normalisés à la prédiction
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            if np.allclose(normalizer, 1.0):
+                normalizer = np.ones_like(normalizer)
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(value / normalizer)
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.int32),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            children_left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.int32),
+            children_right=np.ascontiguousarray(np.concatenate(rights), dtype=np.int32),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(model.classes_),
+            max_depth=max_depth
+        )
+
+    def apply(self, X):
+        """
+        Retourne l'index global de la feuille atteinte dans chaque arbre
+
+        Args:
+            X: Matrice (n_samples, n_features)
+
+        Returns:
+            leaves: Tableau (n_estimators, n_samples) d'index de feuilles
+        """
+        # sklearn évalue les splits en float32: on reproduit la conversion
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        n_samples = X.shape[0]
+        nodes = np.repeat(self.roots[:, np.newaxis], n_samples, axis=1)
+        sample_idx = np.broadcast_to(np.arange(n_samples), nodes.shape)
+
+        for _ in range(self.max_depth):
+            go_left = X[sample_idx, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+
+        return nodes
+
+    def predict_proba(self, X):
+        """
+        Probabilités par classe, identiques à RandomForestClassifier.predict_proba
+
+        Args:
+            X: Matrice (n_samples, n_features)
+
+        Returns:
+            proba: Tableau (n_samples, n_classes)
+        """
+        leaves = self.apply(X)
+        proba = self.value[leaves].sum(axis=0)
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        """Classe la plus probable pour chaque échantillon"""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
@@ -0,0 +1,57 @@
+"""
+Conversion du modèle pickle (joblib) en bundle memmap
+
+Usage: python convert_model.py [models/asthma_model.pkl] [models/asthma_model.bundle]
+
+Le bundle produit est rechargé puis comparé au modèle sklearn sur le
+dataset d'entraînement: les probabilités doivent être identiques.
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from model import AsthmaPredictor
+from model_bundle import file_sha256
+
+DATA_PATH = 'data/asthma_detection_final.csv'
+
+
+def main():
+    pickle_path = sys.argv[1] if len(sys.argv) > 1 else 'models/asthma_model.pkl'
+    bundle_path = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(pickle_path)[0] + '.bundle'
+
+    print("="*70)
+    print("CONVERSION DU MODÈLE EN BUNDLE MEMMAP")
+    print("="*70)
+
+    start = time.perf_counter()
+    source = AsthmaPredictor(model_path=pickle_path, high_risk_threshold=0.443)
+    source.load_model()
+    pickle_time = time.perf_counter() - start
+
+    source.save_bundle(
+        bundle_path,
+        source=f"{os.path.basename(pickle_path)} sha256:{file_sha256(pickle_path)}"
+    )
+
+    start = time.perf_counter()
+    bundle = AsthmaPredictor(model_path=bundle_path, high_risk_threshold=0.443)
+    bundle.load_model()
+    bundle_time = time.perf_counter() - start
+
+    print(f"\n⏱️  Chargement pickle: {pickle_time * 1000:.1f} ms | bundle: {bundle_time * 1000:.1f} ms")
+
+    # Vérification: mêmes probabilités que sklearn sur le dataset
+    if os.path.exists(DATA_PATH):
+        X = pd.read_csv(DATA_PATH)[source.feature_names]
+        expected = source.model.predict_proba(X)
+        actual = bundle.engine.predict_proba(X.to_numpy())
+        max_diff = float(np.abs(expected - actual).max())
+        if max_diff > 1e-12:
+            raise SystemExit(f"❌ Bundle incohérent avec le pickle (écart max {max_diff:.2e})")
+        print(f"✅ Bundle vérifié sur {len(X)} lignes (écart max {max_diff:.1e})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+"""
+Cache colonnaire du dataset d'entraînement (un .npy memmap par colonne)
+
+Le CSV est lu et nettoyé (SENSOR_CLEANING_RULES) une seule fois, par
+morceaux, puis chaque colonne est écrite dans un .npy au type le plus
+étroit: le plus petit entier qui contient ses valeurs (int8 pour les
+symptômes, le one-hot et la cible), float32 pour les capteurs. Une colonne
+dont un morceau suivant dépasse le type choisi est élargie. Les arbres de scikit-learn travaillent
+en float32: un modèle entraîné sur le cache est identique à un modèle
+entraîné sur le CSV.
+
+Le cache (ex: data/asthma_detection_final.columns/) contient un
+header.json avec l'empreinte SHA-256 du CSV source et des règles de
+nettoyage: il est reconstruit dès que l'un des deux change. Au chargement,
+les colonnes sont ouvertes en memmap (lecture seule, sans parsing) et
+peuvent être parcourues par morceaux.
+"""
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from model_bundle import file_sha256, publish_directory
+from sensor_cleaning import CleaningTable, SENSOR_CLEANING_RULES
+
+CACHE_FORMAT = 'asthma-dataset-columns'
+CACHE_VERSION = 1
+HEADER_FILE = 'header.json'
+TARGET_COLUMN = 'Asthma'
+
+# Lignes lues par morceau lors de la conversion du CSV
+CHUNK_ROWS = 100_000
+
+
+def cleaning_rules_hash():
+    """Empreinte des règles de nettoyage (le cache en dépend)"""
+    return hashlib.sha256(repr(SENSOR_CLEANING_RULES).encode('utf-8')).hexdigest()
+
+
+def count_rows(csv_path):
+    """Nombre de lignes de données d'un CSV (sans l'en-tête), sans le parser"""
+    lines = 0
+    last = b'\n'
+    with open(csv_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1  # Dernière ligne sans retour à la ligne
+    return max(lines - 1, 0)
+
+
+def column_dtype(name, values):
+    """
+    Type de stockage d'un morceau de colonne
+
+    Capteurs et colonnes décimales en float32, entiers dans le plus petit
+    type (int8, int16, int32, int64) qui contient leur minimum et leur maximum.
+    """
+    if name in {rule[0] for rule in SENSOR_CLEANING_RULES} or not np.issubdtype(values.dtype, np.integer):
+        return np.dtype(np.float32)
+    if len(values) == 0:
+        return np.dtype(np.int8)
+    low, high = values.min(), values.max()
+    for dtype in (np.int8, np.int16, np.int32):
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _widen(array, dtype, n_filled):
+    """
+    Réécrit une colonne memmap dans un type plus large
+
+    Args:
+        array: Colonne memmap (fichier .npy)
+        dtype: Nouveau type
+        n_filled: Nombre de lignes déjà remplies, recopiées
+
+    Returns:
+        Nouvelle colonne memmap, au même chemin
+    """
+    path = array.filename
+    wide_path = path + '.wide'
+    wide = np.lib.format.open_memmap(wide_path, mode='w+', dtype=dtype, shape=array.shape)
+    wide[:n_filled] = array[:n_filled]
+    wide.flush()
+    del wide
+    os.replace(wide_path, path)
+    return np.lib.format.open_memmap(path, mode='r+')
+
+
+class DatasetCache:
+    """Dataset CSV converti en colonnes .npy typées et projetées en mémoire"""
+
+    def __init__(self, csv_path, cache_path=None, target=TARGET_COLUMN):
+        """
+        Args:
+            csv_path: CSV source
+            cache_path: Dossier du cache (défaut: <csv sans extension>.columns)
+            target: Colonne cible
+        """
+        self.csv_path = csv_path
+        self.cache_path = cache_path or os.path.splitext(csv_path)[0] + '.columns'
+        self.target = target
+        self.header = None
+        self._columns = None
+
+    def _read_header(self):
+        """En-tête du cache, None s'il est absent ou illisible"""
+        try:
+            with open(os.path.join(self.cache_path, HEADER_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_valid(self, source_hash=None):
+        """Vrai si le cache existe et correspond au CSV et aux règles de nettoyage actuels"""
+        header = self._read_header()
+        return (
+            header is not None
+            and header.get('format') == CACHE_FORMAT
+            and header.get('version') == CACHE_VERSION
+            and header.get('cleaning_rules') == cleaning_rules_hash()
+            and header.get('source_sha256') == (source_hash or file_sha256(self.csv_path))
+        )
+
+    def build(self, chunk_rows=CHUNK_ROWS, source_hash=None):
+        """
+        Convertit le CSV en colonnes (lecture et nettoyage par morceaux)
+
+        Les colonnes sont préallouées (memmap) puis remplies morceau par
+        morceau: la mémoire utilisée ne dépend pas de la taille du CSV. Un
+        morceau qui ne tient pas dans le type d'une colonne (ex: âge 200 dans
+        une colonne int8) l'élargit: les lignes déjà écrites sont recopiées.
+        """
+        import pandas as pd
+
+        n_rows = count_rows(self.csv_path)
+        tmp_path = self.cache_path.rstrip(os.sep) + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        arrays, names, sensor_columns = None, None, []
+        offset = 0
+        for chunk in pd.read_csv(self.csv_path, chunksize=chunk_rows):
+            if arrays is None:
+                names = chunk.columns.tolist()
+                arrays = [
+                    np.lib.format.open_memmap(
+                        os.path.join(tmp_path, f'col_{i:03d}.npy'), mode='w+',
+                        dtype=column_dtype(name, chunk[name].to_numpy()), shape=(n_rows,)
+                    )
+                    for i, name in enumerate(names)
+                ]
+                sensor_columns = [rule[0] for rule in SENSOR_CLEANING_RULES if rule[0] in names]
+                cleaning = CleaningTable(sensor_columns)
+
+            # Même nettoyage que AsthmaPredictor._clean_sensor_data, en float64
+            if sensor_columns:
+                values = np.array(chunk[sensor_columns], dtype=np.float64)
+                cleaning.apply(values)
+                chunk[sensor_columns] = values
+
+            end = offset + len(chunk)
+            for j, name in enumerate(names):
+                values = chunk[name].to_numpy()
+                dtype = np.promote_types(arrays[j].dtype, column_dtype(name, values))
+                if dtype != arrays[j].dtype:
+                    arrays[j] = _widen(arrays[j], dtype, offset)
+                arrays[j][offset:end] = values
+            offset = end
+
+        for array in arrays or []:
+            array.flush()
+
+        header = {
+            'format': CACHE_FORMAT,
+            'version': CACHE_VERSION,
+            'source': os.path.basename(self.csv_path),
+            'source_sha256': source_hash or file_sha256(self.csv_path),
+            'cleaning_rules': cleaning_rules_hash(),
+            'n_rows': offset,
+            'target': self.target,
+            'columns': [
+                {'name': name, 'file': f'col_{i:03d}.npy', 'dtype': array.dtype.str}
+                for i, (name, array) in enumerate(zip(names or [], arrays or []))
+            ]
+        }
+        with open(os.path.join(tmp_path, HEADER_FILE), 'w', encoding='utf-8') as f:
+            json.dump(header, f, indent=2, ensure_ascii=False)
+        del arrays
+
+        publish_directory(tmp_path, self.cache_path)
+
+    def open(self):
+        """
+        Ouvre le cache (reconstruit s'il est absent ou périmé)
+
+        Returns:
+            self (colonnes en memmap lecture seule)
+        """
+        source_hash = file_sha256(self.csv_path)
+        rebuilt = not self.is_valid(source_hash)
+        if rebuilt:
+            self.build(source_hash=source_hash)
+
+        self.header = self._read_header()
+        self._columns = {
+            column['name']: np.load(os.path.join(self.cache_path, column['file']), mmap_mode='r')[:self.header['n_rows']]
+            for column in self.header['columns']
+        }
+        print(f"{'Cache colonnaire reconstruit' if rebuilt else 'Cache colonnaire chargé'}: "
+              f"{self.cache_path} ({self.header['n_rows']} lignes)")
+        return self
+
+    @property
+    def feature_names(self):
+        """Colonnes de features (toutes sauf la cible), dans l'ordre du CSV"""
+        return [c['name'] for c in self.header['columns'] if c['name'] != self.target]
+
+    def __len__(self):
+        return self.header['n_rows']
+
+    def column(self, name):
+        """Colonne en memmap (lecture seule)"""
+        return self._columns[name]
+
+    def to_frame(self, columns=None):
+        """
+        DataFrame des colonnes demandées (types étroits conservés)
+
+        Args:
+            columns: Colonnes (défaut: features puis cible)
+        """
+        import pandas as pd
+
+        columns = columns or self.feature_names + [self.target]
+        return pd.DataFrame({name: self._columns[name] for name in columns}, copy=False)
+
+    def iter_chunks(self, chunk_rows=CHUNK_ROWS, columns=None, dtype=np.float32):
+        """
+        Parcourt le dataset par morceaux
+
+        Args:
+            chunk_rows: Lignes par morceau
+            columns: Colonnes de features (défaut: feature_names)
+            dtype: Type de la matrice de features produite
+
+        Yields:
+            (X, y): matrice (lignes x features) et cible du morceau
+        """
+        columns = columns or self.feature_names
+        target = self._columns[self.target]
+        for start in range(0, len(self), chunk_rows):
+            end = min(start + chunk_rows, len(self))
+            X = np.empty((end - start, len(columns)), dtype=dtype)
+            for j, name in enumerate(columns):
+                X[:, j] = self._columns[name][start:end]
+            yield X, np.asarray(target[start:end])
+
@@ -0,0 +1,166 @@
+"""
+Artefact d'évaluation enregistré à côté du modèle (tableaux .npy + en-tête JSON)
+
+AsthmaPredictor.train calcule déjà les probabilités du test set et les
+probabilités out-of-bag du train set: elles sont conservées dans un dossier
+(ex: models/asthma_model.evaluation/) avec les positions des lignes de test
+et l'importance des features. Les scripts d'analyse (analyze_roc_threshold,
+compare_thresholds) lisent ces tableaux au lieu de recharger le CSV,
+refaire le split et rescorer le test set.
+
+L'en-tête contient l'empreinte des données d'entraînement du modèle
+(training_hash) et la version de l'artefact sauvegardé: une évaluation
+dont le modèle a changé (réentraînement, mise à jour incrémentale) est
+considérée comme périmée.
+"""
+import json
+import os
+import shutil
+import numpy as np
+from model_bundle import artifact_version, is_bundle, publish_directory, HEADER_FILE
+
+EVALUATION_FORMAT = 'asthma-evaluation'
+EVALUATION_VERSION = 1
+CRITICAL_CLASS = 3
+
+
+def evaluation_path(model_path):
+    """Dossier d'évaluation d'un modèle (pickle ou bundle): <modèle sans extension>.evaluation"""
+    return os.path.splitext(model_path.rstrip(os.sep))[0] + '.evaluation'
+
+
+def write_evaluation(path, arrays, training_hash, model_version, classes, feature_names, **info):
+    """
+    Écrit une évaluation (dans un dossier temporaire puis renommé)
+
+    Args:
+        path: Dossier de l'évaluation
+        arrays: Tableaux à enregistrer (ex: test_indices, y_test, test_proba,
+                train_indices, y_train, oob_proba, feature_importances)
+        training_hash: Empreinte des données d'entraînement du modèle évalué
+        model_version: Version de l'artefact du modèle (artifact_version)
+        classes: Classes du modèle, dans l'ordre des colonnes de probabilités
+        feature_names: Noms des features dans l'ordre du modèle
+        **info: Informations supplémentaires de l'en-tête (ex: test_size, random_state)
+    """
+    header = dict(
+        format=EVALUATION_FORMAT,
+        version=EVALUATION_VERSION,
+        **info,
+        training_hash=training_hash,
+        model_version=model_version,
+        classes=[int(c) for c in classes],
+        feature_names=list(feature_names),
+        arrays={
+            name: {'dtype': np.asarray(array).dtype.str, 'shape': list(np.shape(array))}
+            for name, array in arrays.items()
+        }
+    )
+
+    tmp_path = path.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(tmp_path, HEADER_FILE), 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2, ensure_ascii=False)
+
+    publish_directory(tmp_path, path)
+
+
+def read_evaluation(path):
+    """
+    Ouvre une évaluation sans copier les tableaux (memmap en lecture seule)
+
+    Returns:
+        (header, arrays)
+
+    Raises:
+        ValueError: format, version ou tableau incompatible
+    """
+    with open(os.path.join(path, HEADER_FILE), encoding='utf-8') as f:
+        header = json.load(f)
+
+    if header.get('format') != EVALUATION_FORMAT:
+        raise ValueError(f"Format d'évaluation inconnu: {header.get('format')}")
+    if header.get('version') != EVALUATION_VERSION:
+        raise ValueError(f"Version d'évaluation non supportée: {header.get('version')} (attendu: {EVALUATION_VERSION})")
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        array = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+        if array.dtype.str != spec['dtype'] or list(array.shape) != spec['shape']:
+            raise ValueError(f"Tableau {name} incohérent avec l'en-tête")
+        arrays[name] = array
+    return header, arrays
+
+
+def is_current(header, model_path):
+    """
+    Vrai si l'évaluation correspond au modèle actuellement sauvegardé
+
+    Bundle: même empreinte des données d'entraînement dans son en-tête.
+    Pickle: même version d'artefact (empreinte du fichier, sans le désérialiser).
+    """
+    if is_bundle(model_path):
+        with open(os.path.join(model_path, HEADER_FILE), encoding='utf-8') as f:
+            return json.load(f).get('training_hash') == header.get('training_hash')
+    return os.path.exists(model_path) and artifact_version(model_path) == header.get('model_version')
+
+
+def load_evaluation(model_path):
+    """
+    Évaluation à jour d'un modèle
+
+    Returns:
+        (header, arrays), ou None si elle est absente, illisible ou périmée
+    """
+    try:
+        header, arrays = read_evaluation(evaluation_path(model_path))
+    except (OSError, ValueError, KeyError):
+        return None
+    return (header, arrays) if is_current(header, model_path) else None
+
+
+def critical_scores(header, arrays, name='test_proba'):
+    """Probabilités de la classe critique (3) d'un tableau de probabilités"""
+    return np.asarray(arrays[name][:, header['classes'].index(CRITICAL_CLASS)])
+
+
+def load_or_score(model_path, data_path, test_size=0.2, random_state=42):
+    """
+    Évaluation du modèle, calculée une seule fois si elle manque
+
+    Sans évaluation à jour (modèle sauvegardé avant ce format), le modèle
+    est chargé, le test set est rescoré avec le split de l'entraînement,
+    puis l'évaluation est enregistrée (sans probabilités out-of-bag): les
+    exécutions suivantes n'ont plus besoin ni du CSV ni du modèle.
+
+    Returns:
+        (header, arrays)
+    """
+    evaluation = load_evaluation(model_path)
+    if evaluation is not None:
+        print(f"✅ Évaluation chargée: {evaluation_path(model_path)} (modèle {evaluation[0]['model_version']})")
+        return evaluation
+
+    from model import AsthmaPredictor
+
+    print(f"⚠️ Pas d'évaluation à jour pour {model_path}: calcul sur le test set")
+    predictor = AsthmaPredictor(model_path=model_path)
+    predictor.load_model()
+    X, y = predictor.load_data(data_path)
+    train_idx, test_idx = predictor.split_indices(y, test_size, random_state)
+
+    X_test = np.asarray(X[predictor.feature_names].iloc[test_idx], dtype=np.float64)
+    predictor.evaluation = {
+        'test_indices': test_idx,
+        'y_test': np.asarray(y)[test_idx],
+        'test_proba': predictor.engine.predict_proba(X_test),
+        'train_indices': train_idx,
+        'y_train': np.asarray(y)[train_idx]
+    }
+    predictor.evaluation_info = {'test_size': test_size, 'random_state': random_state, 'n_rows': len(y)}
+    predictor.save_evaluation()
+    return read_evaluation(evaluation_path(model_path))
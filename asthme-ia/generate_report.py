@@ -0,0 +1,453 @@
+"""
+Génération du rapport de visualisations (PNG de visualizations/)
+
+Usage: python generate_report.py [--model models/asthma_model.pkl] [--output visualizations]
+                                 [--workers N] [--dpi 300] [--force]
+
+Les figures sont calculées à partir de l'évaluation enregistrée à
+l'entraînement (evaluation_bundle.py): ni CSV, ni modèle, ni rescoring.
+Chaque figure est rendue dans un processus séparé avec le backend non
+interactif Agg (aucun affichage requis, utilisable en CI ou sur un serveur).
+
+Une figure n'est régénérée que si ses entrées ont changé: l'empreinte
+SHA-256 des données de la figure, du code de rendu et de la résolution est
+comparée à celle du manifeste (visualizations/.report_manifest.json).
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from evaluation_bundle import load_or_score
+from threshold_eval import ThresholdCurve
+
+MODEL_PATH = 'models/asthma_model.pkl'
+DATA_PATH = 'data/asthma_detection_final.csv'
+REPORT_DIR = 'visualizations'
+MANIFEST_FILE = '.report_manifest.json'
+DPI = 300
+
+RISK_LABELS = {1: 'Faible', 2: 'Modéré', 3: 'Élevé'}
+CLASS_COLORS = {1: '#3498db', 2: '#2ecc71', 3: '#e74c3c'}
+
+# Catégories de features (couleurs des figures d'importance)
+ENVIRONMENT_SENSORS = ('Humidity', 'PM25', 'AQI')
+PHYSIOLOGICAL_SENSORS = ('Temperature', 'Heart_Rate', 'RespiratoryRate')
+CATEGORY_COLORS = {
+    'Capteurs\nEnvironnementaux': '#2ecc71',
+    'Capteurs\nPhysiologiques': '#27ae60',
+    'Symptômes': '#3498db',
+    'Démographie': '#e74c3c'
+}
+
+# Seuils marqués sur la figure d'analyse ROC
+CURRENT_THRESHOLD = 0.65
+MEDICAL_MAX_FPR = 0.15
+COMPROMISE_MAX_FPR = 0.20
+
+
+def feature_category(name):
+    """Catégorie d'une feature (clé de CATEGORY_COLORS)"""
+    if name in ENVIRONMENT_SENSORS:
+        return 'Capteurs\nEnvironnementaux'
+    if name in PHYSIOLOGICAL_SENSORS:
+        return 'Capteurs\nPhysiologiques'
+    if name.startswith(('Age_', 'Gender_')):
+        return 'Démographie'
+    return 'Symptômes'
+
+
+# --- Rendu des figures (exécuté dans les processus du pool) ---
+
+def render_confusion_matrix(plt, data):
+    """Matrice de confusion du test set"""
+    matrix, labels = data['matrix'], data['labels']
+    fig, ax = plt.subplots(figsize=(12, 9))
+    image = ax.imshow(matrix, cmap='Blues', aspect='auto')
+    fig.colorbar(image, ax=ax, label='Nombre de prédictions')
+    for i in range(matrix.shape[0]):
+        for j in range(matrix.shape[1]):
+            ax.text(j, i, int(matrix[i, j]), ha='center', va='center', fontsize=12,
+                    color='white' if matrix[i, j] > matrix.max() / 2 else 'black')
+    ax.set_xticks(range(len(labels)), labels)
+    ax.set_yticks(range(len(labels)), labels, rotation=90, va='center')
+    ax.set_xlabel('Classe Prédite', fontsize=14)
+    ax.set_ylabel('Classe Réelle', fontsize=14)
+    ax.set_title('Matrice de Confusion - Modèle Random Forest', fontsize=18, fontweight='bold')
+    ax.grid(False)
+    return fig
+
+
+def render_feature_importance(plt, data):
+    """Top 15 des features par importance, colorées par catégorie"""
+    names, importances = data['names'], data['importances']
+    colors = [CATEGORY_COLORS[feature_category(name)] for name in names]
+    fig, ax = plt.subplots(figsize=(12, 8))
+    bars = ax.barh(names[::-1], importances[::-1], color=colors[::-1], edgecolor='black')
+    for bar, value in zip(bars, importances[::-1]):
+        ax.text(bar.get_width() + importances.max() * 0.005, bar.get_y() + bar.get_height() / 2,
+                f'{value:.3f}', va='center', fontsize=9, fontweight='bold')
+    handles = [plt.Rectangle((0, 0), 1, 1, color=CATEGORY_COLORS[c], ec='black') for c in data['legend']]
+    ax.legend(handles, [c.replace('\n', ' ') for c in data['legend']], loc='lower right')
+    ax.set_xlabel('Importance', fontsize=13, fontweight='bold')
+    ax.set_ylabel('Feature', fontsize=13, fontweight='bold')
+    ax.set_title(f'Top {len(names)} Features - Importance dans le Modèle', fontsize=16, fontweight='bold')
+    return fig
+
+
+def render_category_contribution(plt, data):
+    """Contribution de chaque catégorie de features (barres et camembert)"""
+    categories, shares = data['categories'], data['shares'] * 100
+    colors = [CATEGORY_COLORS[c] for c in categories]
+    fig, (ax_bar, ax_pie) = plt.subplots(1, 2, figsize=(16, 6))
+    bars = ax_bar.bar(categories, shares, color=colors, edgecolor='black', linewidth=1.5)
+    for bar, share in zip(bars, shares):
+        ax_bar.text(bar.get_x() + bar.get_width() / 2, bar.get_height(), f'{share:.1f}%',
+                    ha='center', va='bottom', fontweight='bold')
+    ax_bar.set_ylabel('Contribution (%)', fontsize=12, fontweight='bold')
+    ax_bar.set_title('Contribution par Catégorie de Features', fontsize=14, fontweight='bold')
+    ax_bar.tick_params(axis='x', rotation=15)
+    ax_pie.pie(shares, labels=categories, colors=colors, autopct='%1.1f%%', startangle=90,
+               wedgeprops={'edgecolor': 'black', 'linewidth': 1.5},
+               textprops={'fontweight': 'bold'})
+    ax_pie.set_title("Distribution de l'Importance", fontsize=14, fontweight='bold')
+    return fig
+
+
+def render_performance_metrics(plt, data):
+    """Précision, rappel et F1 par classe"""
+    labels = data['labels']
+    x = np.arange(len(labels))
+    fig, ax = plt.subplots(figsize=(14, 8))
+    for k, (name, color) in enumerate([('Precision', '#3498db'), ('Recall', '#2ecc71'), ('F1-Score', '#e74c3c')]):
+        values = data['scores'][:, k]
+        bars = ax.bar(x + (k - 1) * 0.25, values, 0.25, label=name, color=color, edgecolor='black')
+        for bar, value in zip(bars, values):
+            ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height(), f'{value:.2f}',
+                    ha='center', va='bottom', fontsize=10, fontweight='bold')
+    ax.set_xticks(x, labels)
+    ax.set_ylim(0, 1.1)
+    ax.set_xlabel('Niveau de Risque', fontsize=13, fontweight='bold')
+    ax.set_ylabel('Score', fontsize=13, fontweight='bold')
+    ax.set_title('Métriques de Performance par Classe', fontsize=18, fontweight='bold')
+    ax.legend(fontsize=12)
+    return fig
+
+
+def render_roc_curves(plt, data):
+    """Courbes ROC one-vs-rest de chaque classe"""
+    fig, ax = plt.subplots(figsize=(12, 9))
+    for label, color, fpr, tpr, auc in zip(data['labels'], data['colors'], data['fpr'], data['tpr'], data['auc']):
+        ax.plot(fpr, tpr, color=color, lw=3, label=f'{label} (AUC = {auc:.3f})')
+    ax.plot([0, 1], [0, 1], 'k--', lw=2, label='Aléatoire (AUC = 0.5)')
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1.05)
+    ax.set_xlabel('Taux de Faux Positifs', fontsize=13, fontweight='bold')
+    ax.set_ylabel('Taux de Vrais Positifs', fontsize=13, fontweight='bold')
+    ax.set_title('Courbes ROC - Classification Multi-Classe', fontsize=18, fontweight='bold')
+    ax.legend(loc='lower right', fontsize=12)
+    return fig
+
+
+def render_class_distribution(plt, data):
+    """Répartition des classes dans les ensembles d'entraînement et de test"""
+    panels = [(title, counts) for title, counts in (("Distribution - Ensemble d'Entraînement", data['train']),
+                                                    ("Distribution - Ensemble de Test", data['test']))
+              if counts is not None]
+    fig, axes = plt.subplots(1, len(panels), figsize=(7 * len(panels), 6), squeeze=False)
+    for ax, (title, counts) in zip(axes[0], panels):
+        bars = ax.bar(data['labels'], counts, color=data['colors'], edgecolor='black', linewidth=2)
+        for bar, count in zip(bars, counts):
+            ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height(), int(count),
+                    ha='center', va='bottom', fontsize=12, fontweight='bold')
+        ax.set_ylabel("Nombre d'échantillons", fontsize=13, fontweight='bold')
+        ax.set_title(title, fontsize=15, fontweight='bold')
+    return fig
+
+
+def render_roc_threshold(plt, data):
+    """Courbe ROC de la classe Élevé et sensibilité/spécificité selon le seuil"""
+    fpr, tpr, thresholds = data['fpr'], data['tpr'], data['thresholds']
+    markers = data['markers']
+    fig, (ax_roc, ax_thr) = plt.subplots(1, 2, figsize=(12, 5))
+
+    ax_roc.plot(fpr, tpr, color='darkorange', lw=2, label=f"ROC curve (AUC = {data['auc']:.4f})")
+    ax_roc.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--', label='Chance (AUC = 0.50)')
+    for name, style in (('Youden', 'ro'), ('Médical', 'go'), ('Compromis', 'bo'), ('Actuel', 'ms')):
+        if name in markers:
+            threshold, x, y = markers[name]
+            ax_roc.plot(x, y, style, markersize=10, label=f'{name} ({threshold:.3f})')
+    ax_roc.set_xlim(0.0, 1.0)
+    ax_roc.set_ylim(0.0, 1.05)
+    ax_roc.set_xlabel('Taux de Faux Positifs (1 - Spécificité)', fontsize=12)
+    ax_roc.set_ylabel('Taux de Vrais Positifs (Sensibilité)', fontsize=12)
+    ax_roc.set_title('Courbe ROC - Classe ÉLEVÉ', fontsize=14, fontweight='bold')
+    ax_roc.legend(loc='lower right')
+    ax_roc.grid(True, alpha=0.3)
+
+    ax_thr.plot(thresholds, tpr, label='Sensibilité (Recall)', color='green', lw=2)
+    ax_thr.plot(thresholds, 1 - fpr, label='Spécificité', color='blue', lw=2)
+    for name, color in (('Youden', 'red'), ('Médical', 'green'), ('Actuel', 'magenta')):
+        if name in markers:
+            ax_thr.axvline(x=markers[name][0], color=color, linestyle='--', label=f'{name}: {markers[name][0]:.3f}')
+    ax_thr.set_xlabel('Seuil de Probabilité', fontsize=12)
+    ax_thr.set_ylabel('Score', fontsize=12)
+    ax_thr.set_title('Sensibilité et Spécificité vs Seuil', fontsize=14, fontweight='bold')
+    ax_thr.legend(loc='best')
+    ax_thr.grid(True, alpha=0.3)
+    ax_thr.set_xlim(0.3, 1.0)
+    return fig
+
+
+# Fichier -> fonction de rendu
+FIGURES = {
+    '1_confusion_matrix.png': render_confusion_matrix,
+    '2_feature_importance.png': render_feature_importance,
+    '3_category_contribution.png': render_category_contribution,
+    '4_performance_metrics.png': render_performance_metrics,
+    '5_roc_curves.png': render_roc_curves,
+    '6_class_distribution.png': render_class_distribution,
+    'roc_analysis_threshold.png': render_roc_threshold,
+}
+
+
+# --- Données des figures (processus principal) ---
+
+def roc_threshold_data(y_true, scores):
+    """
+    Données de la figure d'analyse ROC (courbe, seuils Youden/médical/compromis/actuel)
+
+    Args:
+        y_true: Vrai si le patient est de la classe critique
+        scores: Probabilité de la classe critique
+    """
+    curve = ThresholdCurve(y_true, scores)
+    youden = curve.youden()
+    markers = {'Youden': youden}
+    for name, max_fpr in (('Médical', MEDICAL_MAX_FPR), ('Compromis', COMPROMISE_MAX_FPR)):
+        point = curve.best_at_fpr(max_fpr)
+        if point is not None and point['threshold'] != youden['threshold']:
+            markers[name] = point
+    markers['Actuel'] = curve.at(CURRENT_THRESHOLD)
+    return {
+        'fpr': curve.fpr[1:],
+        'tpr': curve.tpr[1:],
+        'thresholds': curve.thresholds[1:],
+        'auc': curve.auc(),
+        'markers': {name: (p['threshold'], p['fpr'], p['sensitivity']) for name, p in markers.items()}
+    }
+
+
+def figure_data(header, arrays):
+    """
+    Entrées de chaque figure, calculées à partir de l'évaluation enregistrée
+
+    Returns:
+        Dictionnaire {fichier: données} (tableaux NumPy et scalaires seulement)
+    """
+    classes = header['classes']
+    labels = [RISK_LABELS.get(c, str(c)) for c in classes]
+    colors = [CLASS_COLORS.get(c, 'gray') for c in classes]
+    y_test = np.asarray(arrays['y_test'])
+    proba = np.asarray(arrays['test_proba'])
+    y_pred = np.asarray(classes)[np.argmax(proba, axis=1)]
+
+    # Matrice de confusion et métriques par classe
+    index = {c: i for i, c in enumerate(classes)}
+    matrix = np.zeros((len(classes), len(classes)), dtype=np.int64)
+    np.add.at(matrix, ([index[c] for c in y_test], [index[c] for c in y_pred]), 1)
+    tp = np.diag(matrix).astype(np.float64)
+    precision = tp / np.maximum(matrix.sum(axis=0), 1)
+    recall = tp / np.maximum(matrix.sum(axis=1), 1)
+    f1 = 2 * precision * recall / np.maximum(precision + recall, 1e-12)
+
+    data = {
+        '1_confusion_matrix.png': {'matrix': matrix, 'labels': labels},
+        '4_performance_metrics.png': {'labels': labels, 'scores': np.column_stack([precision, recall, f1])},
+        '6_class_distribution.png': {
+            'labels': labels,
+            'colors': colors,
+            'train': (np.array([np.sum(arrays['y_train'] == c) for c in classes])
+                      if 'y_train' in arrays else None),
+            'test': np.array([np.sum(y_test == c) for c in classes])
+        }
+    }
+
+    # Courbes ROC one-vs-rest
+    curves = [ThresholdCurve(y_test == c, proba[:, i]) for i, c in enumerate(classes)]
+    data['5_roc_curves.png'] = {
+        'labels': labels,
+        'colors': colors,
+        'fpr': [curve.fpr for curve in curves],
+        'tpr': [curve.tpr for curve in curves],
+        'auc': [curve.auc() for curve in curves]
+    }
+    if 3 in index:
+        data['roc_analysis_threshold.png'] = roc_threshold_data(y_test == 3, proba[:, index[3]])
+
+    # Importance des features (absente d'un bundle converti sans importances)
+    if 'feature_importances' in arrays:
+        names = np.asarray(header['feature_names'])
+        importances = np.asarray(arrays['feature_importances'])
+        order = np.argsort(-importances, kind='stable')[:15]
+        categories = [c for c in CATEGORY_COLORS if any(feature_category(n) == c for n in names)]
+        shares = np.array([importances[[feature_category(n) == c for n in names]].sum() for c in categories])
+        data['2_feature_importance.png'] = {
+            'names': names[order],
+            'importances': importances[order],
+            'legend': [c for c in categories if any(feature_category(n) == c for n in names[order])]
+        }
+        data['3_category_contribution.png'] = {'categories': categories, 'shares': shares / shares.sum()}
+    return data
+
+
+def content_hash(filename, data, dpi=DPI):
+    """Empreinte des entrées d'une figure: données, code de rendu et résolution"""
+    digest = hashlib.sha256()
+    digest.update(f'{filename}|{dpi}|'.encode('utf-8'))
+    digest.update(inspect.getsource(FIGURES[filename]).encode('utf-8'))
+
+    def update(value):
+        if isinstance(value, dict):
+            for key in sorted(value):
+                digest.update(f'{key}:'.encode('utf-8'))
+                update(value[key])
+        elif isinstance(value, (list, tuple)):
+            digest.update(f'[{len(value)}'.encode('utf-8'))
+            for item in value:
+                update(item)
+        elif isinstance(value, np.ndarray):
+            digest.update(f'{value.dtype.str}{value.shape}'.encode('utf-8'))
+            digest.update(value.tobytes() if value.dtype != object else repr(value.tolist()).encode('utf-8'))
+        else:
+            digest.update(repr(value).encode('utf-8'))
+
+    update(data)
+    return digest.hexdigest()
+
+
+def _init_worker():
+    """Backend non interactif, choisi avant tout import de pyplot"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def render_figure(filename, data, output_dir=REPORT_DIR, dpi=DPI):
+    """
+    Rend une figure dans un PNG (écriture dans un fichier temporaire puis renommage)
+
+    Returns:
+        (fichier, durée en secondes)
+    """
+    _init_worker()
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    with plt.style.context('seaborn-v0_8-whitegrid'):
+        fig = FIGURES[filename](plt, data)
+        fig.tight_layout()
+        path = os.path.join(output_dir, filename)
+        tmp_path = path + '.tmp.png'
+        fig.savefig(tmp_path, dpi=dpi, bbox_inches='tight')
+        plt.close(fig)
+    os.replace(tmp_path, path)
+    return filename, time.perf_counter() - start
+
+
+def read_manifest(output_dir):
+    """Empreintes des figures déjà générées ({} si absent)"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(output_dir, manifest):
+    """Écrit le manifeste (fichier temporaire puis renommage)"""
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def generate_report(header, arrays, output_dir=REPORT_DIR, workers=None, dpi=DPI, force=False):
+    """
+    Génère les figures dont les entrées ont changé, en parallèle
+
+    Args:
+        header, arrays: Évaluation enregistrée (evaluation_bundle.load_evaluation)
+        output_dir: Dossier des PNG
+        workers: Nombre de processus (défaut: nombre de CPU)
+        dpi: Résolution des PNG
+        force: Régénère toutes les figures
+
+    Returns:
+        Dictionnaire: figures générées ({fichier: durée}), figures à jour, durée totale
+    """
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    data = figure_data(header, arrays)
+    manifest = read_manifest(output_dir)
+
+    hashes = {filename: content_hash(filename, figure, dpi) for filename, figure in data.items()}
+    stale = [
+        filename for filename in data
+        if force or manifest.get(filename) != hashes[filename]
+        or not os.path.exists(os.path.join(output_dir, filename))
+    ]
+
+    rendered = {}
+    if stale:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(stale)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(render_figure, filename, data[filename], output_dir, dpi) for filename in stale]
+            for future in futures:
+                filename, elapsed = future.result()
+                rendered[filename] = elapsed
+                manifest[filename] = hashes[filename]
+        write_manifest(output_dir, manifest)
+
+    return {
+        'rendered': rendered,
+        'up_to_date': [filename for filename in data if filename not in rendered],
+        'wall_time': time.perf_counter() - start
+    }
+
+
+def parse_args():
+    """Arguments de la ligne de commande"""
+    parser = argparse.ArgumentParser(description="Génère les visualisations du modèle (backend Agg, en parallèle)")
+    parser.add_argument('--model', default=MODEL_PATH, help="Modèle dont l'évaluation est tracée")
+    parser.add_argument('--data', default=DATA_PATH, help="CSV utilisé si l'évaluation doit être recalculée")
+    parser.add_argument('--output', default=REPORT_DIR, help='Dossier des PNG')
+    parser.add_argument('--workers', type=int, default=None, help='Processus de rendu (défaut: nombre de CPU)')
+    parser.add_argument('--dpi', type=int, default=DPI, help='Résolution des PNG')
+    parser.add_argument('--force', action='store_true', help='Régénère toutes les figures')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    start = time.perf_counter()
+    header, arrays = load_or_score(args.model, args.data)
+    report = generate_report(header, arrays, args.output, args.workers, args.dpi, args.force)
+
+    for filename, elapsed in report['rendered'].items():
+        print(f"   ✅ {os.path.join(args.output, filename)} ({elapsed:.2f} s)")
+    for filename in report['up_to_date']:
+        print(f"   ⏭️  {os.path.join(args.output, filename)} (à jour)")
+    print(f"\n📊 Rapport: {len(report['rendered'])} figure(s) générée(s), {len(report['up_to_date'])} à jour "
+          f"en {time.perf_counter() - start:.2f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    print("="*70)
+    print("GÉNÉRATION DU RAPPORT DE VISUALISATIONS")
+    print("="*70)
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""
+Configuration gunicorn du backend (mode production)
+
+Lancement: gunicorn -c gunicorn.conf.py main:app
+
+Le modèle est chargé une seule fois dans le processus maître (preload_app +
+on_starting) puis partagé en copy-on-write par les workers forkés.
+
+Variables d'environnement:
+- ASTHMA_WORKERS: nombre de processus workers (défaut: 1)
+- ASTHMA_THREADS: threads par worker (défaut: 4)
+- ASTHMA_BIND: adresse d'écoute (défaut: 0.0.0.0:5000)
+- ASTHMA_TIMEOUT: délai maximal d'une requête en secondes (défaut: 30)
+
+Attention: les lectures capteurs (/api/sensors) et le cache de prédictions
+restent en mémoire dans chaque worker. D'où un seul worker par défaut:
+plusieurs workers ne conviennent que si chaque requête de prédiction joint
+ses propres lectures, sinon augmenter ASTHMA_THREADS.
+"""
+import gc
+import os
+
+bind = os.environ.get('ASTHMA_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('ASTHMA_WORKERS', '1'))
+threads = int(os.environ.get('ASTHMA_THREADS', '4'))
+worker_class = 'gthread'
+timeout = int(os.environ.get('ASTHMA_TIMEOUT', '30'))
+
+# Importer main.py dans le maître avant le fork
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    """Précharge le modèle dans le maître, avant la création des workers"""
+    import main
+    main.warmup()
+
+    # Sortir les objets du préchargement du suivi du GC: les collectes dans
+    # les workers ne touchent plus leurs pages, qui restent partagées
+    gc.collect()
+    gc.freeze()
+    server.log.info("Modèle préchargé: %d workers x %d threads", server.cfg.workers, server.cfg.threads)
+
+
+def post_fork(server, worker):
+    """Surveillance de l'artefact dans chaque worker (les threads du maître ne sont pas hérités)"""
+    import main
+    main.start_model_watcher()
@@ -0,0 +1,183 @@
+"""
+Recherche d'hyperparamètres de la Random Forest en parallèle
+
+Chaque couple (configuration, fold) est entraîné dans un pool de processus.
+Les indices des folds sont calculés une seule fois et partagés par toutes
+les configurations; les données sont envoyées une fois à chaque worker.
+
+Le modèle est choisi sur un critère clinique: le rappel de la classe
+critique (3 = Élevé) à taux de faux positifs fixé (MAX_FPR).
+"""
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from model import DEFAULT_FOREST_PARAMS
+from threshold_eval import ThresholdCurve
+from streaming_loader import peak_rss_mb, reset_peak_rss
+
+# Espace de recherche par défaut (surchargé par un fichier JSON, voir train_model.py)
+DEFAULT_SEARCH_SPACE = {
+    'n_estimators': [151],
+    'max_depth': [8, 12, 16],
+    'min_samples_split': [2, 5],
+    'critical_weight': [1.0, 1.5],  # Poids de la classe 3 (class_weight)
+}
+
+# Taux de faux positifs toléré pour l'alerte critique
+MAX_FPR = 0.02
+
+# Classe critique évaluée
+CRITICAL_CLASS = 3
+
+_worker_data = {}
+
+
+def expand_search_space(space):
+    """
+    Produit cartésien de l'espace de recherche
+
+    Args:
+        space: Dictionnaire {hyperparamètre: liste de valeurs}
+
+    Returns:
+        Liste de dictionnaires de paramètres RandomForestClassifier
+        (complétés par DEFAULT_FOREST_PARAMS)
+    """
+    names = sorted(space)
+    configs = []
+    for values in itertools.product(*(space[name] for name in names)):
+        params = dict(DEFAULT_FOREST_PARAMS, **dict(zip(names, values)))
+        if 'critical_weight' in params:
+            params['class_weight'] = {1: 1.0, 2: 1.0, CRITICAL_CLASS: params.pop('critical_weight')}
+        configs.append(params)
+    return configs
+
+
+def recall_at_fpr(y_true, scores, max_fpr=MAX_FPR):
+    """
+    Meilleur rappel atteignable sans dépasser un taux de faux positifs
+
+    Args:
+        y_true: Vrai si l'échantillon est de la classe critique
+        scores: Probabilité de la classe critique
+        max_fpr: Taux de faux positifs maximal
+
+    Returns:
+        (rappel, seuil): seuil de probabilité correspondant (score >= seuil)
+    """
+    best = ThresholdCurve(y_true, scores).best_at_fpr(max_fpr)
+    if best is None:
+        return 0.0, 1.0
+    return best['sensitivity'], best['threshold']
+
+
+def _init_worker(X, y):
+    """Reçoit les données une fois par processus du pool"""
+    _worker_data['X'] = X
+    _worker_data['y'] = y
+
+
+def _evaluate(config_id, fold_id, params, train_idx, val_idx, random_state, max_fpr):
+    """
+    Entraîne une configuration sur un fold et l'évalue
+
+    Returns:
+        Dictionnaire de résultats (métriques, temps, mémoire)
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y = _worker_data['X'], _worker_data['y']
+    # Le worker est réutilisé: son pic doit repartir de zéro pour cette évaluation
+    peak_measured = reset_peak_rss()
+    start = time.perf_counter()
+    model = RandomForestClassifier(random_state=random_state, n_jobs=1, **params)
+    model.fit(X[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - start
+
+    proba = model.predict_proba(X[val_idx])
+    y_val = y[val_idx]
+    critical_scores = proba[:, list(model.classes_).index(CRITICAL_CLASS)]
+    recall, threshold = recall_at_fpr(y_val == CRITICAL_CLASS, critical_scores, max_fpr)
+
+    return {
+        'config_id': config_id,
+        'fold': fold_id,
+        'recall_at_fpr': recall,
+        'threshold_at_fpr': threshold,
+        'accuracy': float(np.mean(model.classes_.take(np.argmax(proba, axis=1)) == y_val)),
+        'n_nodes': int(sum(tree.tree_.node_count for tree in model.estimators_)),
+        'wall_time': time.perf_counter() - start,
+        'fit_time': fit_time,
+        # Pic de mémoire résidente pendant cette évaluation, mémoire déjà résidente
+        # du worker comprise (None si le pic n'a pas pu être remis à zéro)
+        'peak_rss_mb': peak_rss_mb() if peak_measured else None,
+        'pid': os.getpid()
+    }
+
+
+def run_search(X, y, search_space=None, n_splits=5, random_state=42, n_jobs=None, max_fpr=MAX_FPR):
+    """
+    Évalue toutes les configurations sur tous les folds en parallèle
+
+    Args:
+        X: Features d'entraînement (DataFrame ou tableau)
+        y: Cible
+        search_space: Espace de recherche (défaut: DEFAULT_SEARCH_SPACE)
+        n_splits: Nombre de folds stratifiés
+        random_state: Seed (folds et forêts)
+        n_jobs: Nombre de processus (défaut: nombre de coeurs)
+        max_fpr: Taux de faux positifs de référence pour le rappel critique
+
+    Returns:
+        (best, summary, runs): meilleure configuration, résumé par
+        configuration trié du meilleur au moins bon, résultats par fold
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    # float32: type interne des arbres sklearn (pas de copie au fit dans les workers)
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    configs = expand_search_space(search_space or DEFAULT_SEARCH_SPACE)
+
+    # Folds calculés une fois, réutilisés par toutes les configurations
+    folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(X, y))
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    print(f"🔍 Recherche: {len(configs)} configurations x {n_splits} folds = "
+          f"{len(configs) * n_splits} entraînements sur {n_jobs} processus")
+
+    start = time.perf_counter()
+    runs = []
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(X, y)) as pool:
+        futures = [
+            pool.submit(_evaluate, config_id, fold_id, params, train_idx, val_idx, random_state, max_fpr)
+            for config_id, params in enumerate(configs)
+            for fold_id, (train_idx, val_idx) in enumerate(folds)
+        ]
+        for future in as_completed(futures):
+            runs.append(future.result())
+    elapsed = time.perf_counter() - start
+
+    summary = []
+    for config_id, params in enumerate(configs):
+        config_runs = [r for r in runs if r['config_id'] == config_id]
+        recalls = np.array([r['recall_at_fpr'] for r in config_runs])
+        peaks = [r['peak_rss_mb'] for r in config_runs]
+        summary.append({
+            'config_id': config_id,
+            'params': params,
+            'recall_at_fpr_mean': float(recalls.mean()),
+            'recall_at_fpr_std': float(recalls.std()),
+            'accuracy_mean': float(np.mean([r['accuracy'] for r in config_runs])),
+            'n_nodes_mean': float(np.mean([r['n_nodes'] for r in config_runs])),
+            'fit_time_total': float(sum(r['fit_time'] for r in config_runs)),
+            'peak_rss_mb': None if None in peaks else float(max(peaks))
+        })
+
+    # Critère clinique d'abord, puis accuracy, puis forêt la plus petite (inférence)
+    summary.sort(key=lambda s: (-s['recall_at_fpr_mean'], -s['accuracy_mean'], s['n_nodes_mean']))
+    print(f"⏱️  Recherche terminée en {elapsed:.1f} s")
+
+    return summary[0], summary, sorted(runs, key=lambda r: (r['config_id'], r['fold']))
@@ -0,0 +1,296 @@
+"""
+Instrumentation du service: histogrammes de latence, compteurs et journal échantillonné
+
+ServiceMetrics enregistre la durée de chaque étape d'une prédiction
+(lecture du JSON, validation de la requête, encodage des features,
+évaluation de la forêt, recommandations, sérialisation), le nombre de
+requêtes et d'erreurs par endpoint et l'âge des données capteurs utilisées.
+Les compteurs sont exposés au format texte Prometheus (GET /metrics).
+
+SampledLogger remplace les print() du chemin de requête: un événement sur
+N est écrit en JSON par ligne, par un thread dédié (l'écriture sur stdout
+ne bloque plus la requête). Les alertes critiques ne sont pas échantillonnées.
+
+Les métriques sont propres à chaque processus (un jeu par worker gunicorn).
+
+Variables d'environnement:
+- ASTHMA_METRICS: 0 désactive l'enregistrement des métriques (défaut: 1)
+- ASTHMA_REQUEST_LOG: 0 désactive le journal des requêtes (défaut: 1)
+- ASTHMA_LOG_SAMPLE_RATE: fraction des requêtes journalisées (défaut: 0.01)
+"""
+import atexit
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+# Bornes des histogrammes (secondes)
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SENSOR_AGE_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 900, 1800, 3600, 21600, 86400)
+
+
+def _escape(value):
+    """Échappe une valeur de label Prometheus"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    """Labels Prometheus triés: {a="x",b="y"} (vide sans label)"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + '}'
+
+
+def _number(value):
+    """Valeur numérique au format Prometheus"""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes (compatible Prometheus)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        Args:
+            buckets: Bornes supérieures croissantes (la borne +Inf est implicite)
+        """
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Ajoute une observation"""
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """
+        Returns:
+            (comptes cumulés par borne, +Inf comprise, somme, nombre)
+        """
+        with self._lock:
+            counts, total, count = list(self._counts), self.sum, self.count
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class ServiceMetrics:
+    """Latence par étape, requêtes et erreurs par endpoint, âge des données capteurs"""
+
+    def __init__(self, enabled=True):
+        """
+        Args:
+            enabled: Faux pour ignorer toutes les observations
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.stages = {}  # étape -> Histogram
+        self.request_latency = {}  # endpoint -> Histogram
+        self.requests = {}  # (endpoint, méthode, statut) -> nombre
+        self.errors = {}  # (endpoint, statut) -> nombre
+        self.sensor_age = Histogram(SENSOR_AGE_BUCKETS)
+
+    def _histogram(self, table, key, buckets=LATENCY_BUCKETS):
+        """Histogramme d'une table, créé à la première observation"""
+        histogram = table.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def observe_stage(self, stage, seconds):
+        """Durée d'une étape de prédiction"""
+        if self.enabled:
+            self._histogram(self.stages, stage).observe(seconds)
+
+    def observe_request(self, endpoint, method, status, seconds):
+        """Requête terminée (les statuts >= 400 comptent aussi comme erreurs)"""
+        if not self.enabled:
+            return
+        self._histogram(self.request_latency, endpoint).observe(seconds)
+        with self._lock:
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if status >= 400:
+                key = (endpoint, status)
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def observe_sensor_age(self, seconds):
+        """Âge de la lecture capteur utilisée par une prédiction"""
+        if self.enabled:
+            self.sensor_age.observe(max(seconds, 0.0))
+
+    def stage_timer(self, stage):
+        """Context manager mesurant la durée d'une étape"""
+        return _StageTimer(self, stage)
+
+    def render(self, gauges=()):
+        """
+        Métriques au format texte Prometheus (version 0.0.4)
+
+        Args:
+            gauges: Jauges supplémentaires calculées au moment de la lecture,
+                    tuples (nom, aide, [(labels, valeur), ...])
+
+        Returns:
+            Texte de la réponse /metrics
+        """
+        lines = []
+        with self._lock:
+            stages = sorted(self.stages.items())
+            latencies = sorted(self.request_latency.items())
+            requests, errors = sorted(self.requests.items()), sorted(self.errors.items())
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, histogram, **labels):
+            cumulative, total, count = histogram.snapshot()
+            for bound, running in zip(histogram.buckets + (float('inf'),), cumulative):
+                lines.append(f'{name}_bucket{_labels(le=_number(bound), **labels)} {running}')
+            lines.append(f'{name}_sum{_labels(**labels)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(**labels)} {count}')
+
+        family('asthma_stage_latency_seconds', 'histogram', "Durée de chaque étape d'une prédiction")
+        for stage, h in stages:
+            histogram('asthma_stage_latency_seconds', h, stage=stage)
+
+        family('asthma_request_latency_seconds', 'histogram', 'Durée totale des requêtes par endpoint')
+        for endpoint, h in latencies:
+            histogram('asthma_request_latency_seconds', h, endpoint=endpoint)
+
+        family('asthma_requests_total', 'counter', 'Requêtes traitées par endpoint, méthode et statut')
+        for (endpoint, method, status), n in requests:
+            lines.append(f'asthma_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {n}')
+
+        family('asthma_request_errors_total', 'counter', 'Réponses en erreur (statut >= 400) par endpoint')
+        for (endpoint, status), n in errors:
+            lines.append(f'asthma_request_errors_total{_labels(endpoint=endpoint, status=status)} {n}')
+
+        family('asthma_sensor_data_age_seconds', 'histogram', 'Âge des données capteurs utilisées par les prédictions')
+        histogram('asthma_sensor_data_age_seconds', self.sensor_age)
+
+        for name, help_text, samples in gauges:
+            family(name, 'gauge', help_text)
+            for labels, value in samples:
+                lines.append(f'{name}{_labels(**labels)} {_number(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class _StageTimer:
+    """Mesure d'une étape (perf_counter), enregistrée à la sortie du bloc"""
+
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe_stage(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class SampledLogger:
+    """Journal JSON par ligne, échantillonné et écrit par un thread dédié"""
+
+    def __init__(self, sample_rate=0.01, enabled=True, stream=None):
+        """
+        Args:
+            sample_rate: Fraction des événements échantillonnés écrits (0 = aucun)
+            enabled: Faux pour ne rien écrire (alertes comprises)
+            stream: Flux de sortie (défaut: sys.stdout au moment de l'écriture)
+        """
+        self.sample_rate = sample_rate
+        self.enabled = enabled
+        self.stream = stream
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self._writer_pid = None
+        self._start_lock = threading.Lock()
+        self.logged = 0
+        self.sampled_out = 0
+
+    def log(self, event, always=False, **fields):
+        """
+        Journalise un événement (pour une fraction sample_rate des appels)
+
+        Args:
+            event: Nom de l'événement (ex: 'prediction', 'critical_alert')
+            always: Vrai pour ignorer l'échantillonnage (alertes critiques)
+            **fields: Champs JSON de l'événement
+        """
+        if not self.enabled:
+            return
+        if not always and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            self.sampled_out += 1
+            return
+
+        self.logged += 1
+        fields['event'] = event
+        fields['ts'] = time.time()
+        self._ensure_writer()
+        self._queue.put(fields)
+
+    def _ensure_writer(self):
+        """Démarre le thread d'écriture (un par processus: les threads ne survivent pas au fork)"""
+        if self._writer_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer = threading.Thread(target=self._write_loop, name='request-log', daemon=True)
+            self._writer.start()
+            self._writer_pid = os.getpid()
+
+    def _write_loop(self):
+        """Sérialise et écrit les événements de la file"""
+        while True:
+            fields = self._queue.get()
+            if fields is None:
+                return
+            stream = self.stream or sys.stdout
+            try:
+                stream.write(json.dumps(fields, ensure_ascii=False, default=str) + '\n')
+                stream.flush()
+            except (OSError, ValueError):
+                pass
+
+    def flush(self, timeout=1.0):
+        """Écrit les événements en attente et arrête le thread d'écriture"""
+        if self._writer is None or self._writer_pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._writer.join(timeout)
+        self._writer = None
+        self._writer_pid = None
+
+
+# Instances du processus, partagées par main.py, main_async.py et model.py
+metrics = ServiceMetrics(enabled=os.environ.get('ASTHMA_METRICS', '1') != '0')
+request_log = SampledLogger(
+    sample_rate=float(os.environ.get('ASTHMA_LOG_SAMPLE_RATE', '0.01')),
+    enabled=os.environ.get('ASTHMA_REQUEST_LOG', '1') != '0'
+)
+atexit.register(request_log.flush)
@@ -0,0 +1,115 @@
+"""
+Stockage des cas labellisés par les cliniciens (collectés en production)
+
+Les cas sont ajoutés à la fin d'un CSV (mêmes colonnes que le dataset
+d'entraînement + 'Asthma' + 'collected_at'), une ligne par appel write():
+plusieurs workers peuvent ajouter des cas au même fichier.
+
+Un fichier de progression (<csv>.trained) retient le nombre de lignes déjà
+intégrées au modèle: l'entraînement incrémental ne lit que les suivantes.
+"""
+import os
+import threading
+from datetime import datetime
+
+TARGET_COLUMN = 'Asthma'
+TIMESTAMP_COLUMN = 'collected_at'
+RISK_LEVELS = (1, 2, 3)
+
+
+class LabeledCaseStore:
+    """Dataset croissant des cas labellisés (CSV en ajout seul)"""
+
+    def __init__(self, path, feature_names):
+        """
+        Args:
+            path: Fichier CSV du dataset (créé avec son en-tête au premier ajout)
+            feature_names: Colonnes de features, dans l'ordre du modèle
+        """
+        self.path = path
+        self.feature_names = list(feature_names)
+        self.columns = self.feature_names + [TARGET_COLUMN, TIMESTAMP_COLUMN]
+        self._lock = threading.Lock()
+
+    @property
+    def progress_path(self):
+        """Fichier du nombre de lignes déjà intégrées au modèle"""
+        return self.path + '.trained'
+
+    def _ensure_header(self):
+        """Crée le fichier avec son en-tête s'il n'existe pas (création exclusive)"""
+        if os.path.exists(self.path):
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        try:
+            with open(self.path, 'x', encoding='utf-8') as f:
+                f.write(','.join(self.columns) + '\n')
+        except FileExistsError:
+            pass
+
+    def append(self, features, label, collected_at=None):
+        """
+        Ajoute un cas labellisé
+
+        Args:
+            features: Dictionnaire des features du modèle
+            label: Niveau de risque confirmé par le clinicien (1, 2 ou 3)
+            collected_at: Horodatage ISO (défaut: maintenant)
+
+        Raises:
+            KeyError: feature manquante
+            ValueError: label ou valeur de feature invalide
+        """
+        if label not in RISK_LEVELS:
+            raise ValueError(f"Label invalide: {label} (attendu: {RISK_LEVELS})")
+        values = [float(features[name]) for name in self.feature_names]
+        line = ','.join([repr(v) for v in values] + [str(int(label)), collected_at or datetime.now().isoformat()])
+
+        with self._lock:
+            self._ensure_header()
+            # Une seule écriture en mode ajout: ligne jamais entrelacée avec un autre worker
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    def count(self):
+        """Nombre de cas enregistrés"""
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'rb') as f:
+            return max(sum(1 for _ in f) - 1, 0)
+
+    def trained_rows(self):
+        """Nombre de cas déjà intégrés au modèle"""
+        try:
+            with open(self.progress_path, encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def mark_trained(self, rows):
+        """Enregistre que les `rows` premiers cas sont intégrés au modèle (écriture atomique)"""
+        tmp_path = self.progress_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(int(rows)))
+        os.replace(tmp_path, self.progress_path)
+
+    def read(self, start=0):
+        """
+        Lit les cas à partir d'une position
+
+        Args:
+            start: Nombre de cas à ignorer (ex: trained_rows())
+
+        Returns:
+            (X, y, end): features (DataFrame), labels (Series) et position
+            de fin à passer à mark_trained()
+        """
+        import pandas as pd
+
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=self.feature_names), pd.Series(dtype=int, name=TARGET_COLUMN), 0
+
+        df = pd.read_csv(self.path, skiprows=range(1, start + 1))
+        X = df[self.feature_names]
+        y = df[TARGET_COLUMN].astype(int)
+        return X, y, start + len(df)
@@ -0,0 +1,314 @@
+"""
+Index de prédiction précalculé sur le sous-espace discret des features
+
+Sur les 18 features, 14 sont binaires (symptômes et one-hot âge/genre).
+Pour chaque combinaison de ces features binaires, seuls certains noeuds de
+la forêt restent atteignables: on précalcule, au chargement du modèle, les
+seuils de split atteignables sur les 4 capteurs continus.
+
+Les seuils d'une combinaison découpent l'espace des capteurs en cellules
+dans lesquelles la forêt suit exactement les mêmes chemins: la prédiction
+y est constante. Une requête se résout donc par une recherche d'intervalle
+(searchsorted) sur chaque capteur puis une lecture dans la table des
+cellules. Une cellule encore inconnue est évaluée une fois par la forêt
+puis mémorisée.
+"""
+import itertools
+import threading
+import numpy as np
+
+# Features continues (capteurs): toutes les autres sont binaires
+CONTINUOUS_FEATURES = ['Humidity', 'Temperature', 'PM25', 'RespiratoryRate']
+
+# Groupes one-hot: au plus une colonne à 1 par groupe (aucune si inconnu)
+ONE_HOT_PREFIXES = ('Age_', 'Gender_')
+
+
+class DiscreteLookupIndex:
+    """Table de prédictions indexée par combinaison binaire et cellule capteurs"""
+
+    def __init__(self, engine, feature_names, continuous_features=None, max_cells=200000):
+        """
+        Construit l'index à partir du moteur compilé
+
+        Args:
+            engine: CompiledForest du modèle
+            feature_names: Noms des features dans l'ordre du modèle
+            continuous_features: Features continues (par défaut CONTINUOUS_FEATURES)
+            max_cells: Nombre maximal de cellules mémorisées dans la table
+        """
+        continuous_features = continuous_features or CONTINUOUS_FEATURES
+
+        self.engine = engine
+        self.feature_names = list(feature_names)
+        self.max_cells = max_cells
+        self.continuous_cols = np.array(
+            [self.feature_names.index(name) for name in continuous_features], dtype=np.intp
+        )
+        self.binary_cols = np.array(
+            [i for i, name in enumerate(self.feature_names) if name not in continuous_features],
+            dtype=np.intp
+        )
+        # Code entier d'une combinaison binaire: somme des bits pondérés
+        self.bit_weights = (1 << np.arange(len(self.binary_cols), dtype=np.int64))
+
+        self.thresholds = {}  # code combinaison -> liste de seuils triés par capteur
+        self.cells = {}  # (code, index d'intervalle par capteur) -> probabilités
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+        self._build()
+
+    def _enumerate_combinations(self):
+        """
+        Énumère les combinaisons binaires valides (au plus un 1 par groupe one-hot)
+
+        Returns:
+            Matrice uint8 (n_combinaisons, n_features_binaires)
+        """
+        binary_names = [self.feature_names[i] for i in self.binary_cols]
+        groups = [
+            [j for j, name in enumerate(binary_names) if name.startswith(prefix)]
+            for prefix in ONE_HOT_PREFIXES
+        ]
+        grouped = {j for group in groups for j in group}
+        free = [j for j in range(len(binary_names)) if j not in grouped]
+
+        choices = [[(j, v) for v in (0, 1)] for j in free]
+        choices += [[(group[0], 0)] + [(j, 1) for j in group] for group in groups if group]
+
+        combos = []
+        for assignment in itertools.product(*choices):
+            combo = np.zeros(len(binary_names), dtype=np.uint8)
+            for j, v in assignment:
+                combo[j] = v
+            combos.append(combo)
+        return np.array(combos, dtype=np.uint8)
+
+    def _build(self):
+        """Calcule les seuils capteurs atteignables pour chaque combinaison"""
+        engine = self.engine
+        combos = self._enumerate_combinations()
+        n_combos = len(combos)
+
+        # Position de chaque feature dans binary_cols / continuous_cols (-1 sinon)
+        binary_pos = np.full(len(self.feature_names), -1, dtype=np.intp)
+        binary_pos[self.binary_cols] = np.arange(len(self.binary_cols))
+        continuous_pos = np.full(len(self.feature_names), -1, dtype=np.intp)
+        continuous_pos[self.continuous_cols] = np.arange(len(self.continuous_cols))
+
+        tree_ends = np.append(engine.roots[1:], len(engine.feature))
+        pair_combos, pair_slots, pair_thresholds = [], [], []
+
+        for root, end in zip(engine.roots, tree_ends):
+            n_nodes = end - root
+            is_leaf = engine.children_left[root:end] == np.arange(root, end)
+
+            # reach[n, c]: le noeud n est atteignable pour la combinaison c
+            reach = np.zeros((n_nodes, n_combos), dtype=bool)
+            reach[0] = True
+            level = np.array([0], dtype=np.intp)
+
+            while len(level):
+                level = level[~is_leaf[level]]
+                if not len(level):
+                    break
+                nodes = level + root
+                features = engine.feature[nodes]
+                bpos = binary_pos[features]
+                is_binary = bpos >= 0
+
+                go_left = np.ones((len(level), n_combos), dtype=bool)
+                go_right = np.ones((len(level), n_combos), dtype=bool)
+                if is_binary.any():
+                    values = combos[:, bpos[is_binary]].T
+                    left_binary = values <= engine.threshold[nodes[is_binary], np.newaxis]
+                    go_left[is_binary] = left_binary
+                    go_right[is_binary] = ~left_binary
+
+                left = engine.children_left[nodes] - root
+                right = engine.children_right[nodes] - root
+                reach[left] = reach[level] & go_left
+                reach[right] = reach[level] & go_right
+                level = np.concatenate([left, right])
+
+            # Seuils capteurs atteignables pour chaque combinaison
+            internal = np.flatnonzero(~is_leaf)
+            continuous_nodes = internal[continuous_pos[engine.feature[internal + root]] >= 0]
+            node_idx, combo_idx = np.nonzero(reach[continuous_nodes])
+            nodes = continuous_nodes[node_idx] + root
+            pair_combos.append(combo_idx)
+            pair_slots.append(continuous_pos[engine.feature[nodes]])
+            pair_thresholds.append(engine.threshold[nodes])
+
+        pair_combos = np.concatenate(pair_combos)
+        pair_slots = np.concatenate(pair_slots)
+        pair_thresholds = np.concatenate(pair_thresholds)
+
+        # Trier par (combinaison, capteur, seuil) puis dédoublonner
+        order = np.lexsort((pair_thresholds, pair_slots, pair_combos))
+        pair_combos = pair_combos[order]
+        pair_slots = pair_slots[order]
+        pair_thresholds = pair_thresholds[order]
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = (
+            (pair_combos[1:] != pair_combos[:-1]) |
+            (pair_slots[1:] != pair_slots[:-1]) |
+            (pair_thresholds[1:] != pair_thresholds[:-1])
+        )
+        pair_combos = pair_combos[keep]
+        pair_slots = pair_slots[keep]
+        pair_thresholds = pair_thresholds[keep]
+
+        n_slots = len(self.continuous_cols)
+        bounds = np.searchsorted(pair_combos * n_slots + pair_slots, np.arange(n_combos * n_slots + 1))
+        codes = combos.astype(np.int64) @ self.bit_weights
+
+        for c, code in enumerate(codes):
+            self.thresholds[int(code)] = [
+                pair_thresholds[bounds[c * n_slots + s]:bounds[c * n_slots + s + 1]]
+                for s in range(n_slots)
+            ]
+
+    def _cell_key(self, row):
+        """
+        Clé de cellule d'une ligne, ou None si sa combinaison n'est pas indexée
+
+        Args:
+            row: Ligne float32 (n_features,)
+        """
+        binary = row[self.binary_cols]
+        if not np.all((binary == 0) | (binary == 1)):
+            return None
+
+        code = int(binary.astype(np.int64) @ self.bit_weights)
+        thresholds = self.thresholds.get(code)
+        if thresholds is None:
+            return None
+
+        # Nombre de seuils strictement inférieurs: détermine tous les tests x <= seuil
+        sensors = row[self.continuous_cols].astype(np.float64)
+        intervals = tuple(
+            int(np.searchsorted(thr, value, side='left'))
+            for thr, value in zip(thresholds, sensors)
+        )
+        return (code,) + intervals
+
+    def predict_proba(self, X):
+        """
+        Probabilités par classe via la table (forêt en secours)
+
+        Args:
+            X: Matrice (n_samples, n_features) ou ligne unique
+
+        Returns:
+            proba: Tableau (n_samples, n_classes)
+        """
+        # Même conversion float32 que la forêt pour des cellules exactes
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        proba = np.empty((X.shape[0], len(self.engine.classes_)), dtype=np.float64)
+        pending_rows, pending_keys = [], []
+
+        for i, row in enumerate(X):
+            key = self._cell_key(row)
+            cached = self.cells.get(key) if key is not None else None
+            if cached is not None:
+                proba[i] = cached
+                self.hits += 1
+            else:
+                pending_rows.append(i)
+                pending_keys.append(key)
+
+        if pending_rows:
+            computed = self.engine.predict_proba(X[pending_rows])
+            proba[pending_rows] = computed
+            with self._lock:
+                for key, value in zip(pending_keys, computed):
+                    if key is None:
+                        self.fallbacks += 1
+                        continue
+                    self.misses += 1
+                    if len(self.cells) < self.max_cells:
+                        value.setflags(write=False)
+                        self.cells[key] = value
+
+        return proba
+
+    def _cell_representative(self, row, key):
+        """
+        Point canonique de la cellule d'une ligne (borne supérieure de chaque intervalle)
+
+        Args:
+            row: Ligne float32 (n_features,)
+            key: Clé de cellule de la ligne
+
+        Returns:
+            Ligne float32 différente de row sur les capteurs mais dans la même cellule
+        """
+        probe = row.copy()
+        for col, thr, interval in zip(self.continuous_cols, self.thresholds[key[0]], key[1:]):
+            if interval < len(thr):
+                # Plus grand float32 <= seuil: satisfait encore x <= seuil
+                value = np.float32(thr[interval])
+                if value > thr[interval]:
+                    value = np.nextafter(value, np.float32(-np.inf))
+            elif len(thr):
+                # Plus petit float32 > dernier seuil
+                value = np.float32(thr[-1])
+                if value <= thr[-1]:
+                    value = np.nextafter(value, np.float32(np.inf))
+            else:
+                value = np.float32(0.0)
+            probe[col] = value
+        return probe
+
+    def verify(self, X):
+        """
+        Vérifie que l'index donne les mêmes probabilités que la forêt
+
+        Une table locale est construite à partir d'un point canonique de
+        chaque cellule (et non des lignes elles-mêmes), puis chaque ligne est
+        lue dans cette table et comparée à l'évaluation directe de la forêt.
+        La table et les compteurs de l'index en service ne sont pas modifiés.
+
+        Args:
+            X: Matrice (n_samples, n_features), ex: dataset d'entraînement
+
+        Returns:
+            Dictionnaire avec le nombre de lignes, de lectures en table,
+            de lignes hors index, de désaccords et l'écart maximal
+        """
+        X = np.asarray(X, dtype=np.float32)
+        keys = [self._cell_key(row) for row in X]
+        indexed = [i for i, key in enumerate(keys) if key is not None]
+
+        forest = self.engine.predict_proba(X)
+        lookup = forest.copy()  # Lignes hors index: forêt en secours, comme predict_proba
+        if indexed:
+            probes = np.array([self._cell_representative(X[i], keys[i]) for i in indexed])
+            cells = dict(zip((keys[i] for i in indexed), self.engine.predict_proba(probes)))
+            lookup[indexed] = [cells[keys[i]] for i in indexed]
+        diff = np.abs(lookup - forest).max(axis=1)
+
+        return {
+            'rows': len(X),
+            'table_hits': len(indexed),
+            'fallbacks': len(X) - len(indexed),
+            'mismatches': int((diff != 0).sum()),
+            'max_abs_diff': float(diff.max()) if len(diff) else 0.0
+        }
+
+    def stats(self):
+        """Statistiques d'utilisation de l'index"""
+        return {
+            'combinations': len(self.thresholds),
+            'cells': len(self.cells),
+            'hits': self.hits,
+            'misses': self.misses,
+            'fallbacks': self.fallbacks
+        }
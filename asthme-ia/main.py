@@ -2,9 +2,21 @@
 API Flask pour E-Santé 4.0 - Prédiction du risque d'asthme
 Backend SIMPLIFIÉ : Uniquement prédictions ML, pas de base de données
 """
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
+from datetime import datetime
+import hmac
+import numpy as np
+import os
+import time
 from model import AsthmaPredictor
+from model_manager import ModelManager
+from prediction_cache import PredictionCache, parse_quantization
+from sensor_store import SensorStore, SensorReading, DEFAULT_DEVICE_ID
+from labeled_store import LabeledCaseStore
+import sensor_ingest
+from instrumentation import metrics, request_log
+from request_profiler import RequestProfiler, PROFILE_MODES
 
 # Créer l'application Flask
 app = Flask(__name__)
@@ -13,16 +25,111 @@ CORS(app)
 # Initialiser le prédicteur d'asthme avec le modèle optimisé
 # Seuil critique à 0.443 (Youden optimal, basé sur analyse ROC)
 # Sensibilité: 96.7%, Spécificité: 98.8%, FPR: 1.2%
-predictor = AsthmaPredictor(model_path='models/asthma_model.pkl', high_risk_threshold=0.443)
+# ASTHMA_INFERENCE_MODE=lookup active l'index précalculé (voir lookup_index.py)
+# Cache LRU des prédictions: ASTHMA_CACHE_SIZE (0 = désactivé), ASTHMA_CACHE_TTL (s),
+# ASTHMA_CACHE_QUANTIZATION (ex: "Humidity=0.5,Temperature=0.1,PM25=1")
+# Rechargement à chaud: ASTHMA_MODEL_WATCH_INTERVAL (s, 0 = pas de surveillance du
+# fichier), ASTHMA_ADMIN_TOKEN (active /api/admin/reload, /api/admin/model et POST /api/labels)
+# Cas labellisés par les cliniciens: ASTHMA_LABELED_CASES_PATH (voir train_incremental.py)
+# Observabilité (GET /metrics, voir instrumentation.py): ASTHMA_METRICS (0 = désactivé),
+# journal JSON échantillonné des requêtes: ASTHMA_REQUEST_LOG (0 = désactivé), ASTHMA_LOG_SAMPLE_RATE
+# Profilage (voir request_profiler.py): ASTHMA_PROFILE (cprofile, sampling, tracemalloc) profile
+# les ASTHMA_PROFILE_REQUESTS prochaines prédictions; rapports écrits dans ASTHMA_PROFILE_DIR
+# (optionnel) et lus via GET /api/admin/profiles
+cache_size = int(os.environ.get('ASTHMA_CACHE_SIZE', '4096'))
+MODEL_WATCH_INTERVAL = float(os.environ.get('ASTHMA_MODEL_WATCH_INTERVAL', '10'))
+ADMIN_TOKEN = os.environ.get('ASTHMA_ADMIN_TOKEN')
+MODELS_DIR = os.path.realpath('models')
+LABELED_CASES_PATH = os.environ.get('ASTHMA_LABELED_CASES_PATH', 'data/labeled_cases.csv')
+PROFILE_MODE = os.environ.get('ASTHMA_PROFILE')
 
-# Stockage en mémoire des dernières données capteurs
-latest_sensor_data = {
-    'temperature': None,
-    'humidity': None,
-    'pm25': None,
-    'respiratoryRate': 0.0,  # Valeur par défaut 0 si pas de capteur
-    'timestamp': None
-}
+def create_predictor(model_path):
+    """
+    Prédicteur non chargé avec la configuration du service
+    
+    Chaque modèle a son propre cache: les entrées d'un ancien modèle ne
+    peuvent pas être servies par le nouveau.
+    """
+    prediction_cache = PredictionCache(
+        max_size=cache_size,
+        ttl=float(os.environ.get('ASTHMA_CACHE_TTL', '60')),
+        quantization=parse_quantization(os.environ.get('ASTHMA_CACHE_QUANTIZATION', ''))
+    ) if cache_size > 0 else None
+    
+    return AsthmaPredictor(
+        model_path=model_path,
+        high_risk_threshold=0.443,
+        inference_mode=os.environ.get('ASTHMA_INFERENCE_MODE', 'forest'),
+        cache=prediction_cache
+    )
+
+def resolve_model_path(pickle_path='models/asthma_model.pkl'):
+    """
+    Artefact du modèle à charger
+    
+    ASTHMA_MODEL_PATH s'il est défini; sinon le bundle memmap
+    (convert_model.py) s'il existe et n'est pas plus ancien que le pickle,
+    sinon le pickle joblib.
+    """
+    if os.environ.get('ASTHMA_MODEL_PATH'):
+        return os.environ['ASTHMA_MODEL_PATH']
+    
+    bundle_path = os.path.splitext(pickle_path)[0] + '.bundle'
+    header_path = os.path.join(bundle_path, 'header.json')
+    if os.path.exists(header_path) and (
+        not os.path.exists(pickle_path) or os.path.getmtime(header_path) >= os.path.getmtime(pickle_path)
+    ):
+        return bundle_path
+    return pickle_path
+
+# Prédicteur actif, remplacé à chaud quand un nouvel artefact est publié
+model_manager = ModelManager(resolve_model_path(), create_predictor)
+
+# Stockage en mémoire des dernières données capteurs, par appareil ESP32
+sensor_store = SensorStore()
+
+# Dataset des cas labellisés (créé au premier cas, colonnes du modèle actif)
+labeled_store = None
+
+# Encodage one-hot des demographics (mêmes colonnes que le dataset d'entraînement)
+AGE_CATEGORIES = np.array(['0-9', '10-19', '20-24', '25-59', '60+'])
+GENDER_CATEGORIES = np.array(['Female', 'Male'])
+DEMOGRAPHIC_FEATURES = (
+    [f'Age_{age_cat}' for age_cat in AGE_CATEGORIES] +
+    [f'Gender_{gender}' for gender in GENDER_CATEGORIES]
+)
+
+# Taille maximale d'un batch de prédiction
+MAX_BATCH_SIZE = 1000
+
+# Nombre maximal de lectures par envoi groupé (/api/sensors/bulk)
+MAX_BULK_READINGS = 10000
+
+# Fenêtres capteurs utilisables pour la prédiction (historique par appareil)
+SENSOR_WINDOWS = ('latest', 'mean', 'max', 'ewma')
+
+# Profilage à la demande des requêtes de prédiction
+profiler = RequestProfiler(output_dir=os.environ.get('ASTHMA_PROFILE_DIR') or None)
+if PROFILE_MODE:
+    profiler.arm(PROFILE_MODE, int(os.environ.get('ASTHMA_PROFILE_REQUESTS', '1')))
+
+# Le service ne se déclare prêt (/health) qu'après warmup()
+service_state = {'ready': False}
+
+def warmup():
+    """
+    Charge le modèle et exécute une prédiction de chauffe
+    
+    Appelé par gunicorn dans le processus maître avant le fork des workers
+    (voir gunicorn.conf.py): le modèle est alors partagé en copy-on-write.
+    """
+    predictor = model_manager.current()
+    service_state['ready'] = True
+    print(f"🔥 Modèle {predictor.model_version} préchargé ({predictor.engine.n_estimators} arbres), service prêt")
+
+def start_model_watcher():
+    """Surveille l'artefact du modèle (à appeler dans chaque processus qui sert les requêtes)"""
+    model_manager.start_watching(MODEL_WATCH_INTERVAL)
 
 print("✅ Backend Flask démarré - Service de prédiction ML + Réception capteurs ESP32")
 
@@ -39,8 +146,307 @@ def home():
 
 @app.route('/health')
 def health():
-    """Endpoint de santé"""
-    return jsonify({'status': 'healthy'}), 200
+    """Endpoint de santé (503 tant que le modèle n'est pas préchargé)"""
+    if not service_state['ready']:
+        return jsonify({'status': 'warming_up'}), 503
+    return jsonify({'status': 'healthy', 'model_version': model_manager.current().model_version}), 200
+
+@app.before_request
+def start_request_timer():
+    """Début de la requête (durée totale enregistrée par record_request_metrics)"""
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def add_model_version_header(response):
+    """Version du modèle actif dans chaque réponse (en-tête X-Model-Version)"""
+    predictor = model_manager.active
+    if predictor is not None:
+        response.headers['X-Model-Version'] = predictor.model_version
+    return response
+
+@app.after_request
+def record_request_metrics(response):
+    """Compte la requête (et l'erreur éventuelle) par endpoint, avec sa durée"""
+    start = g.get('request_start')
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.observe_request(endpoint, request.method, response.status_code, time.perf_counter() - start)
+    return response
+
+def read_json_body(silent=False):
+    """Corps JSON de la requête (durée enregistrée: étape json_parse)"""
+    with metrics.stage_timer('json_parse'):
+        return request.get_json(silent=silent)
+
+def json_response(payload, status=200):
+    """Réponse JSON d'une prédiction (durée enregistrée: étape serialization)"""
+    with metrics.stage_timer('serialization'):
+        return jsonify(payload), status
+
+def sensor_age(reading, now=None):
+    """Âge d'une lecture capteur en secondes (None si sa date est illisible)"""
+    try:
+        received_at = datetime.fromisoformat(reading.timestamp).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return (time.time() if now is None else now) - received_at
+
+def is_admin_request():
+    """Vrai si l'en-tête X-Admin-Token correspond à ASTHMA_ADMIN_TOKEN (comparaison à temps constant)"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+def start_request_profile():
+    """
+    Profile la requête si le profileur est armé ou si l'en-tête X-Profile
+    le demande (avec X-Admin-Token)
+    """
+    mode = request.headers.get('X-Profile')
+    if mode is not None:
+        if not is_admin_request():
+            return jsonify({'success': False, 'error': 'Profilage par requête réservé aux admins (X-Admin-Token)'}), 401
+        if mode not in PROFILE_MODES:
+            return jsonify({'success': False, 'error': f'Mode de profilage inconnu: {mode} (attendu: {list(PROFILE_MODES)})'}), 400
+    elif not profiler.armed:
+        return None
+    g.profile = profiler.begin(request.path, mode)
+
+def end_request_profile(response):
+    """Enregistre le rapport de la requête profilée (identifiant dans l'en-tête X-Profile-Id)"""
+    session = g.pop('profile', None)
+    if session is not None:
+        response.headers['X-Profile-Id'] = profiler.end(
+            session, path=request.path, method=request.method, status=response.status_code
+        )
+    return response
+
+def abort_request_profile(exc):
+    """Termine une session restée ouverte (exception non gérée)"""
+    session = g.pop('profile', None)
+    if session is not None:
+        profiler.end(session, path=request.path, method=request.method, status=500)
+
+# Hooks enregistrés seulement si le profilage est possible: aucun coût sinon
+if ADMIN_TOKEN or PROFILE_MODE:
+    app.before_request(start_request_profile)
+    app.after_request(end_request_profile)
+    app.teardown_request(abort_request_profile)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Métriques du processus au format texte Prometheus
+    
+    Latence par étape de prédiction et par endpoint, requêtes et erreurs
+    par endpoint, âge des données capteurs utilisées par les prédictions,
+    et au moment de la lecture: appareils connus, âge de leur dernière lecture.
+    """
+    now = time.time()
+    ages = [sensor_age(sensor_store.get(device_id), now) for device_id in sensor_store.devices()]
+    ages = [age for age in ages if age is not None]
+    
+    gauges = [('asthma_sensor_devices', 'Appareils ESP32 ayant envoyé au moins une lecture', [({}, len(sensor_store))])]
+    if ages:
+        gauges.append((
+            'asthma_sensor_last_reading_age_seconds',
+            'Âge de la dernière lecture des appareils (le plus ancien et le plus récent)',
+            [({'device': 'oldest'}, max(ages)), ({'device': 'newest'}, min(ages))]
+        ))
+    predictor = model_manager.active
+    if predictor is not None:
+        gauges.append(('asthma_model_info', 'Version du modèle actif', [({'version': predictor.model_version}, 1)]))
+    
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/reload', methods=['POST'])
+def reload_model():
+    """
+    Recharge le modèle à chaud (en-tête X-Admin-Token = ASTHMA_ADMIN_TOKEN)
+    
+    Corps optionnel: {"model_path": "models/asthma_model.bundle"} (dans models/).
+    Le modèle actif continue de servir pendant le chargement. Avec plusieurs
+    workers gunicorn, seul le worker qui reçoit la requête est rechargé:
+    publier l'artefact dans models/ suffit pour que tous le rechargent
+    (surveillance ASTHMA_MODEL_WATCH_INTERVAL).
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Endpoint admin désactivé (ASTHMA_ADMIN_TOKEN)'}), 403
+    if not is_admin_request():
+        return jsonify({'success': False, 'error': 'Jeton admin invalide'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    model_path = data.get('model_path')
+    if model_path is not None and os.path.dirname(os.path.realpath(model_path)) != MODELS_DIR:
+        return jsonify({'success': False, 'error': 'model_path doit désigner un artefact du dossier models/'}), 400
+    
+    try:
+        model_manager.reload(model_path)
+    except (OSError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e), 'model': model_manager.status()}), 422
+    
+    return jsonify({'success': True, 'model': model_manager.status()}), 200
+
+@app.route('/api/admin/model', methods=['GET'])
+def get_model_status():
+    """
+    Modèle actif et historique des rechargements (en-tête X-Admin-Token)
+    
+    Chemins et erreurs de chargement réservés aux admins: la version du
+    modèle actif reste publique via /health.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Endpoint admin désactivé (ASTHMA_ADMIN_TOKEN)'}), 403
+    if not is_admin_request():
+        return jsonify({'success': False, 'error': 'Jeton admin invalide'}), 401
+    
+    return jsonify({'success': True, 'data': model_manager.status()}), 200
+
+@app.route('/api/admin/profile', methods=['POST'])
+def arm_profiler():
+    """
+    Profile les prochaines prédictions (en-tête X-Admin-Token)
+    
+    Corps: {"mode": "cprofile", "requests": 5} (mode: cprofile, sampling ou
+    tracemalloc; "requests": 0 désarme). Propre au worker qui reçoit la requête.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Endpoint admin désactivé (ASTHMA_ADMIN_TOKEN)'}), 403
+    if not is_admin_request():
+        return jsonify({'success': False, 'error': 'Jeton admin invalide'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        profiler.arm(data.get('mode', 'cprofile'), int(data.get('requests', 1)))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({'success': True, 'profiler': profiler.status()}), 200
+
+@app.route('/api/admin/profiles', methods=['GET'])
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def get_profiles(profile_id=None):
+    """Rapports de profilage conservés (résumé, ou rapport complet d'un identifiant)"""
+    if not ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Endpoint admin désactivé (ASTHMA_ADMIN_TOKEN)'}), 403
+    if not is_admin_request():
+        return jsonify({'success': False, 'error': 'Jeton admin invalide'}), 401
+    
+    if profile_id is None:
+        return jsonify({'success': True, 'data': profiler.status()}), 200
+    
+    report = profiler.get(profile_id)
+    if report is None:
+        return jsonify({'success': False, 'error': f'Rapport inconnu: {profile_id}'}), 404
+    return jsonify({'success': True, 'data': report}), 200
+
+@app.route('/api/labels', methods=['POST'])
+def add_labeled_case():
+    """
+    Enregistre un cas labellisé par un clinicien (en-tête X-Admin-Token)
+    
+    Même corps que /api/predict, plus le niveau de risque confirmé:
+    {"symptoms": {...}, "demographics": {...}, "device_id": "...", "label": 3}
+    Les features sont construites comme pour une prédiction (dernières
+    données capteurs de l'appareil) puis ajoutées au dataset utilisé par
+    l'entraînement incrémental (train_incremental.py).
+    """
+    global labeled_store
+    if not ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Endpoint admin désactivé (ASTHMA_ADMIN_TOKEN)'}), 403
+    if not is_admin_request():
+        return jsonify({'success': False, 'error': 'Jeton admin invalide'}), 401
+    
+    try:
+        data = request.get_json(silent=True)
+        features, reading, window = parse_prediction_request(data)
+        if labeled_store is None:
+            labeled_store = LabeledCaseStore(LABELED_CASES_PATH, model_manager.current().feature_names)
+        labeled_store.append(features, data.get('label'))
+    except PredictionRequestError as e:
+        return jsonify({'success': False, 'error': e.message}), e.status
+    except KeyError as e:
+        return jsonify({'success': False, 'error': f'Feature manquante: {str(e)}'}), 400
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'label': data['label'],
+        'sensor_data_used': format_sensor_data_used(features, reading, window)
+    }), 201
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Compteurs du cache de prédictions du modèle actif (hits, misses, évictions)"""
+    prediction_cache = model_manager.current().cache
+    if prediction_cache is None:
+        return jsonify({
+            'success': False,
+            'error': 'Cache de prédictions désactivé (ASTHMA_CACHE_SIZE=0)'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'data': prediction_cache.stats()
+    }), 200
+
+def get_device_id(data=None, args=None):
+    """
+    Identifiant de l'appareil ESP32 visé par la requête
+    
+    Cherché dans le corps JSON ("device_id") puis dans la query string
+    (?device_id=...). Par défaut: DEFAULT_DEVICE_ID (un seul capteur).
+    args remplace request.args hors d'une requête Flask (service ASGI).
+    """
+    args = request.args if args is None else args
+    device_id = None
+    if isinstance(data, dict):
+        device_id = data.get('device_id')
+    if device_id is None:
+        device_id = args.get('device_id')
+    return str(device_id) if device_id not in (None, '') else DEFAULT_DEVICE_ID
+
+
+def get_available_reading(device_id, window='latest'):
+    """
+    Lecture exploitable d'un appareil (None si aucune donnée)
+    
+    Args:
+        device_id: Identifiant de l'appareil ESP32
+        window: 'latest' (dernière lecture) ou agrégat de l'historique
+                ('mean', 'max', 'ewma'). Un canal sans historique garde
+                la valeur de la dernière lecture.
+    """
+    reading = sensor_store.get(device_id)
+    if reading is None or reading.temperature is None:
+        return None
+    if window == 'latest':
+        return reading
+    
+    aggregates = sensor_store.aggregates(device_id)[window]
+    
+    def pick(channel):
+        value = aggregates.get(channel)
+        return getattr(reading, channel) if value is None else round(value, 2)
+    
+    return SensorReading(
+        device_id=reading.device_id,
+        temperature=pick('temperature'),
+        humidity=pick('humidity'),
+        pm25=pick('pm25'),
+        respiratory_rate=pick('respiratory_rate'),
+        timestamp=reading.timestamp
+    )
+
+
+def get_sensor_window(data=None, args=None):
+    """Fenêtre capteurs demandée ("window" dans le corps ou ?window=...)"""
+    args = request.args if args is None else args
+    window = data.get('window') if isinstance(data, dict) else None
+    window = window or args.get('window', 'latest')
+    if window not in SENSOR_WINDOWS:
+        raise ValueError(f'Fenêtre capteurs inconnue: {window} (attendu: {list(SENSOR_WINDOWS)})')
+    return window
 
 @app.route('/api/sensors', methods=['POST'])
 def receive_sensor_data():
@@ -49,6 +455,7 @@ def receive_sensor_data():
     
     Format attendu:
     {
+        "device_id": "esp32-salon",  # optionnel (défaut: "default")
         "temperature": 22.5,
         "humidity": 65.0,
         "pm1": 10.0,
@@ -57,7 +464,7 @@ def receive_sensor_data():
     }
     """
     try:
-        data = request.get_json()
+        data = read_json_body()
         
         if not data:
             return jsonify({
@@ -65,49 +472,113 @@ def receive_sensor_data():
                 'error': 'Aucune donnée reçue'
             }), 400
         
-        # Mettre à jour les données en mémoire
-        from datetime import datetime
-        import random
+        device_id = get_device_id(data)
+        received_at = datetime.now()
         
-        latest_sensor_data['temperature'] = data.get('temperature')
-        latest_sensor_data['humidity'] = data.get('humidity')
-        latest_sensor_data['pm25'] = data.get('pm25', data.get('pm1', 0))  # Utiliser pm25 ou pm1
+        # Même validation que l'envoi groupé; fréquence respiratoire estimée si non fournie
+        values = np.array([[
+            data.get('temperature'),
+            data.get('humidity'),
+            data.get('pm25', data.get('pm1', 0)),  # Utiliser pm25 ou pm1
+            data.get('respiratoryRate')
+        ]], dtype=np.float64)
+        timestamps = np.array([received_at.timestamp()])
+        sensor_ingest.clean_readings(values, timestamps, received_at.timestamp())
         
-        # Générer une fréquence respiratoire réaliste si non fournie
-        # Plage normale : 12-20 respirations/minute
-        # Variation selon les conditions environnementales
-        if 'respiratoryRate' not in data or data.get('respiratoryRate') is None or data.get('respiratoryRate') == 0:
-            base_rate = 16.0  # Fréquence normale au repos
-            
-            # Ajuster selon la qualité de l'air (PM2.5)
-            pm25 = latest_sensor_data['pm25']
-            if pm25 > 55:  # Très mauvais
-                base_rate += random.uniform(2.0, 4.0)
-            elif pm25 > 35:  # Mauvais
-                base_rate += random.uniform(1.0, 2.5)
-            
-            # Ajuster selon l'humidité
-            humidity = latest_sensor_data['humidity']
-            if humidity > 70:  # Trop humide
-                base_rate += random.uniform(0.5, 1.5)
-            elif humidity < 30:  # Trop sec
-                base_rate += random.uniform(0.5, 1.0)
-            
-            # Ajouter une petite variation naturelle
-            latest_sensor_data['respiratoryRate'] = round(base_rate + random.uniform(-1.0, 1.0), 1)
+        temperature, humidity, pm25, respiratory_rate = (
+            None if value != value else value for value in values[0].tolist()  # NaN -> None
+        )
+        reading = SensorReading(
+            device_id=device_id,
+            temperature=temperature,
+            humidity=humidity,
+            pm25=pm25,
+            respiratory_rate=respiratory_rate,
+            timestamp=received_at.isoformat()
+        )
+        sensor_store.put(reading, received_at=received_at.timestamp())
+        
+        request_log.log('sensor_reading', device_id=device_id, temperature=reading.temperature,
+                        humidity=reading.humidity, pm25=reading.pm25)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Données capteurs enregistrées',
+            'data': reading.to_dict()
+        }), 200
+        
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Données capteurs invalides: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erreur: {str(e)}'
+        }), 500
+
+@app.route('/api/sensors/bulk', methods=['POST'])
+def receive_sensor_data_bulk():
+    """
+    Reçoit un paquet de lectures d'une passerelle ESP32
+    
+    Formats acceptés ("device_id" et "timestamp" epoch optionnels par lecture):
+    - JSON par lignes:
+      {"device_id": "esp32-salon", "readings": [{"temperature": 22.5, "humidity": 65.0, "pm25": 35.0}, ...]}
+    - JSON en colonnes:
+      {"device_id": "esp32-salon", "columns": {"temperature": [...], "humidity": [...], "pm25": [...]}}
+    - Binaire (Content-Type: application/octet-stream, ?device_id=...):
+      enregistrements little-endian '<dffff' (timestamp, température, humidité, PM2.5, FR), NaN = absent
+    """
+    try:
+        received_at = datetime.now().timestamp()
+        
+        if request.mimetype == 'application/octet-stream':
+            device_ids, values, timestamps = sensor_ingest.parse_binary(request.get_data(), get_device_id())
         else:
-            latest_sensor_data['respiratoryRate'] = data.get('respiratoryRate')
+            data = read_json_body(silent=True)
+            if not isinstance(data, dict):
+                return jsonify({
+                    'success': False,
+                    'error': 'Aucune donnée reçue'
+                }), 400
+            
+            device_id = get_device_id(data)
+            if 'columns' in data:
+                device_ids, values, timestamps = sensor_ingest.parse_json_columns(data['columns'], device_id)
+            else:
+                device_ids, values, timestamps = sensor_ingest.parse_json_rows(data.get('readings'), device_id)
+        
+        if len(values) > MAX_BULK_READINGS:
+            return jsonify({
+                'success': False,
+                'error': f'Paquet trop grand: {len(values)} lectures (max {MAX_BULK_READINGS})'
+            }), 413
         
-        latest_sensor_data['timestamp'] = datetime.now().isoformat()
+        # Validation et bornage vectorisés, puis mise à jour des appareils en une passe
+        accepted = sensor_ingest.clean_readings(values, timestamps, received_at)
+        device_ids = [d for d, keep in zip(device_ids, accepted) if keep]
+        n_devices, n_stale = sensor_store.put_many(device_ids, values[accepted], timestamps[accepted])
         
-        print(f"📡 Données capteurs reçues: T={latest_sensor_data['temperature']}°C, H={latest_sensor_data['humidity']}%, PM2.5={latest_sensor_data['pm25']}")
+        # Lectures plus anciennes que l'historique de leur appareil: ignorées
+        n_accepted = int(accepted.sum()) - n_stale
+        request_log.log('sensor_bulk', accepted=n_accepted, stale=n_stale, devices=n_devices)
         
         return jsonify({
             'success': True,
-            'message': 'Données capteurs enregistrées',
-            'data': latest_sensor_data
+            'message': 'Paquet de données capteurs enregistré',
+            'accepted': n_accepted,
+            'rejected': int(len(accepted) - n_accepted),
+            'stale': n_stale,
+            'devices': n_devices
         }), 200
         
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Paquet invalide: {str(e)}'
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -119,10 +590,13 @@ def get_latest_sensors():
     """
     Retourne les dernières données capteurs pour l'app Flutter
     
+    Appareil choisi par ?device_id=... (défaut: "default")
+    
     Format de réponse:
     {
         "success": true,
         "data": {
+            "device_id": "default",
             "humidity": 65.0,
             "temperature": 22.5,
             "pm25": 35.0,
@@ -131,24 +605,189 @@ def get_latest_sensors():
         }
     }
     """
-    if latest_sensor_data['temperature'] is None:
+    device_id = get_device_id()
+    reading = get_available_reading(device_id)
+    if reading is None:
         return jsonify({
             'success': False,
             'error': 'Aucune donnée capteur disponible',
-            'message': 'L\'ESP32 n\'a pas encore envoyé de données'
+            'message': f'L\'ESP32 "{device_id}" n\'a pas encore envoyé de données'
         }), 404
     
     return jsonify({
         'success': True,
-        'data': {
-            'humidity': latest_sensor_data['humidity'],
-            'temperature': latest_sensor_data['temperature'],
-            'pm25': latest_sensor_data['pm25'],
-            'respiratoryRate': latest_sensor_data['respiratoryRate'],
-            'timestamp': latest_sensor_data['timestamp']
-        }
+        'data': reading.to_dict()
     }), 200
 
+@app.route('/api/sensors/history', methods=['GET'])
+def get_sensor_history():
+    """
+    Retourne l'historique récent d'un appareil et ses agrégats glissants
+    
+    Paramètres: ?device_id=... (défaut "default"), ?limit=N (défaut: tout l'historique)
+    
+    Format de réponse:
+    {
+        "success": true,
+        "device_id": "default",
+        "aggregates": {"count": 120, "mean": {...}, "max": {...}, "ewma": {...}},
+        "data": [{"timestamp": "...", "temperature": 22.5, "humidity": 65.0, ...}, ...]
+    }
+    """
+    device_id = get_device_id()
+    limit = request.args.get('limit', type=int)
+    
+    rows = sensor_store.recent(device_id, limit)
+    if rows is None:
+        return jsonify({
+            'success': False,
+            'error': f'Aucun historique pour l\'appareil "{device_id}"'
+        }), 404
+    
+    for row in rows:
+        row['timestamp'] = datetime.fromtimestamp(row['timestamp']).isoformat()
+    
+    return jsonify({
+        'success': True,
+        'device_id': device_id,
+        'aggregates': sensor_store.aggregates(device_id),
+        'data': rows
+    }), 200
+
+def encode_demographics(demographics_list):
+    """
+    Encode en one-hot l'âge et le genre de plusieurs patients à la fois
+    
+    Args:
+        demographics_list: Liste de dictionnaires {"age": "25-59", "gender": "Male"}
+        
+    Returns:
+        Matrice int (n_patients, 7) dans l'ordre de DEMOGRAPHIC_FEATURES
+    """
+    ages = np.array([str(d.get('age')) for d in demographics_list], dtype=object)
+    genders = np.array([str(d.get('gender', 'Male')) for d in demographics_list], dtype=object)
+    
+    age_onehot = ages[:, np.newaxis] == AGE_CATEGORIES[np.newaxis, :]
+    gender_onehot = genders[:, np.newaxis] == GENDER_CATEGORIES[np.newaxis, :]
+    
+    return np.hstack([age_onehot, gender_onehot]).astype(int)
+
+
+def build_features(symptoms, demographics_onehot, sensors):
+    """
+    Combine symptômes, demographics encodés et données capteurs
+    
+    Args:
+        symptoms: Dictionnaire des symptômes (0 ou 1)
+        demographics_onehot: Ligne de encode_demographics()
+        sensors: SensorReading de l'appareil du patient
+        
+    Returns:
+        features: Dictionnaire des 18 features du modèle
+    """
+    features = {}
+    features.update(symptoms)
+    features.update(zip(DEMOGRAPHIC_FEATURES, demographics_onehot.tolist()))
+    
+    # 🔥 UTILISER LES DONNÉES CAPTEURS ESP32 (dernières reçues)
+    features['Humidity'] = sensors.humidity
+    features['Temperature'] = sensors.temperature
+    features['PM25'] = sensors.pm25
+    features['RespiratoryRate'] = sensors.respiratory_rate
+    
+    return features
+
+
+def format_sensor_data_used(features, sensors, window='latest'):
+    """Données capteurs utilisées pour la prédiction (retournées au client)"""
+    return {
+        'device_id': sensors.device_id,
+        'window': window,
+        'temperature': features['Temperature'],
+        'humidity': features['Humidity'],
+        'pm25': features['PM25'],
+        'respiratory_rate': features['RespiratoryRate'],
+        'timestamp': sensors.timestamp
+    }
+
+
+class PredictionRequestError(Exception):
+    """Requête de prédiction invalide (message et code HTTP renvoyés au client)"""
+    
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def parse_prediction_request(data, args=None):
+    """
+    Valide une requête /api/predict et construit le vecteur de features
+    
+    Partagé par l'API Flask et le service ASGI (main_async.py).
+    
+    Args:
+        data: Corps JSON de la requête
+        args: Paramètres de query string (défaut: request.args)
+        
+    Returns:
+        (features, reading, window)
+        
+    Raises:
+        PredictionRequestError: corps invalide (400) ou capteurs indisponibles (503)
+        KeyError: feature manquante
+    """
+    start = time.perf_counter()
+    if not data:
+        raise PredictionRequestError('Aucune donnée reçue')
+    
+    # Vérifier la structure de base (symptoms et demographics uniquement)
+    required_sections = ['symptoms', 'demographics']
+    missing_sections = [s for s in required_sections if s not in data]
+    if missing_sections:
+        raise PredictionRequestError(f'Sections manquantes: {missing_sections}')
+    
+    # Vérifier que les données capteurs ESP32 sont disponibles
+    device_id = get_device_id(data, args)
+    try:
+        window = get_sensor_window(data, args)
+    except ValueError as e:
+        raise PredictionRequestError(str(e))
+    reading = get_available_reading(device_id, window)
+    if reading is None:
+        raise PredictionRequestError(
+            f'Aucune donnée capteur disponible pour "{device_id}". L\'ESP32 doit d\'abord envoyer des données à /api/sensors',
+            503  # Service Unavailable
+        )
+    
+    # Combiner symptômes, demographics (one-hot) et capteurs ESP32
+    demographics_onehot = encode_demographics([data['demographics']])[0]
+    features = build_features(data['symptoms'], demographics_onehot, reading)
+    metrics.observe_stage('request_validation', time.perf_counter() - start)
+    
+    age = sensor_age(reading)
+    if age is not None:
+        metrics.observe_sensor_age(age)
+    request_log.log('prediction_request', device_id=device_id, window=window, sensor_age=age,
+                    temperature=features['Temperature'], humidity=features['Humidity'],
+                    pm25=features['PM25'], respiratory_rate=features['RespiratoryRate'])
+    
+    return features, reading, window
+
+
+def format_prediction_response(result, features, reading, window):
+    """Réponse JSON d'une prédiction réussie"""
+    return {
+        'success': True,
+        'risk_level': int(result['risk_level']),
+        'risk_label': result['risk_label'],
+        'risk_score': float(result['risk_score']),
+        'probabilities': result['probabilities'],
+        'recommendations': result['recommendations'],
+        'sensor_data_used': format_sensor_data_used(features, reading, window),
+        'model_version': result['model_version']
+    }
+
 @app.route('/api/predict', methods=['POST'])
 def predict_asthma_risk():
     """
@@ -157,10 +796,13 @@ def predict_asthma_risk():
     ⚠️ ARCHITECTURE:
     - L'ESP32 envoie les données environnementales à /api/sensors
     - L'app Flutter envoie UNIQUEMENT les symptômes + demographics
-    - Le backend utilise automatiquement les DERNIÈRES données capteurs ESP32
+    - Le backend utilise automatiquement les DERNIÈRES données capteurs de
+      l'ESP32 du patient (device_id dans le corps ou ?device_id=..., défaut "default")
     
     Format attendu de l'app Flutter:
     {
+        "device_id": "esp32-salon",  # optionnel
+        "window": "mean",            # optionnel: latest (défaut), mean, max, ewma
         "symptoms": {                # 7 symptômes (0 ou 1)
             "Tiredness": 0,
             "Dry-Cough": 1,
@@ -174,79 +816,117 @@ def predict_asthma_risk():
     }
     """
     try:
-        data = request.get_json()
+        features, reading, window = parse_prediction_request(read_json_body())
         
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': 'Aucune donnée reçue'
-            }), 400
+        # Faire la prédiction (modèle actif au début de la requête)
+        result = model_manager.current().predict(features)
+        
+        return json_response(format_prediction_response(result, features, reading, window))
+        
+    except PredictionRequestError as e:
+        return jsonify({'success': False, 'error': e.message}), e.status
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Feature manquante: {str(e)}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Erreur de prédiction: {str(e)}'
+        }), 500
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_asthma_risk_batch():
+    """
+    Prédire le risque d'asthme pour plusieurs patients en une seule requête
+    
+    Les demographics sont encodés pour tout le batch, puis la forêt est évaluée
+    une seule fois sur la matrice N x 18. Une erreur sur un patient est
+    signalée à sa position sans faire échouer le batch.
+    
+    Format attendu ("device_id" par patient optionnel, sinon celui du batch):
+    {
+        "device_id": "esp32-clinique",
+        "window": "latest",  # optionnel: latest, mean, max, ewma
+        "patients": [
+            {"symptoms": {...}, "demographics": {"age": "25-59", "gender": "Male"}},
+            {"device_id": "esp32-chambre-12", "symptoms": {...}, "demographics": {...}},
+            ...
+        ]
+    }
+    """
+    try:
+        data = read_json_body()
         
-        # Vérifier la structure de base (symptoms et demographics uniquement)
-        required_sections = ['symptoms', 'demographics']
-        missing_sections = [s for s in required_sections if s not in data]
-        if missing_sections:
+        if not data or not isinstance(data.get('patients'), list):
             return jsonify({
                 'success': False,
-                'error': f'Sections manquantes: {missing_sections}'
+                'error': 'Liste "patients" manquante'
             }), 400
         
-        # Vérifier que les données capteurs ESP32 sont disponibles
-        if latest_sensor_data['temperature'] is None:
+        patients = data['patients']
+        if len(patients) > MAX_BATCH_SIZE:
             return jsonify({
                 'success': False,
-                'error': 'Aucune donnée capteur disponible. L\'ESP32 doit d\'abord envoyer des données à /api/sensors'
-            }), 503  # Service Unavailable
-        
-        # Combiner les features de base
-        features = {}
-        features.update(data['symptoms'])
-        
-        # Encoder les demographics en one-hot
-        demographics = data['demographics']
+                'error': f'Batch trop grand: {len(patients)} patients (max {MAX_BATCH_SIZE})'
+            }), 413
         
-        # Encoder l'âge
-        age_categories = ['0-9', '10-19', '20-24', '25-59', '60+']
-        for age_cat in age_categories:
-            features[f'Age_{age_cat}'] = 1 if demographics.get('age') == age_cat else 0
+        batch_device_id = get_device_id(data)
+        try:
+            window = get_sensor_window(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        # Encoder le genre
-        gender = demographics.get('gender', 'Male')
-        features['Gender_Female'] = 1 if gender == 'Female' else 0
-        features['Gender_Male'] = 1 if gender == 'Male' else 0
+        # Valider chaque patient, les erreurs restent à leur position
+        start = time.perf_counter()
+        results = [None] * len(patients)
+        valid_idx = []
+        readings = []
+        for i, patient in enumerate(patients):
+            if not isinstance(patient, dict):
+                results[i] = {'success': False, 'error': 'Patient invalide'}
+                continue
+            missing_sections = [s for s in ['symptoms', 'demographics'] if not isinstance(patient.get(s), dict)]
+            if missing_sections:
+                results[i] = {'success': False, 'error': f'Sections manquantes: {missing_sections}'}
+                continue
+            # Même règle que get_device_id: null ou "" -> appareil du batch
+            device_id = patient.get('device_id')
+            device_id = str(device_id) if device_id not in (None, '') else batch_device_id
+            reading = get_available_reading(device_id, window)
+            if reading is None:
+                results[i] = {'success': False, 'error': f'Aucune donnée capteur disponible pour "{device_id}"'}
+                continue
+            valid_idx.append(i)
+            readings.append(reading)
+            age = sensor_age(reading)
+            if age is not None:
+                metrics.observe_sensor_age(age)
         
-        # 🔥 UTILISER LES DONNÉES CAPTEURS ESP32 (dernières reçues)
-        features['Humidity'] = latest_sensor_data['humidity']
-        features['Temperature'] = latest_sensor_data['temperature']
-        features['PM25'] = latest_sensor_data['pm25']
-        features['RespiratoryRate'] = latest_sensor_data['respiratoryRate']
+        # Encoder les demographics de tout le batch en une fois
+        demographics_onehot = encode_demographics([patients[i]['demographics'] for i in valid_idx])
+        records = [
+            build_features(patients[i]['symptoms'], demographics_onehot[j], readings[j])
+            for j, i in enumerate(valid_idx)
+        ]
+        metrics.observe_stage('request_validation', time.perf_counter() - start)
         
-        print(f"📊 Prédiction avec capteurs ESP32: T={features['Temperature']}°C, H={features['Humidity']}%, PM2.5={features['PM25']}, RR={features['RespiratoryRate']}")
+        predictions = model_manager.current().predict_batch(records)
         
-        # Faire la prédiction
-        result = predictor.predict(features)
+        for i, features, reading, result in zip(valid_idx, records, readings, predictions):
+            if 'error' in result:
+                results[i] = {'success': False, 'error': result['error']}
+                continue
+            results[i] = format_prediction_response(result, features, reading, window)
         
-        return jsonify({
+        return json_response({
             'success': True,
-            'risk_level': int(result['risk_level']),
-            'risk_label': result['risk_label'],
-            'risk_score': float(result['risk_score']),
-            'probabilities': result['probabilities'],
-            'recommendations': result['recommendations'],
-            'sensor_data_used': {  # Retourner les données capteurs utilisées
-                'temperature': features['Temperature'],
-                'humidity': features['Humidity'],
-                'pm25': features['PM25'],
-                'respiratory_rate': features['RespiratoryRate'],
-                'timestamp': latest_sensor_data['timestamp']
-            }
-        }), 200
+            'count': len(results),
+            'errors': sum(1 for r in results if not r['success']),
+            'results': results
+        })
         
-    except KeyError as e:
-        return jsonify({
-            'success': False,
-            'error': f'Feature manquante: {str(e)}'
-        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -254,6 +934,8 @@ def predict_asthma_risk():
         }), 500
 
 if __name__ == '__main__':
+    warmup()
+    start_model_watcher()
     app.run(
         host='0.0.0.0',
         port=5000,
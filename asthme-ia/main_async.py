@@ -0,0 +1,149 @@
+"""
+Service ASGI de prédiction avec regroupement des requêtes (micro-batching)
+
+Même API que main.py: /api/predict est traité en asyncio et regroupé par
+MicroBatcher (une évaluation de la forêt pour toutes les requêtes
+concurrentes); toutes les autres routes (capteurs, santé, batch explicite)
+sont servies par l'application Flask de main.py, qui partage le même
+prédicteur et le même stockage capteurs.
+
+Lancement: uvicorn main_async:app --host 0.0.0.0 --port 5000
+
+Variables d'environnement:
+- ASTHMA_BATCH_MAX_SIZE: requêtes maximum par batch (défaut: 64)
+- ASTHMA_BATCH_MAX_WAIT_MS: attente maximale avant évaluation (défaut: 5 ms)
+- ASTHMA_BATCH_THREADS: batchs évalués en parallèle (défaut: 2)
+
+Les métriques (GET /metrics, servi par Flask) incluent les requêtes
+/api/predict traitées ici; les étapes encodage, forêt et recommandations
+y sont mesurées une fois par batch. Le profilage par requête (X-Profile,
+ASTHMA_PROFILE) ne concerne que les routes servies par Flask.
+"""
+import asyncio
+import json
+import os
+import time
+from urllib.parse import parse_qsl
+from asgiref.wsgi import WsgiToAsgi
+import main
+from instrumentation import metrics
+from micro_batcher import MicroBatcher
+
+def predict_batch(records):
+    """Évalue un batch avec le modèle actif (rechargement à chaud possible)"""
+    return main.model_manager.current().predict_batch(records)
+
+
+batcher = MicroBatcher(
+    predict_batch,
+    max_batch_size=int(os.environ.get('ASTHMA_BATCH_MAX_SIZE', '64')),
+    max_wait=float(os.environ.get('ASTHMA_BATCH_MAX_WAIT_MS', '5')) / 1000,
+    max_concurrency=int(os.environ.get('ASTHMA_BATCH_THREADS', '2'))
+)
+
+# Routes synchrones (capteurs, santé, ...) servies par Flask dans un thread
+flask_app = WsgiToAsgi(main.app)
+
+
+async def read_body(receive):
+    """Lit le corps complet d'une requête HTTP ASGI"""
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def send_json(send, payload, status=200):
+    """Envoie une réponse JSON (CORS ouvert comme l'API Flask)"""
+    with metrics.stage_timer('serialization'):
+        body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'access-control-allow-origin', b'*'),
+            (b'x-model-version', str(payload.get('model_version') or '').encode()),
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def predict(scope, receive, send):
+    """/api/predict: même contrat que main.predict_asthma_risk, prédiction regroupée"""
+    try:
+        body = await read_body(receive)
+        try:
+            with metrics.stage_timer('json_parse'):
+                data = json.loads(body or b'null')
+        except ValueError:
+            return await send_json(send, {'success': False, 'error': 'JSON invalide'}, 400)
+
+        args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        features, reading, window = main.parse_prediction_request(data, args)
+
+        result = await batcher.predict(features)
+
+        await send_json(send, main.format_prediction_response(result, features, reading, window))
+
+    except main.PredictionRequestError as e:
+        await send_json(send, {'success': False, 'error': e.message}, e.status)
+    except KeyError as e:
+        await send_json(send, {'success': False, 'error': f'Feature manquante: {str(e)}'}, 400)
+    except ValueError as e:
+        await send_json(send, {'success': False, 'error': str(e)}, 400)
+    except Exception as e:
+        await send_json(send, {'success': False, 'error': f'Erreur de prédiction: {str(e)}'}, 500)
+
+
+async def observed(handler, endpoint, scope, receive, send):
+    """Exécute une route ASGI en enregistrant sa durée et son statut (comme les routes Flask)"""
+    start = time.perf_counter()
+    status = 500
+
+    async def send_and_record(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        await send(message)
+
+    try:
+        await handler(scope, receive, send_and_record)
+    finally:
+        metrics.observe_request(endpoint, scope['method'], status, time.perf_counter() - start)
+
+
+async def lifespan(receive, send):
+    """Préchargement du modèle et démarrage du batcher avec le serveur"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, main.warmup)
+                main.start_model_watcher()
+                await batcher.start()
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await batcher.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """Application ASGI"""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    if scope['type'] == 'http':
+        if scope['path'] == '/api/predict' and scope['method'] == 'POST':
+            return await observed(predict, '/api/predict', scope, receive, send)
+        if scope['path'] == '/api/batcher/stats' and scope['method'] == 'GET':
+            return await send_json(send, {'success': True, 'batcher': batcher.stats()})
+
+    await flask_app(scope, receive, send)
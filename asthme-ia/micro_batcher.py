@@ -0,0 +1,163 @@
+"""
+Regroupement des prédictions concurrentes en micro-batchs (asyncio)
+
+Chaque requête dépose ses features dans une file et attend son résultat.
+Une tâche de fond vide la file: elle attend au plus max_wait secondes
+(ou max_batch_size requêtes) après la première requête, évalue le batch
+en une fois via AsthmaPredictor.predict_batch dans un pool de threads,
+puis renvoie chaque résultat à la requête qui l'attend.
+
+La latence ajoutée par le regroupement est donc bornée par max_wait.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """File de prédictions évaluées par paquets"""
+
+    def __init__(self, predict_batch, max_batch_size=64, max_wait=0.005, max_concurrency=2):
+        """
+        Args:
+            predict_batch: Fonction liste de features -> liste de résultats
+                           (dictionnaires {'error': message} pour les entrées invalides)
+            max_batch_size: Nombre maximal de requêtes par batch
+            max_wait: Attente maximale (s) après la première requête d'un batch
+            max_concurrency: Nombre de batchs évalués en parallèle (threads)
+        """
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size doit être strictement positif")
+
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_concurrency = max_concurrency
+        self._queue = None
+        self._task = None
+        self._executor = None
+        self._slots = None
+        self._inflight = set()  # Références fortes sur les batchs en cours
+        self._collecting = []  # Batch retiré de la file mais pas encore confié à _dispatch
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+    async def start(self):
+        """Démarre la tâche de regroupement (dans la boucle asyncio courante)"""
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix='micro-batch'
+        )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Arrête la tâche de regroupement et fait échouer les requêtes en attente"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+        # Batch en cours de constitution (ou en attente d'un slot) puis file restante
+        pending = self._collecting
+        self._collecting = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Service de prédiction arrêté"))
+        self._executor.shutdown(wait=True)
+
+    async def predict(self, features):
+        """
+        Prédit le risque pour un patient (regroupé avec les requêtes concurrentes)
+
+        Args:
+            features: Dictionnaire {nom_feature: valeur}
+
+        Returns:
+            Résultat de predict_batch pour cette entrée
+
+        Raises:
+            ValueError: entrée invalide (message de predict_batch)
+        """
+        if self._task is None:
+            raise RuntimeError("MicroBatcher non démarré")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((features, future))
+        return await future
+
+    async def _collect(self):
+        """Attend une première requête puis complète le batch jusqu'à max_wait"""
+        # Conservé sur l'instance: stop() doit réveiller ces requêtes si la tâche est annulée
+        batch = self._collecting = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        """Boucle de regroupement: un batch est évalué pendant que le suivant se remplit"""
+        while True:
+            batch = await self._collect()
+            await self._slots.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._collecting = []
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        """Évalue un batch dans le pool de threads et réveille les requêtes"""
+        try:
+            records = [features for features, _ in batch]
+            self.requests += len(batch)
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+            loop = asyncio.get_running_loop()
+            try:
+                results = await loop.run_in_executor(self._executor, self.predict_batch, records)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future), result in zip(batch, results):
+                if future.done():  # Requête annulée (client déconnecté)
+                    continue
+                if 'error' in result:
+                    future.set_exception(ValueError(result['error']))
+                else:
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        """Compteurs de regroupement"""
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'pending': self._queue.qsize() if self._queue is not None else 0
+        }
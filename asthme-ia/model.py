@@ -1,29 +1,79 @@
 """
 Module de prédiction du risque d'asthme avec Random Forest
+
+Seules les dépendances d'inférence (NumPy) sont importées au chargement du
+module. pandas, scikit-learn et joblib sont importés à la demande par les
+méthodes d'entraînement, d'analyse et de chargement du pickle: un serveur
+qui charge un bundle memmap démarre sans eux.
 """
-import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-import joblib
 import os
+import threading
+import time
+from compiled_forest import CompiledForest
+from lookup_index import DiscreteLookupIndex
+from sensor_cleaning import CleaningTable, SENSOR_CLEANING_RULES
+from model_bundle import is_bundle, read_bundle, write_bundle, hash_training_data, artifact_version
+from evaluation_bundle import evaluation_path, write_evaluation
+from instrumentation import metrics, request_log
+
+# Modes d'inférence: parcours de la forêt compilée ou index précalculé
+INFERENCE_MODES = ('forest', 'lookup')
+
+# Évaluation pendant l'entraînement: out-of-bag (aucun réentraînement),
+# cross-validation k-fold (k réentraînements) ou aucune
+EVALUATION_MODES = ('oob', 'cv', 'none')
+
+# Hyperparamètres de référence de la Random Forest (surchargés par la recherche
+# d'hyperparamètres de train_model.py)
+# Lignes du test set prédites à la fois par train (le test set n'est jamais copié en entier)
+EVALUATION_BLOCK_ROWS = 100_000
+
+DEFAULT_FOREST_PARAMS = {
+    'n_estimators': 151,  # Nombre impair pour éviter égalités, augmenté pour plus de stabilité
+    'max_depth': 12,  # Augmenté pour capturer plus de patterns complexes
+    'min_samples_split': 5,
+    'min_samples_leaf': 1,  # Réduit pour plus de flexibilité
+    'class_weight': {1: 1.0, 2: 1.0, 3: 1.5}  # Poids ajusté pour classe critique "Élevé"
+}
 
 class AsthmaPredictor:
     """Classe pour la prédiction du risque d'asthme"""
     
-    def __init__(self, model_path='models/asthma_model.pkl', high_risk_threshold=0.443):
+    def __init__(self, model_path='models/asthma_model.pkl', high_risk_threshold=0.443,
+                 inference_mode='forest', cache=None):
         """
         Initialise le prédicteur
         
         Args:
-            model_path: Chemin vers le modèle sauvegardé
+            model_path: Chemin vers le modèle sauvegardé (pickle joblib, ou
+                        bundle memmap produit par convert_model.py)
             high_risk_threshold: Seuil de probabilité pour déclencher alerte critique
                                  (0.443 = optimal Youden, basé sur analyse ROC)
+            inference_mode: 'forest' (parcours de la forêt compilée) ou 'lookup'
+                            (index précalculé sur les features binaires)
+            cache: PredictionCache optionnel placé devant l'évaluation de la forêt
+                   (vidé automatiquement à chaque chargement de modèle)
         """
+        if inference_mode not in INFERENCE_MODES:
+            raise ValueError(f"Mode d'inférence inconnu: {inference_mode} (attendu: {INFERENCE_MODES})")
+        
         self.model_path = model_path
-        self.model = None
+        self.model = None  # RandomForestClassifier (None si chargé depuis un bundle)
+        self.engine = None  # Moteur d'inférence compilé (tableaux NumPy)
+        self.feature_importances = None
+        self.training_hash = None  # Empreinte des données d'entraînement
+        self.model_version = None  # Empreinte de l'artefact chargé (renvoyée dans les prédictions)
+        self.artifact_threshold = None  # Seuil critique enregistré dans l'artefact (s'il existe)
+        self.evaluation = None  # Tableaux d'évaluation du dernier entraînement (evaluation_bundle.py)
+        self.evaluation_info = None  # Paramètres du split associé (en-tête de l'évaluation)
+        self.inference_mode = inference_mode
+        self.lookup_index = None  # Index précalculé (mode 'lookup' uniquement)
+        self.cache = cache
         self.feature_names = None
+        self.feature_index = None  # Table nom de feature -> colonne (calculée au chargement)
+        self.cleaning = None  # Table de nettoyage capteurs dans l'ordre des features
+        self._row_buffers = threading.local()  # Ligne float64 préallouée par thread
         self.high_risk_threshold = high_risk_threshold  # Seuil optimal Youden (analyse ROC)
         self.min_feature_importance = 0.001  # Filtrer features < 0.1% d'importance
         self.risk_labels = {
@@ -34,64 +84,59 @@ class AsthmaPredictor:
         
     def _clean_sensor_data(self, df):
         """
-        Nettoie les valeurs aberrantes des capteurs
+        Nettoie les valeurs aberrantes des capteurs (règles de SENSOR_CLEANING_RULES)
+        
+        Seules les colonnes capteurs sont extraites et nettoyées en place:
+        le DataFrame complet n'est pas copié.
         
         Args:
             df: DataFrame avec les données
             
         Returns:
-            df: DataFrame nettoyé
+            df: DataFrame nettoyé (le même objet)
         """
-        df_clean = df.copy()
+        sensor_columns = [rule[0] for rule in SENSOR_CLEANING_RULES if rule[0] in df.columns]
+        if not sensor_columns:
+            return df
         
-        # Nettoyer les capteurs environnementaux
-        if 'Temperature' in df_clean.columns:
-            # Température corporelle normale: 35-42°C
-            df_clean.loc[df_clean['Temperature'] < 35, 'Temperature'] = 36.5
-            df_clean.loc[df_clean['Temperature'] > 42, 'Temperature'] = 37.0
-            
-        if 'Humidity' in df_clean.columns:
-            # Humidité: 0-100%
-            df_clean.loc[df_clean['Humidity'] < 0, 'Humidity'] = 30
-            df_clean.loc[df_clean['Humidity'] > 100, 'Humidity'] = 70
-            
-        if 'PM25' in df_clean.columns:
-            # PM2.5: 0-500 µg/m³ (valeurs réalistes)
-            df_clean.loc[df_clean['PM25'] < 0, 'PM25'] = 0
-            df_clean.loc[df_clean['PM25'] > 500, 'PM25'] = 500
-            
-        if 'AQI' in df_clean.columns:
-            # AQI: 0-500
-            df_clean.loc[df_clean['AQI'] < 0, 'AQI'] = 0
-            df_clean.loc[df_clean['AQI'] > 500, 'AQI'] = 500
-            
-        if 'Heart_Rate' in df_clean.columns:
-            # Fréquence cardiaque: 40-200 bpm
-            df_clean.loc[df_clean['Heart_Rate'] < 40, 'Heart_Rate'] = 70
-            df_clean.loc[df_clean['Heart_Rate'] > 200, 'Heart_Rate'] = 100
-            
-        if 'RespiratoryRate' in df_clean.columns:
-            # Fréquence respiratoire: 10-40 respirations/min
-            df_clean.loc[df_clean['RespiratoryRate'] < 10, 'RespiratoryRate'] = 16
-            df_clean.loc[df_clean['RespiratoryRate'] > 40, 'RespiratoryRate'] = 25
+        values = np.array(df[sensor_columns], dtype=np.float64)
+        CleaningTable(sensor_columns).apply(values)
+        df[sensor_columns] = values
         
-        return df_clean
+        return df
     
-    def load_data(self, csv_path='data/asthma_detection_with_sensors.csv'):
+    def load_data(self, csv_path='data/asthma_detection_with_sensors.csv', use_cache=True, cache_path=None):
         """
         Charge et prépare les données avec nettoyage des valeurs aberrantes
         
         Args:
             csv_path: Chemin vers le fichier CSV (avec ou sans capteurs)
+            use_cache: Lire le cache colonnaire (dataset_cache.py), construit
+                       au premier appel et reconstruit si le CSV change;
+                       False: parser et nettoyer le CSV. Si le cache ne peut
+                       pas être construit, le CSV est lu directement.
+            cache_path: Dossier du cache (défaut: <csv sans extension>.columns)
             
         Returns:
             X, y: Features et target
         """
-        # Charger le dataset
-        df = pd.read_csv(csv_path)
+        import pandas as pd
+        
+        df = None
+        if use_cache:
+            # Colonnes déjà nettoyées, types entiers étroits / float32, en memmap
+            from dataset_cache import DatasetCache
+            try:
+                df = DatasetCache(csv_path, cache_path).open().to_frame()
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Cache colonnaire indisponible ({e}): lecture directe du CSV")
         
-        # Nettoyer les valeurs aberrantes des capteurs
-        df = self._clean_sensor_data(df)
+        if df is None:
+            # Charger le dataset
+            df = pd.read_csv(csv_path)
+            
+            # Nettoyer les valeurs aberrantes des capteurs
+            df = self._clean_sensor_data(df)
         
         # Séparer features et target
         X = df.drop('Asthma', axis=1)
@@ -107,7 +152,103 @@ class AsthmaPredictor:
         
         return X, y
     
-    def train(self, X, y, test_size=0.2, random_state=42):
+    def load_data_streaming(self, csv_path, chunk_rows=100_000, max_per_class=None, random_state=42):
+        """
+        Charge un dataset plus grand que la mémoire, par morceaux (streaming_loader.py)
+        
+        Les lignes nettoyées sont écrites dans une seule matrice float32
+        préallouée, enveloppée sans copie dans un DataFrame.
+        
+        Args:
+            csv_path: Chemin vers le fichier CSV
+            chunk_rows: Lignes lues par morceau
+            max_per_class: Échantillon stratifié de max_per_class lignes par
+                           classe (None: tout le dataset)
+            random_state: Seed de l'échantillonnage
+            
+        Returns:
+            X, y: Features (float32) et target (int8)
+        """
+        import pandas as pd
+        from streaming_loader import stream_training_matrix
+        
+        matrix, labels, self.feature_names, stats = stream_training_matrix(
+            csv_path, chunk_rows=chunk_rows, max_per_class=max_per_class, random_state=random_state
+        )
+        X = pd.DataFrame(matrix, columns=self.feature_names, copy=False)
+        y = pd.Series(labels, name='Asthma', copy=False)
+        
+        print(f"Features chargées: {len(self.feature_names)} (lecture par morceaux de {chunk_rows} lignes)")
+        print(f"✓ {stats['rows_kept']}/{stats['rows_read']} lignes retenues, matrice {stats['matrix_mb']:.1f} Mo, "
+              f"pic mémoire {stats['peak_rss_mb']:.0f} Mo")
+        
+        return X, y
+    
+    def split_indices(self, y, test_size=0.2, random_state=42):
+        """
+        Positions des lignes train/test de la découpe stratifiée
+        
+        Returns:
+            train_idx, test_idx: positions (int64) dans X et y
+        """
+        from sklearn.model_selection import train_test_split
+        
+        return train_test_split(np.arange(len(y)), test_size=test_size, random_state=random_state, stratify=y)
+    
+    def split_data(self, X, y, test_size=0.2, random_state=42):
+        """
+        Découpe stratifiée train/test (la même pour l'entraînement et la recherche)
+        
+        Returns:
+            X_train, X_test, y_train, y_test
+        """
+        train_idx, test_idx = self.split_indices(y, test_size, random_state)
+        take = lambda data, idx: data.iloc[idx] if hasattr(data, 'iloc') else np.asarray(data)[idx]
+        return take(X, train_idx), take(X, test_idx), take(y, train_idx), take(y, test_idx)
+    
+    def _oob_metrics(self, model, y_train):
+        """
+        Métriques out-of-bag d'une forêt entraînée avec oob_score=True
+        
+        Chaque échantillon d'entraînement est prédit par les seuls arbres qui
+        ne l'ont pas vu (~37% des arbres): estimation de généralisation sans
+        réentraînement.
+        
+        Args:
+            model: RandomForestClassifier entraîné (oob_score=True)
+            y_train: Cible du train set
+            
+        Returns:
+            Dictionnaire: accuracy, rapport par classe, AUC et seuil Youden
+            de la classe critique (3)
+        """
+        from sklearn.metrics import classification_report
+        from threshold_eval import ThresholdCurve
+        
+        proba = model.oob_decision_function_
+        y_true = np.asarray(y_train)
+        
+        # Échantillons jamais hors-sac (rare avec 151 arbres): ignorés
+        seen = np.isfinite(proba).all(axis=1)
+        proba, y_true = proba[seen], y_true[seen]
+        y_pred = model.classes_.take(np.argmax(proba, axis=1))
+        
+        critical = list(model.classes_).index(3)
+        curve = ThresholdCurve(y_true == 3, proba[:, critical])
+        youden = curve.youden()
+        
+        return {
+            'accuracy': float(np.mean(y_pred == y_true)),
+            'n_samples': int(seen.sum()),
+            'roc_auc_critical': curve.auc(),
+            'youden_threshold': min(youden['threshold'], 1.0),
+            'youden_sensitivity': youden['sensitivity'],
+            'youden_specificity': youden['specificity'],
+            'classification_report': classification_report(y_true, y_pred, output_dict=True)
+        }
+    
+    def train(self, X, y, test_size=0.2, random_state=42, forest_params=None,
+              evaluation='oob', cv_folds=10, oob_repeats=1):
         """
         Entraîne le modèle Random Forest
         
@@ -116,45 +257,100 @@ class AsthmaPredictor:
             y: Target
             test_size: Proportion du test set
             random_state: Seed pour reproductibilité
+            forest_params: Hyperparamètres RandomForestClassifier (défaut: DEFAULT_FOREST_PARAMS)
+            evaluation: 'oob' (prédictions out-of-bag du même entraînement),
+                        'cv' (cross-validation k-fold, cv_folds réentraînements)
+                        ou 'none' (ex: déjà faite par la recherche)
+            cv_folds: Nombre de folds en mode 'cv'
+            oob_repeats: En mode 'oob', nombre de forêts (seeds différentes)
+                         pour estimer la variance des métriques OOB
             
         Returns:
             metrics: Dictionnaire avec les métriques de performance
         """
-        # Split train/test
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=random_state, stratify=y
-        )
+        import pandas as pd
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.model_selection import cross_val_score, StratifiedKFold
+        from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
+        
+        if evaluation not in EVALUATION_MODES:
+            raise ValueError(f"Mode d'évaluation inconnu: {evaluation} (attendu: {EVALUATION_MODES})")
+        
+        # Split train/test (positions conservées pour l'évaluation enregistrée)
+        # Seul le train set est copié: le test set est lu par blocs à la prédiction
+        train_idx, test_idx = self.split_indices(y, test_size, random_state)
+        X_train = X.iloc[train_idx]
+        y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
         
-        # Créer et entraîner le modèle Random Forest avec hyperparamètres optimisés
+        # Créer et entraîner le modèle Random Forest
         # Utilisation d'un nombre impair d'arbres pour éviter les égalités
+        params = dict(DEFAULT_FOREST_PARAMS, **(forest_params or {}))
         self.model = RandomForestClassifier(
-            n_estimators=151,  # Nombre impair pour éviter égalités, augmenté pour plus de stabilité
-            max_depth=12,  # Augmenté pour capturer plus de patterns complexes
-            min_samples_split=5,
-            min_samples_leaf=1,  # Réduit pour plus de flexibilité
             random_state=random_state,
-            class_weight={1: 1.0, 2: 1.0, 3: 1.5},  # Poids ajusté pour classe critique "Élevé"
-            n_jobs=-1  # Utilise tous les CPU
+            oob_score=evaluation == 'oob',
+            n_jobs=-1,  # Utilise tous les CPU
+            **params
         )
         
         print("Entraînement du modèle Random Forest optimisé...")
-        print(f"  • n_estimators: 151 (nombre impair)")
-        print(f"  • max_depth: 12 (patterns complexes)")
-        print(f"  • min_samples_leaf: 1 (flexibilité)")
-        print(f"  • class_weight: {{1:1.0, 2:1.0, 3:1.5}} (priorité classe critique)")
+        for name, value in params.items():
+            print(f"  • {name}: {value}")
         print(f"  • Seuil alerte critique: {self.high_risk_threshold:.2f}")
         
         self.model.fit(X_train, y_train)
+        self.training_hash = hash_training_data(X_train, y_train)
+        self.model_version = self.training_hash[:12]
+        self._compile_model()
         
-        # Prédictions
-        y_pred = self.model.predict(X_test)
+        # Prédictions (probabilités conservées pour l'évaluation enregistrée)
+        test_proba = np.concatenate([
+            self.model.predict_proba(X.iloc[test_idx[start:start + EVALUATION_BLOCK_ROWS]])
+            for start in range(0, len(test_idx), EVALUATION_BLOCK_ROWS)
+        ])
+        y_pred = self.model.classes_.take(np.argmax(test_proba, axis=1))
         
         # Métriques
         accuracy = accuracy_score(y_test, y_pred)
         
-        # Cross-validation améliorée avec StratifiedKFold (10 folds)
-        skf = StratifiedKFold(n_splits=10, shuffle=True, random_state=random_state)
-        cv_scores = cross_val_score(self.model, X_train, y_train, cv=skf)
+        # Estimation de généralisation sur le train set
+        cv_scores = None
+        oob = None
+        if evaluation == 'cv':
+            # Cross-validation améliorée avec StratifiedKFold
+            skf = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=random_state)
+            cv_scores = cross_val_score(self.model, X_train, y_train, cv=skf)
+        elif evaluation == 'oob':
+            oob = self._oob_metrics(self.model, y_train)
+            # Seeds supplémentaires uniquement pour la variance (modèle retenu: le premier)
+            repeats = [oob] + [
+                self._oob_metrics(
+                    RandomForestClassifier(random_state=random_state + i, oob_score=True, n_jobs=-1, **params)
+                    .fit(X_train, y_train),
+                    y_train
+                )
+                for i in range(1, oob_repeats)
+            ]
+            for key in ('accuracy', 'roc_auc_critical'):
+                oob[f'{key}_std'] = float(np.std([r[key] for r in repeats]))
+            oob['repeats'] = oob_repeats
+        
+        # Évaluation réutilisée par les scripts d'analyse (écrite par save_model)
+        self.evaluation = {
+            'test_indices': test_idx,
+            'y_test': y_test.to_numpy(),
+            'test_proba': test_proba,
+            'train_indices': train_idx,
+            'y_train': y_train.to_numpy()
+        }
+        if evaluation == 'oob':
+            # NaN pour les rares échantillons jamais hors-sac
+            self.evaluation['oob_proba'] = self.model.oob_decision_function_
+        self.evaluation_info = {
+            'test_size': test_size,
+            'random_state': random_state,
+            'n_rows': len(y),
+            'evaluation': evaluation
+        }
         
         # Importance des features
         feature_importance = pd.DataFrame({
@@ -170,7 +366,12 @@ class AsthmaPredictor:
         print(f"RÉSULTATS DE L'ENTRAÎNEMENT")
         print(f"{'='*50}")
         print(f"Accuracy sur test set: {accuracy:.4f}")
-        print(f"Cross-validation score (10-fold): {cv_scores.mean():.4f} (+/- {cv_scores.std():.4f})")
+        if cv_scores is not None:
+            print(f"Cross-validation score ({cv_folds}-fold): {cv_scores.mean():.4f} (+/- {cv_scores.std():.4f})")
+        if oob is not None:
+            print(f"Accuracy out-of-bag: {oob['accuracy']:.4f} (+/- {oob['accuracy_std']:.4f}, {oob_repeats} seed(s))")
+            print(f"AUC classe critique (OOB): {oob['roc_auc_critical']:.4f} | seuil Youden: {oob['youden_threshold']:.3f} "
+                  f"(sensibilité {oob['youden_sensitivity']:.1%}, spécificité {oob['youden_specificity']:.1%})")
         print(f"\nTop 10 features importantes:")
         print(important_features.head(10))
         
@@ -187,14 +388,79 @@ class AsthmaPredictor:
         
         metrics = {
             'accuracy': accuracy,
-            'cv_mean': cv_scores.mean(),
-            'cv_std': cv_scores.std(),
+            'evaluation': evaluation,
+            'cv_mean': float(cv_scores.mean()) if cv_scores is not None else None,
+            'cv_std': float(cv_scores.std()) if cv_scores is not None else None,
+            'oob': oob,
+            'forest_params': params,
             'feature_importance': feature_importance.to_dict('records'),
             'classification_report': classification_report(y_test, y_pred, output_dict=True)
         }
         
         return metrics
     
+    def update(self, X_new, y_new, n_new_trees=25, max_trees=None):
+        """
+        Entraînement incrémental: ajoute des arbres entraînés sur les nouvelles données
+        
+        Les arbres existants sont conservés (warm_start) et seuls les
+        nouveaux cas sont lus. Avec max_trees, les arbres les plus anciens
+        sont retirés pour que la forêt suive les données récentes.
+        
+        Args:
+            X_new: Nouvelles features (DataFrame, colonnes du modèle)
+            y_new: Nouveaux labels
+            n_new_trees: Nombre d'arbres ajoutés
+            max_trees: Taille maximale de la forêt (None: pas de retrait)
+            
+        Returns:
+            Dictionnaire: arbres ajoutés/retirés, taille de la forêt, durée
+            
+        Raises:
+            ValueError: pas de modèle sklearn chargé (bundle), ou classes du
+                        modèle absentes des nouvelles données
+        """
+        if self.model is None:
+            raise ValueError("L'entraînement incrémental nécessite le modèle sklearn (pickle), pas un bundle")
+        missing = set(self.model.classes_) - set(np.unique(y_new))
+        if missing:
+            raise ValueError(f"Classes absentes des nouvelles données: {sorted(missing)}")
+        
+        X_new = self._clean_sensor_data(X_new[self.feature_names].copy())
+        n_before = len(self.model.estimators_)
+        training_hash = hash_training_data(X_new, y_new, parent=self.training_hash)
+        
+        start = time.perf_counter()
+        # warm_start tire les seeds des nouveaux arbres d'après len(estimators_): après
+        # un retrait (max_trees), la même random_state redonnerait les seeds de la mise
+        # à jour précédente. Seed propre à chaque mise à jour, dérivée de l'empreinte.
+        self.model.set_params(warm_start=True, oob_score=False, n_estimators=n_before + n_new_trees,
+                              random_state=int(training_hash[:8], 16))
+        self.model.fit(X_new, y_new)
+        fit_time = time.perf_counter() - start
+        
+        retired = 0
+        if max_trees is not None and len(self.model.estimators_) > max_trees:
+            retired = len(self.model.estimators_) - max_trees
+            self.model.estimators_ = self.model.estimators_[retired:]
+            self.model.set_params(n_estimators=max_trees)
+        
+        self.training_hash = training_hash
+        self.evaluation = None  # Probabilités de l'ancienne forêt: périmées
+        self.model_version = self.training_hash[:12]
+        self._compile_model()
+        
+        print(f"🌱 Mise à jour incrémentale: {len(X_new)} cas, +{n_new_trees} arbres, -{retired} anciens "
+              f"({len(self.model.estimators_)} arbres) en {fit_time:.2f} s")
+        
+        return {
+            'n_samples': len(X_new),
+            'trees_added': n_new_trees,
+            'trees_retired': retired,
+            'n_estimators': len(self.model.estimators_),
+            'fit_time': fit_time
+        }
+    
     def save_model(self):
         """Sauvegarde le modèle entraîné"""
         if self.model is None:
@@ -207,42 +473,232 @@ class AsthmaPredictor:
         model_data = {
             'model': self.model,
             'feature_names': self.feature_names,
-            'risk_labels': self.risk_labels
+            'risk_labels': self.risk_labels,
+            'training_hash': self.training_hash,
+            'high_risk_threshold': self.high_risk_threshold
         }
         
-        joblib.dump(model_data, self.model_path)
+        # Écriture dans un fichier temporaire puis renommage: un processus qui
+        # surveille le fichier ne lit jamais un pickle à moitié écrit
+        import joblib
+        
+        tmp_path = self.model_path + '.tmp'
+        joblib.dump(model_data, tmp_path)
+        os.replace(tmp_path, self.model_path)
         print(f"\nModèle sauvegardé dans: {self.model_path}")
+        
+        if self.evaluation is not None:
+            self.save_evaluation()
+    
+    def save_evaluation(self):
+        """
+        Sauvegarde les probabilités du dernier entraînement à côté du modèle
+        
+        Le dossier <modèle>.evaluation est lié au modèle sauvegardé par son
+        empreinte: les scripts d'analyse le lisent au lieu de rescorer.
+        
+        Returns:
+            Chemin de l'évaluation écrite
+        """
+        if self.evaluation is None:
+            raise ValueError("Aucune évaluation à sauvegarder (entraîner le modèle d'abord)")
+        
+        arrays = dict(self.evaluation)
+        if self.feature_importances is not None:
+            arrays['feature_importances'] = np.asarray(self.feature_importances, dtype=np.float64)
+        
+        path = evaluation_path(self.model_path)
+        write_evaluation(
+            path,
+            arrays,
+            training_hash=self.training_hash,
+            model_version=artifact_version(self.model_path),
+            classes=self.engine.classes_,
+            feature_names=self.feature_names,
+            **(self.evaluation_info or {})
+        )
+        print(f"Évaluation sauvegardée dans: {path}")
+        return path
+    
+    def save_bundle(self, bundle_path=None, source=None):
+        """
+        Sauvegarde la forêt compilée au format bundle (tableaux memmap + en-tête JSON)
+        
+        Args:
+            bundle_path: Dossier du bundle (défaut: model_path avec l'extension .bundle)
+            source: Origine de l'artefact, enregistrée dans l'en-tête
+            
+        Returns:
+            Chemin du bundle écrit
+        """
+        if self.engine is None:
+            raise ValueError("Le modèle n'a pas encore été entraîné ou chargé")
+        
+        bundle_path = bundle_path or os.path.splitext(self.model_path)[0] + '.bundle'
+        write_bundle(
+            bundle_path,
+            self.engine,
+            self.feature_names,
+            self.risk_labels,
+            feature_importances=self.feature_importances,
+            high_risk_threshold=self.high_risk_threshold,
+            training_hash=self.training_hash,
+            source=source
+        )
+        print(f"Bundle sauvegardé dans: {bundle_path}")
+        return bundle_path
     
     def load_model(self):
-        """Charge le modèle sauvegardé"""
+        """Charge le modèle sauvegardé (pickle joblib ou bundle memmap)"""
         if not os.path.exists(self.model_path):
             raise FileNotFoundError(f"Modèle non trouvé: {self.model_path}")
         
-        model_data = joblib.load(self.model_path)
-        self.model = model_data['model']
-        self.feature_names = model_data['feature_names']
-        self.risk_labels = model_data['risk_labels']
+        if is_bundle(self.model_path):
+            # Tableaux projetés en mémoire: pas de désérialisation, pas de sklearn
+            engine, header, arrays = read_bundle(self.model_path)
+            self.model = None
+            self.feature_names = header['feature_names']
+            self.risk_labels = header['risk_labels']
+            self.training_hash = header.get('training_hash')
+            self.artifact_threshold = header.get('high_risk_threshold')
+            self.feature_importances = arrays.get('feature_importances')
+            self._compile_model(engine)
+        else:
+            import joblib  # Importe sklearn à la désérialisation
+            
+            model_data = joblib.load(self.model_path)
+            self.model = model_data['model']
+            self.feature_names = model_data['feature_names']
+            self.risk_labels = model_data['risk_labels']
+            self.training_hash = model_data.get('training_hash')
+            self.artifact_threshold = model_data.get('high_risk_threshold')
+            self._compile_model()
         
-        print(f"Modèle chargé depuis: {self.model_path}")
+        self.model_version = artifact_version(self.model_path)
+        print(f"Modèle chargé depuis: {self.model_path} (version {self.model_version})")
     
-    def predict(self, features):
+    def _compile_model(self, engine=None):
         """
-        Prédit le risque d'asthme
+        Prépare les structures d'inférence une fois pour toutes
         
         Args:
-            features: Dictionnaire ou DataFrame avec les features
+            engine: Forêt déjà compilée (bundle); sinon aplatie depuis self.model
+        """
+        # Aplatir les arbres pour l'inférence
+        if engine is None:
+            engine = CompiledForest.from_sklearn(self.model)
+            self.feature_importances = self.model.feature_importances_
+        self.engine = engine
+        
+        # Index précalculé des seuils capteurs par combinaison de features binaires
+        self.lookup_index = None
+        if self.inference_mode == 'lookup':
+            self.lookup_index = DiscreteLookupIndex(self.engine, self.feature_names)
+        
+        # Les entrées du cache appartiennent à l'ancien modèle
+        if self.cache is not None:
+            self.cache.reset(self.feature_names)
+        
+        # Table de correspondance feature -> colonne pour le chemin sans DataFrame
+        self.feature_index = {name: i for i, name in enumerate(self.feature_names)}
+        
+        # Même nettoyage des capteurs qu'à l'entraînement, appliqué aux lignes reçues
+        self.cleaning = CleaningTable(self.feature_names)
+        self._row_buffers = threading.local()
+    
+    def _evaluate_proba(self, X):
+        """Probabilités par classe selon le mode d'inférence actif"""
+        if self.lookup_index is not None:
+            return self.lookup_index.predict_proba(X)
+        return self.engine.predict_proba(X)
+    
+    def _predict_proba(self, X):
+        """
+        Probabilités par classe, en passant par le cache s'il est configuré
+        
+        Args:
+            X: Ligne (n_features,) ou matrice (n_samples, n_features)
             
         Returns:
-            prediction: Dictionnaire avec le risque et les recommandations
+            proba: Tableau (n_samples, n_classes)
         """
-        if self.model is None:
+        if self.cache is None:
+            return self._evaluate_proba(X)
+        
+        # Copie quantifiée: la clé et l'entrée du modèle sont identiques
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        self.cache.quantize(X)
+        
+        proba = np.empty((X.shape[0], len(self.engine.classes_)), dtype=np.float64)
+        keys = [row.tobytes() for row in X]
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                proba[i] = cached
+        
+        if missing:
+            computed = self._evaluate_proba(X[missing])
+            proba[missing] = computed
+            for i, value in zip(missing, computed):
+                self.cache.put(keys[i], value)
+        
+        return proba
+    
+    def verify_lookup_index(self, X):
+        """
+        Vérifie que l'index précalculé concorde avec la forêt
+        
+        Args:
+            X: Features (DataFrame ou matrice), ex: dataset d'entraînement complet
+            
+        Returns:
+            Rapport de vérification (lignes, désaccords, écart maximal)
+        """
+        self._ensure_model_loaded()
+        if self.lookup_index is None:
+            raise ValueError("L'index n'est construit qu'en mode d'inférence 'lookup'")
+        
+        if hasattr(X, 'columns'):
+            X = X[self.feature_names].to_numpy(dtype=np.float64)
+        return self.lookup_index.verify(X)
+    
+    def _ensure_model_loaded(self):
+        """Charge le modèle à la demande s'il n'est pas encore en mémoire"""
+        if self.engine is None:
             try:
                 self.load_model()
             except FileNotFoundError:
                 raise ValueError("Le modèle doit être entraîné ou chargé avant de faire des prédictions")
+    
+    def warmup(self):
+        """
+        Charge le modèle et évalue une ligne factice (sans passer par le cache)
+        
+        À appeler au démarrage du serveur: la première requête ne paie plus
+        le chargement du pickle ni la compilation des arbres.
+        """
+        self._ensure_model_loaded()
+        row = self._encode_features(dict.fromkeys(self.feature_names, 0.0))
+        self.cleaning.apply(row)
+        self._evaluate_proba(row)
+    
+    def _prepare_features(self, features):
+        """
+        Convertit et valide les features d'entrée
         
+        Args:
+            features: Dictionnaire ou DataFrame avec les features
+            
+        Returns:
+            features_df: DataFrame avec les colonnes dans l'ordre du modèle
+        """
         # Convertir en DataFrame si nécessaire
         if isinstance(features, dict):
+            import pandas as pd
+            
             features_df = pd.DataFrame([features])
         else:
             features_df = features
@@ -253,16 +709,193 @@ class AsthmaPredictor:
             raise ValueError(f"Features manquantes: {missing_features}")
         
         # Réorganiser les colonnes dans le bon ordre
-        features_df = features_df[self.feature_names]
+        return features_df[self.feature_names]
+    
+    def _encode_features(self, features, row=None):
+        """
+        Place les features d'un patient dans une ligne NumPy préallouée
+        
+        Args:
+            features: Dictionnaire {nom_feature: valeur}
+            row: Ligne de destination (ex: ligne d'une matrice de batch).
+                 Par défaut, le tampon préalloué du thread courant.
+            
+        Returns:
+            row: Ligne float64 (n_features,) dans l'ordre du modèle
+        """
+        if row is None:
+            row = getattr(self._row_buffers, 'row', None)
+            if row is None:
+                row = np.empty(len(self.feature_names), dtype=np.float64)
+                self._row_buffers.row = row
+        
+        # NaN = feature absente, détectée ci-dessous directement sur le tableau
+        row.fill(np.nan)
+        feature_index = self.feature_index
+        for name, value in features.items():
+            col = feature_index.get(name)
+            if col is not None and value is not None:
+                row[col] = value
+        
+        # Vérifier que toutes les features sont présentes
+        missing_mask = np.isnan(row)
+        if missing_mask.any():
+            missing_features = {self.feature_names[i] for i in np.flatnonzero(missing_mask)}
+            raise ValueError(f"Features manquantes: {missing_features}")
+        
+        return row
+    
+    def predict(self, features):
+        """
+        Prédit le risque d'asthme
+        
+        La forêt n'est évaluée qu'une seule fois: la classe par défaut et
+        l'alerte critique sont toutes deux dérivées du même vecteur de probabilités.
+        Un dictionnaire est encodé directement en ligne NumPy, sans passer par pandas.
+        La durée de chaque étape (encodage, forêt, recommandations) est
+        enregistrée dans instrumentation.metrics.
+        
+        Args:
+            features: Dictionnaire ou DataFrame avec les features
+            
+        Returns:
+            prediction: Dictionnaire avec le risque et les recommandations
+        """
+        self._ensure_model_loaded()
+        
+        start = time.perf_counter()
+        if isinstance(features, dict):
+            row = self._encode_features(features)
+        else:
+            # DataFrame: on ne garde que la première ligne, comme auparavant
+            features_df = self._prepare_features(features)
+            row = np.array(features_df, dtype=np.float64)[0]
+            features = dict(zip(self.feature_names, row))
+        
+        # Borner les valeurs capteurs hors des plages vues à l'entraînement
+        self.cleaning.apply(row)
+        encoded = time.perf_counter()
+        metrics.observe_stage('feature_encoding', encoded - start)
+        
+        # Prédiction avec probabilités (un seul passage sur les arbres)
+        risk_probabilities = self._predict_proba(row)[0]
+        evaluated = time.perf_counter()
+        metrics.observe_stage('forest_evaluation', evaluated - encoded)
+        
+        prediction = self._build_prediction(risk_probabilities, features)
+        metrics.observe_stage('recommendations', time.perf_counter() - evaluated)
+        return prediction
+    
+    def predict_batch(self, records):
+        """
+        Prédit le risque pour plusieurs patients en un seul passage sur la forêt
+        
+        Les features sont encodées dans une matrice N x n_features, la forêt est
+        évaluée une seule fois et le seuil critique est appliqué sur tout le
+        tableau. Une erreur sur un enregistrement n'interrompt pas le batch.
+        
+        Args:
+            records: Liste de dictionnaires {nom_feature: valeur}
+            
+        Returns:
+            results: Liste (même ordre que records) de prédictions, ou de
+                     dictionnaires {'error': message} pour les enregistrements invalides
+        """
+        self._ensure_model_loaded()
+        
+        start = time.perf_counter()
+        n_records = len(records)
+        X = np.empty((n_records, len(self.feature_names)), dtype=np.float64)
+        results = [None] * n_records
+        valid = np.zeros(n_records, dtype=bool)
+        
+        for i, features in enumerate(records):
+            try:
+                if not isinstance(features, dict):
+                    raise ValueError("Chaque enregistrement doit être un dictionnaire de features")
+                self._encode_features(features, row=X[i])
+                valid[i] = True
+            except (ValueError, TypeError) as e:
+                results[i] = {'error': str(e)}
+        
+        if not valid.any():
+            return results
+        
+        self.cleaning.apply(X)
+        valid_idx = np.flatnonzero(valid)
+        encoded = time.perf_counter()
+        metrics.observe_stage('feature_encoding', encoded - start)
+        
+        probabilities = self._predict_proba(X[valid_idx])
+        evaluated = time.perf_counter()
+        metrics.observe_stage('forest_evaluation', evaluated - encoded)
+        
+        # Classe par défaut puis seuil médical, appliqués sur tout le batch
+        classes = self.engine.classes_
+        risk_levels = classes.take(np.argmax(probabilities, axis=1))
+        if 3 in classes:
+            critical = probabilities[:, list(classes).index(3)] >= self.high_risk_threshold
+            risk_levels = np.where(critical, 3, risk_levels)
+            if critical.any():
+                request_log.log('critical_alert', always=True, patients=int(critical.sum()),
+                                batch_size=len(valid_idx), threshold=self.high_risk_threshold,
+                                model_version=self.model_version)
+        
+        for i, risk_level, risk_probabilities in zip(valid_idx, risk_levels, probabilities):
+            results[i] = self._format_prediction(int(risk_level), risk_probabilities, records[i])
+        metrics.observe_stage('recommendations', time.perf_counter() - evaluated)
+        
+        return results
+    
+    def _predict_reference(self, features):
+        """
+        Ancien chemin de prédiction (predict_proba puis predict sklearn)
+        
+        La forêt est parcourue deux fois. Conservé uniquement comme référence
+        pour les tests de parité et les benchmarks.
+        
+        Args:
+            features: Dictionnaire ou DataFrame avec les features
+            
+        Returns:
+            prediction: Dictionnaire avec le risque et les recommandations
+        """
+        self._ensure_model_loaded()
+        if self.model is None:
+            raise ValueError("Le chemin de référence nécessite le modèle sklearn (pickle)")
+        features_df = self._clean_sensor_data(self._prepare_features(features).copy())
         
-        # Prédiction avec probabilités
         risk_probabilities = self.model.predict_proba(features_df)[0]
         risk_level_default = int(self.model.predict(features_df)[0])
         
+        return self._build_prediction(
+            risk_probabilities,
+            features_df.iloc[0].to_dict(),
+            risk_level_default=risk_level_default
+        )
+    
+    def _build_prediction(self, risk_probabilities, features, risk_level_default=None):
+        """
+        Construit le résultat de prédiction à partir des probabilités
+        
+        Args:
+            risk_probabilities: Probabilités par classe (ordre de classes_)
+            features: Dictionnaire des features du patient
+            risk_level_default: Classe prédite par défaut (argmax si None)
+            
+        Returns:
+            prediction: Dictionnaire avec le risque et les recommandations
+        """
+        classes = self.engine.classes_
+        
+        # Même règle que RandomForestClassifier.predict: classe de probabilité max
+        if risk_level_default is None:
+            risk_level_default = int(classes[np.argmax(risk_probabilities)])
+        
         # Convertir les probabilités en dict
         prob_dict = {
             int(cls): float(prob) 
-            for cls, prob in zip(self.model.classes_, risk_probabilities)
+            for cls, prob in zip(classes, risk_probabilities)
         }
         
         # Appliquer le seuil médical pour la classe critique (3 = Élevé)
@@ -270,20 +903,43 @@ class AsthmaPredictor:
         risk_level = risk_level_default
         if 3 in prob_dict and prob_dict[3] >= self.high_risk_threshold:
             risk_level = 3  # Forcer alerte critique pour sécurité médicale
-            print(f"⚠️ ALERTE CRITIQUE: Probabilité classe Élevé = {prob_dict[3]:.2%} >= seuil {self.high_risk_threshold:.2%}")
+            request_log.log('critical_alert', always=True, probability=prob_dict[3],
+                            threshold=self.high_risk_threshold, model_version=self.model_version)
+        
+        return self._format_prediction(risk_level, risk_probabilities, features, prob_dict)
+    
+    def _format_prediction(self, risk_level, risk_probabilities, features, prob_dict=None):
+        """
+        Met en forme une prédiction dont le niveau de risque est déjà décidé
+        
+        Args:
+            risk_level: Niveau de risque final (après seuil médical)
+            risk_probabilities: Probabilités par classe (ordre de classes_)
+            features: Dictionnaire des features du patient
+            prob_dict: Probabilités déjà converties en dict (optionnel)
+            
+        Returns:
+            prediction: Dictionnaire avec le risque et les recommandations
+        """
+        if prob_dict is None:
+            prob_dict = {
+                int(cls): float(prob)
+                for cls, prob in zip(self.engine.classes_, risk_probabilities)
+            }
         
         # Calculer un score global (probabilité de la classe prédite)
-        risk_score = float(risk_probabilities[list(self.model.classes_).index(risk_level)])
+        risk_score = float(prob_dict[risk_level])
         
         # Générer des recommandations basées sur le niveau de risque
-        recommendations = self._generate_recommendations(risk_level, features_df.iloc[0].to_dict())
+        recommendations = self._generate_recommendations(risk_level, features)
         
         return {
             'risk_level': risk_level,
             'risk_label': self.risk_labels.get(risk_level, 'Inconnu'),
             'risk_score': risk_score,
             'probabilities': prob_dict,
-            'recommendations': recommendations
+            'recommendations': recommendations,
+            'model_version': self.model_version
         }
     
     def _generate_recommendations(self, risk_level, features):
@@ -368,10 +1024,12 @@ class AsthmaPredictor:
         Returns:
             DataFrame avec les features et leur importance
         """
-        if self.model is None:
+        if self.feature_importances is None:
             raise ValueError("Le modèle doit être entraîné ou chargé")
         
+        import pandas as pd
+        
         return pd.DataFrame({
             'feature': self.feature_names,
-            'importance': self.model.feature_importances_
+            'importance': self.feature_importances
         }).sort_values('importance', ascending=False)
@@ -0,0 +1,190 @@
+"""
+Format d'artefact du modèle en tableaux projetés en mémoire (memmap)
+
+Un bundle est un dossier (ex: models/asthma_model.bundle/) contenant:
+- header.json: format, version, noms des features, classes, libellés de
+  risque, seuil critique, empreinte des données d'entraînement et
+  description (dtype, shape) de chaque tableau
+- un fichier .npy par tableau de noeuds de la forêt compilée
+
+Au chargement, les .npy sont ouverts en lecture seule via np.memmap: aucune
+désérialisation, et tous les workers partagent la même copie en page cache.
+"""
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from compiled_forest import CompiledForest
+
+BUNDLE_FORMAT = 'asthma-forest-bundle'
+BUNDLE_VERSION = 1
+HEADER_FILE = 'header.json'
+
+# Tableaux de la forêt compilée enregistrés dans le bundle
+ENGINE_ARRAYS = ('feature', 'threshold', 'children_left', 'children_right', 'value', 'roots')
+
+# Lignes converties à la fois par hash_training_data
+HASH_BLOCK_ROWS = 65536
+
+
+def is_bundle(path):
+    """Vrai si path est un bundle (dossier contenant un header.json)"""
+    return os.path.isfile(os.path.join(path, HEADER_FILE))
+
+
+def file_sha256(path):
+    """Empreinte SHA-256 d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_version(path):
+    """
+    Version courte d'un artefact de modèle (12 caractères hexadécimaux)
+
+    Empreinte du pickle, ou de l'en-tête d'un bundle (qui contient
+    l'empreinte des données d'entraînement et de l'artefact source).
+    """
+    return file_sha256(os.path.join(path, HEADER_FILE) if is_bundle(path) else path)[:12]
+
+
+def hash_training_data(X, y, parent=None, block_rows=HASH_BLOCK_ROWS):
+    """
+    Empreinte SHA-256 des données d'entraînement
+
+    Les lignes sont lues par blocs: seul un bloc à la fois est converti en
+    float64, quelle que soit la taille du dataset (même empreinte qu'une
+    conversion complète).
+
+    Args:
+        X: Features (DataFrame ou tableau)
+        y: Cible
+        parent: Empreinte du modèle mis à jour (entraînement incrémental):
+                l'empreinte couvre alors tout l'historique
+        block_rows: Lignes par bloc
+
+    Returns:
+        Empreinte hexadécimale
+    """
+    digest = hashlib.sha256()
+    if parent:
+        digest.update(parent.encode('ascii'))
+    rows = X.iloc if hasattr(X, 'iloc') else X
+    for start in range(0, len(X), block_rows):
+        digest.update(np.ascontiguousarray(np.asarray(rows[start:start + block_rows], dtype=np.float64)))
+    y = np.asarray(y)
+    for start in range(0, len(y), block_rows):
+        digest.update(np.ascontiguousarray(y[start:start + block_rows], dtype=np.int64))
+    return digest.hexdigest()
+
+
+def publish_directory(tmp_path, path):
+    """
+    Remplace le dossier path par tmp_path, entièrement écrit
+
+    L'ancien dossier est renommé à côté puis supprimé une fois le nouveau
+    en place: le dossier publié n'est jamais partiellement supprimé, et
+    les lecteurs qui ont déjà ouvert ses fichiers (memmap) les conservent.
+
+    Args:
+        tmp_path: Dossier complet à publier
+        path: Dossier de destination
+    """
+    old_path = path.rstrip(os.sep) + '.old'
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.isdir(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def write_bundle(path, engine, feature_names, risk_labels, feature_importances=None,
+                 high_risk_threshold=None, training_hash=None, source=None):
+    """
+    Écrit un bundle (dans un dossier temporaire puis renommé)
+
+    Args:
+        path: Dossier du bundle
+        engine: CompiledForest du modèle
+        feature_names: Noms des features dans l'ordre du modèle
+        risk_labels: Libellés par classe {1: 'Faible', ...}
+        feature_importances: Importance des features (optionnel)
+        high_risk_threshold: Seuil critique associé au modèle
+        training_hash: Empreinte des données d'entraînement (hash_training_data)
+        source: Origine de l'artefact (ex: pickle converti)
+    """
+    arrays = {name: getattr(engine, name) for name in ENGINE_ARRAYS}
+    arrays['classes'] = np.asarray(engine.classes_)
+    if feature_importances is not None:
+        arrays['feature_importances'] = np.asarray(feature_importances, dtype=np.float64)
+
+    header = {
+        'format': BUNDLE_FORMAT,
+        'version': BUNDLE_VERSION,
+        'feature_names': list(feature_names),
+        'classes': [int(c) for c in engine.classes_],
+        'risk_labels': {str(k): v for k, v in risk_labels.items()},
+        'n_estimators': engine.n_estimators,
+        'max_depth': engine.max_depth,
+        'high_risk_threshold': high_risk_threshold,
+        'training_hash': training_hash,
+        'source': source,
+        'arrays': {
+            name: {'dtype': array.dtype.str, 'shape': list(array.shape)}
+            for name, array in arrays.items()
+        }
+    }
+
+    tmp_path = path.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(tmp_path, HEADER_FILE), 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2, ensure_ascii=False)
+
+    publish_directory(tmp_path, path)
+
+
+def read_bundle(path):
+    """
+    Ouvre un bundle sans copier les tableaux (memmap en lecture seule)
+
+    Args:
+        path: Dossier du bundle
+
+    Returns:
+        (engine, header, arrays): CompiledForest, en-tête JSON (libellés de
+        risque aux clés entières) et tableaux supplémentaires (ex: feature_importances)
+
+    Raises:
+        ValueError: format, version ou tableau incompatible
+    """
+    with open(os.path.join(path, HEADER_FILE), encoding='utf-8') as f:
+        header = json.load(f)
+
+    if header.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"Format d'artefact inconnu: {header.get('format')}")
+    if header.get('version') != BUNDLE_VERSION:
+        raise ValueError(f"Version d'artefact non supportée: {header.get('version')} (attendu: {BUNDLE_VERSION})")
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        array = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+        if array.dtype.str != spec['dtype'] or list(array.shape) != spec['shape']:
+            raise ValueError(f"Tableau {name} incohérent avec l'en-tête")
+        arrays[name] = array
+
+    engine = CompiledForest(
+        **{name: arrays.pop(name) for name in ENGINE_ARRAYS},
+        classes=np.array(arrays.pop('classes')),
+        max_depth=header['max_depth']
+    )
+    header['risk_labels'] = {int(k): v for k, v in header['risk_labels'].items()}
+
+    return engine, header, arrays
@@ -0,0 +1,195 @@
+"""
+Rechargement à chaud du modèle sans interruption du service
+
+Le ModelManager détient le AsthmaPredictor actif. Un nouvel artefact
+(détecté par surveillance du fichier ou demandé par l'endpoint admin) est
+chargé dans un prédicteur neuf, validé, préchauffé, puis substitué à
+l'ancien par une simple affectation de référence (atomique).
+
+Chaque requête récupère le prédicteur actif une seule fois (current()) et
+l'utilise jusqu'au bout: les requêtes en cours terminent sur l'ancien
+modèle. Seuil, noms de features et cache de prédictions appartiennent au
+prédicteur et changent donc avec lui.
+"""
+import os
+import threading
+import time
+import numpy as np
+from model_bundle import HEADER_FILE, is_bundle
+
+
+def artifact_mtime(path):
+    """Date de modification de l'artefact (en-tête pour un bundle), None s'il est absent"""
+    try:
+        return os.path.getmtime(os.path.join(path, HEADER_FILE) if is_bundle(path) else path)
+    except OSError:
+        return None
+
+
+class ModelManager:
+    """Prédicteur actif et rechargement à chaud"""
+
+    def __init__(self, model_path, factory):
+        """
+        Args:
+            model_path: Chemin de l'artefact (pickle ou bundle)
+            factory: Fonction chemin -> AsthmaPredictor non chargé (mode
+                     d'inférence, seuil par défaut, cache neuf, ...)
+        """
+        self.model_path = model_path
+        self.factory = factory
+        self._predictor = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._loaded_mtime = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+
+    @property
+    def active(self):
+        """Prédicteur actif sans chargement à la demande (None si aucun)"""
+        return self._predictor
+
+    def current(self):
+        """
+        Prédicteur actif (chargé à la demande au premier appel)
+
+        À appeler une fois par requête: la référence obtenue reste valide
+        même si un rechargement a lieu pendant la requête.
+        """
+        predictor = self._predictor
+        if predictor is None:
+            with self._reload_lock:
+                if self._predictor is None:
+                    self._swap(self._load(self.model_path), self.model_path)
+            predictor = self._predictor
+        return predictor
+
+    def _load(self, model_path):
+        """Charge, valide et préchauffe un prédicteur sans toucher au prédicteur actif"""
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Modèle non trouvé: {model_path}")
+
+        candidate = self.factory(model_path)
+        candidate.load_model()
+
+        # Le seuil critique enregistré avec le modèle change avec lui
+        if candidate.artifact_threshold is not None:
+            candidate.high_risk_threshold = candidate.artifact_threshold
+
+        self._validate(candidate)
+        candidate.warmup()
+        return candidate
+
+    def _validate(self, candidate):
+        """
+        Vérifie qu'un modèle peut remplacer le modèle actif
+
+        Raises:
+            ValueError: features différentes, classe critique absente ou
+                        probabilités invalides
+        """
+        active = self._predictor
+        if active is not None and set(candidate.feature_names) != set(active.feature_names):
+            raise ValueError(
+                f"Features incompatibles avec le modèle actif: "
+                f"{set(candidate.feature_names) ^ set(active.feature_names)}"
+            )
+        if 3 not in candidate.engine.classes_:
+            raise ValueError("Le modèle ne prédit pas la classe critique (3)")
+
+        proba = candidate.engine.predict_proba(np.zeros((1, len(candidate.feature_names))))
+        if not np.all(np.isfinite(proba)) or not np.isclose(proba.sum(), 1.0):
+            raise ValueError("Probabilités invalides sur la ligne de test")
+
+    def _swap(self, candidate, model_path):
+        """Active un prédicteur validé (affectation atomique)"""
+        self._predictor = candidate
+        self.model_path = model_path
+        self._loaded_mtime = artifact_mtime(model_path)
+        self.loaded_at = time.time()
+
+    def reload(self, model_path=None):
+        """
+        Charge un nouvel artefact puis l'active s'il est valide
+
+        Le modèle actif continue de servir pendant le chargement; en cas
+        d'erreur il reste actif.
+
+        Args:
+            model_path: Nouvel artefact (défaut: l'artefact actuel, relu)
+
+        Returns:
+            Le prédicteur activé
+
+        Raises:
+            FileNotFoundError, ValueError: artefact absent ou invalide
+        """
+        model_path = model_path or self.model_path
+        with self._reload_lock:
+            try:
+                candidate = self._load(model_path)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{model_path}: {e}"
+                print(f"❌ Rechargement du modèle refusé ({self.last_error})")
+                raise
+
+            previous = self._predictor
+            self._swap(candidate, model_path)
+            self.reloads += 1
+            self.last_error = None
+
+        print(f"🔄 Modèle {candidate.model_version} actif "
+              f"(précédent: {previous.model_version if previous else 'aucun'})")
+        return candidate
+
+    def _watch(self, interval):
+        """Boucle de surveillance: recharge quand l'artefact a changé et est stable"""
+        pending = None
+        while True:
+            time.sleep(interval)
+            mtime = artifact_mtime(self.model_path)
+            if mtime is None or mtime == self._loaded_mtime:
+                pending = None
+                continue
+            # Attendre une période sans modification avant de recharger
+            if mtime != pending:
+                pending = mtime
+                continue
+            try:
+                self.reload()
+            except Exception:
+                # Ne pas réessayer le même artefact invalide à chaque tour
+                self._loaded_mtime = mtime
+            pending = None
+
+    def start_watching(self, interval):
+        """
+        Démarre la surveillance de l'artefact dans un thread (une fois par processus)
+
+        Args:
+            interval: Période de scrutation en secondes (<= 0: désactivée)
+        """
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name='model-watcher', daemon=True
+        )
+        self._watcher.start()
+
+    def status(self):
+        """État du modèle actif et des rechargements"""
+        predictor = self._predictor
+        return {
+            'model_version': predictor.model_version if predictor else None,
+            'model_path': self.model_path,
+            'high_risk_threshold': predictor.high_risk_threshold if predictor else None,
+            'loaded_at': self.loaded_at,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'watching': self._watcher is not None and self._watcher.is_alive()
+        }
@@ -0,0 +1,151 @@
+"""
+Cache LRU des prédictions, indexé sur le vecteur de features quantifié
+
+Beaucoup de requêtes /api/predict répètent les mêmes symptômes et
+demographics avec la même dernière lecture ESP32: le vecteur de probabilités
+de la forêt est alors mémorisé plutôt que recalculé.
+"""
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+def parse_quantization(spec):
+    """
+    Lit une configuration de quantification "Feature=pas,Feature=pas"
+
+    Args:
+        spec: Chaîne, ex: "Humidity=0.5,Temperature=0.1,PM25=1"
+
+    Returns:
+        Dictionnaire {nom_feature: pas}
+    """
+    quantization = {}
+    for item in (spec or '').split(','):
+        if not item.strip():
+            continue
+        name, _, step = item.partition('=')
+        quantization[name.strip()] = float(step)
+    return quantization
+
+
+class PredictionCache:
+    """Cache LRU borné avec expiration (TTL) et compteurs d'utilisation"""
+
+    def __init__(self, max_size=4096, ttl=60.0, quantization=None):
+        """
+        Initialise le cache
+
+        Args:
+            max_size: Nombre maximal d'entrées (éviction LRU au-delà)
+            ttl: Durée de vie d'une entrée en secondes (None = illimitée)
+            quantization: Pas de quantification par feature capteur,
+                          ex: {'Humidity': 0.5, 'PM25': 1.0}. Les valeurs sont
+                          arrondies au pas avant la prédiction ET pour la clé,
+                          le résultat ne dépend donc pas de l'ordre des requêtes.
+        """
+        if max_size <= 0:
+            raise ValueError("max_size doit être strictement positif")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.quantization = dict(quantization or {})
+        self._entries = OrderedDict()  # clé -> (expiration, probabilités)
+        self._lock = threading.Lock()
+        self._quantize_cols = np.empty(0, dtype=np.intp)
+        self._quantize_steps = np.empty(0, dtype=np.float64)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def reset(self, feature_names):
+        """
+        Vide le cache et l'aligne sur les features d'un nouveau modèle
+
+        Args:
+            feature_names: Noms des features dans l'ordre du modèle
+        """
+        unknown = set(self.quantization) - set(feature_names)
+        if unknown:
+            raise ValueError(f"Quantification sur des features inconnues: {unknown}")
+
+        names = [name for name in feature_names if name in self.quantization]
+        with self._lock:
+            self._quantize_cols = np.array([feature_names.index(name) for name in names], dtype=np.intp)
+            self._quantize_steps = np.array([self.quantization[name] for name in names], dtype=np.float64)
+            self._entries.clear()
+            self.invalidations += 1
+
+    def quantize(self, X):
+        """
+        Arrondit en place les capteurs configurés au pas de quantification
+
+        Args:
+            X: Ligne (n_features,) ou matrice (n_samples, n_features) float64
+        """
+        if len(self._quantize_cols):
+            cols = self._quantize_cols
+            X[..., cols] = np.round(X[..., cols] / self._quantize_steps) * self._quantize_steps
+
+    def get(self, key):
+        """
+        Retourne les probabilités mémorisées pour une clé, ou None
+
+        Args:
+            key: Clé (octets du vecteur de features quantifié)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Mémorise les probabilités d'une clé
+
+        Args:
+            key: Clé (octets du vecteur de features quantifié)
+            value: Vecteur de probabilités (rendu non modifiable)
+        """
+        value = np.array(value, dtype=np.float64)
+        value.setflags(write=False)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """Compteurs d'utilisation du cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'quantization': self.quantization,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
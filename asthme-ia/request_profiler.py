@@ -0,0 +1,346 @@
+"""
+Profilage à la demande des requêtes de prédiction
+
+Trois modes, un rapport par requête profilée:
+- 'cprofile': profil déterministe (cProfile), fonctions triées par temps cumulé
+- 'sampling': échantillonnage de la pile du thread de la requête à
+  intervalle fixe, piles agrégées au format "folded" (flamegraph.pl, speedscope).
+  L'échantillonneur attend le GIL (sys.getswitchinterval(), 5 ms par défaut):
+  adapté aux requêtes lentes, cprofile pour une prédiction de l'ordre de la ms
+- 'tracemalloc': allocations de la requête (pic mémoire, lignes qui allouent le plus)
+
+Le profilage est armé pour les N prochaines requêtes (RequestProfiler.arm)
+ou demandé pour une requête précise (main.py: en-tête X-Profile). Une seule
+requête est profilée à la fois par processus (cProfile et tracemalloc ne
+supportent pas de sessions concurrentes): les autres sont servies normalement.
+
+Les rapports récents restent en mémoire et peuvent être écrits sur disque
+(.prof lisible par pstats/snakeviz, .folded, .txt). Une erreur d'écriture
+est signalée dans le rapport sans faire échouer la requête profilée.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+PROFILE_MODES = ('cprofile', 'sampling', 'tracemalloc')
+
+# Intervalle d'échantillonnage de la pile (secondes)
+SAMPLING_INTERVAL = 0.001
+
+# Profondeur des piles conservées par tracemalloc
+TRACEMALLOC_FRAMES = 10
+
+
+class _ProfileSession:
+    """Profilage d'une requête: start() / stop() autour de la requête, puis report()"""
+
+    mode = None
+    extension = None
+
+    def __init__(self, limit):
+        """
+        Args:
+            limit: Nombre de lignes du rapport
+        """
+        self.limit = limit
+        self.started_at = datetime.now().isoformat()
+        self.start_time = time.perf_counter()
+
+
+class _CProfileSession(_ProfileSession):
+    """Profil cProfile du thread courant"""
+
+    mode = 'cprofile'
+    extension = '.prof'
+
+    def __init__(self, limit):
+        super().__init__(limit)
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def report(self):
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.strip_dirs().sort_stats('cumulative').print_stats(self.limit)
+        return {'text': stream.getvalue()}
+
+    def write(self, path):
+        self.profile.dump_stats(path)
+
+
+class _SamplingSession(_ProfileSession):
+    """Échantillonnage périodique de la pile d'un thread (par un thread dédié)"""
+
+    mode = 'sampling'
+    extension = '.folded'
+
+    def __init__(self, limit, interval=SAMPLING_INTERVAL):
+        super().__init__(limit)
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._sampler.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def folded(self):
+        """Piles agrégées, une ligne "racine;...;feuille nombre" par pile"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+    def report(self):
+        top = self.stacks.most_common(self.limit)
+        return {
+            'samples': self.samples,
+            'interval': self.interval,
+            'text': ''.join(f'{stack} {count}\n' for stack, count in top)
+        }
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.folded())
+
+
+class _TracemallocSession(_ProfileSession):
+    """Allocations effectuées pendant la requête (tracemalloc, global au processus)"""
+
+    mode = 'tracemalloc'
+    extension = '.txt'
+
+    def __init__(self, limit):
+        super().__init__(limit)
+        self.snapshot = None
+        self.peak = 0
+        self.current = 0
+        self._was_tracing = False
+
+    def start(self):
+        # Traçage déjà actif (ex: PYTHONTRACEMALLOC): seul le pic est remis à zéro
+        self._was_tracing = tracemalloc.is_tracing()
+        if self._was_tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    def stop(self):
+        self.current, self.peak = tracemalloc.get_traced_memory()
+        self.snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        if not self._was_tracing:
+            tracemalloc.stop()
+
+    def report(self):
+        lines = [
+            f'{stat.traceback[0].filename}:{stat.traceback[0].lineno} '
+            f'size={stat.size} count={stat.count}\n'
+            for stat in self.snapshot.statistics('lineno')[:self.limit]
+        ]
+        return {'peak_bytes': self.peak, 'allocated_bytes': self.current, 'text': ''.join(lines)}
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f'peak_bytes={self.peak} allocated_bytes={self.current}\n')
+            for stat in self.snapshot.statistics('traceback')[:self.limit]:
+                f.write(f'\nsize={stat.size} count={stat.count}\n')
+                f.write('\n'.join(stat.traceback.format()) + '\n')
+
+
+_SESSIONS = {session.mode: session for session in (_CProfileSession, _SamplingSession, _TracemallocSession)}
+
+
+class RequestProfiler:
+    """Profilage des N prochaines requêtes ou d'une requête précise, rapports conservés"""
+
+    def __init__(self, output_dir=None, keep=20, limit=40, paths=('/api/predict',)):
+        """
+        Args:
+            output_dir: Dossier où écrire chaque rapport (None = mémoire uniquement)
+            keep: Nombre de rapports conservés en mémoire
+            limit: Nombre de lignes (fonctions, piles, allocations) par rapport
+            paths: Chemins profilés quand le profileur est armé
+        """
+        self.output_dir = output_dir
+        self.keep = keep
+        self.limit = limit
+        self.paths = tuple(paths)
+        self.mode = None
+        self.remaining = 0
+        self.profiled = 0
+        self.skipped = 0  # Requêtes non profilées: une autre session était en cours
+        self._reports = OrderedDict()
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+
+    @property
+    def armed(self):
+        """Vrai s'il reste des requêtes à profiler"""
+        return self.remaining > 0
+
+    def arm(self, mode, requests=1, paths=None):
+        """
+        Profile les prochaines requêtes des chemins surveillés
+
+        Args:
+            mode: 'cprofile', 'sampling' ou 'tracemalloc'
+            requests: Nombre de requêtes à profiler (0 = désarmer)
+            paths: Chemins surveillés (défaut: inchangés)
+
+        Raises:
+            ValueError: mode inconnu ou nombre de requêtes négatif
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Mode de profilage inconnu: {mode} (attendu: {PROFILE_MODES})")
+        if requests < 0:
+            raise ValueError("Le nombre de requêtes à profiler doit être positif")
+        with self._lock:
+            self.mode = mode
+            self.remaining = int(requests)
+            if paths is not None:
+                self.paths = tuple(paths)
+
+    def begin(self, path, mode=None):
+        """
+        Démarre le profilage d'une requête si elle doit l'être
+
+        Args:
+            path: Chemin de la requête
+            mode: Mode demandé explicitement pour cette requête (sinon: profileur armé)
+
+        Returns:
+            Session démarrée, ou None si la requête n'est pas profilée
+
+        Raises:
+            ValueError: mode inconnu
+        """
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Mode de profilage inconnu: {mode} (attendu: {PROFILE_MODES})")
+        if mode is None and not (self.armed and path in self.paths):
+            return None
+
+        if not self._active.acquire(blocking=False):
+            self.skipped += 1
+            return None
+
+        if mode is None:
+            with self._lock:
+                if self.remaining <= 0:
+                    self._active.release()
+                    return None
+                self.remaining -= 1
+                mode = self.mode
+
+        try:
+            session = _SESSIONS[mode](self.limit)
+            session.start()
+        except Exception:
+            self._active.release()
+            raise
+        return session
+
+    def end(self, session, **info):
+        """
+        Arrête une session et enregistre son rapport
+
+        Args:
+            session: Session renvoyée par begin()
+            **info: Informations de la requête (ex: path, method, status)
+
+        Returns:
+            Identifiant du rapport
+        """
+        try:
+            session.stop()
+            duration = time.perf_counter() - session.start_time
+        finally:
+            self._active.release()
+
+        with self._lock:
+            self.profiled += 1
+            profile_id = f'{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}-{self.profiled}-{session.mode}'
+
+        report = dict(
+            id=profile_id,
+            mode=session.mode,
+            **info,
+            started_at=session.started_at,
+            duration=duration,
+            **session.report()
+        )
+        if self.output_dir:
+            # Disque plein ou dossier inaccessible: le rapport reste consultable en mémoire
+            try:
+                report['file'] = self._write(session, profile_id)
+            except OSError as e:
+                print(f"⚠️ Rapport de profilage {profile_id} non écrit: {e}")
+                report['file'] = None
+                report['write_error'] = str(e)
+
+        with self._lock:
+            self._reports[profile_id] = report
+            while len(self._reports) > self.keep:
+                self._reports.popitem(last=False)
+        return profile_id
+
+    def _write(self, session, profile_id):
+        """Écrit le rapport complet d'une session (fichier temporaire puis renommé)"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, profile_id + session.extension)
+        tmp_path = path + '.tmp'
+        session.write(tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    def get(self, profile_id):
+        """Rapport complet (None si inconnu ou plus conservé)"""
+        return self._reports.get(profile_id)
+
+    def status(self):
+        """État du profileur et résumé des rapports conservés"""
+        with self._lock:
+            reports = [
+                {key: value for key, value in report.items() if key != 'text'}
+                for report in self._reports.values()
+            ]
+        return {
+            'mode': self.mode if self.armed else None,
+            'remaining': self.remaining,
+            'paths': list(self.paths),
+            'profiled': self.profiled,
+            'skipped': self.skipped,
+            'reports': reports
+        }
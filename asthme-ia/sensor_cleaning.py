@@ -0,0 +1,66 @@
+"""
+Nettoyage des valeurs aberrantes des capteurs par table déclarative
+
+Chaque règle donne, pour une feature, la plage acceptée et les valeurs de
+remplacement en dessous / au-dessus. La même routine vectorisée applique
+la table en place sur une matrice d'entraînement ou sur une ligne de
+features reçue en production: entraînement et service partagent donc
+exactement le même nettoyage.
+"""
+import numpy as np
+
+# (feature, minimum, maximum, remplacement si < minimum, remplacement si > maximum)
+SENSOR_CLEANING_RULES = (
+    ('Temperature', 35, 42, 36.5, 37.0),  # Température corporelle normale: 35-42°C
+    ('Humidity', 0, 100, 30, 70),  # Humidité: 0-100%
+    ('PM25', 0, 500, 0, 500),  # PM2.5: 0-500 µg/m³ (valeurs réalistes)
+    ('AQI', 0, 500, 0, 500),  # AQI: 0-500
+    ('Heart_Rate', 40, 200, 70, 100),  # Fréquence cardiaque: 40-200 bpm
+    ('RespiratoryRate', 10, 40, 16, 25),  # Fréquence respiratoire: 10-40 respirations/min
+)
+
+
+class CleaningTable:
+    """Table de nettoyage compilée pour un ordre de colonnes donné"""
+
+    __slots__ = ('columns', 'low', 'high', 'low_replacement', 'high_replacement')
+
+    def __init__(self, column_names, rules=SENSOR_CLEANING_RULES):
+        """
+        Args:
+            column_names: Noms des colonnes de la matrice à nettoyer
+            rules: Règles (feature, min, max, remplacement bas, remplacement haut);
+                   les features absentes de column_names sont ignorées
+        """
+        column_names = list(column_names)
+        rules = [rule for rule in rules if rule[0] in column_names]
+
+        self.columns = np.array([column_names.index(rule[0]) for rule in rules], dtype=np.intp)
+        self.low = np.array([rule[1] for rule in rules], dtype=np.float64)
+        self.high = np.array([rule[2] for rule in rules], dtype=np.float64)
+        self.low_replacement = np.array([rule[3] for rule in rules], dtype=np.float64)
+        self.high_replacement = np.array([rule[4] for rule in rules], dtype=np.float64)
+
+    def apply(self, X):
+        """
+        Nettoie en place une matrice (n_samples, n_colonnes) ou une ligne
+
+        Les valeurs manquantes (NaN) sont laissées telles quelles.
+
+        Args:
+            X: Tableau float NumPy modifiable
+
+        Returns:
+            X (le même tableau, pour chaînage)
+        """
+        matrix = X.reshape(1, -1) if X.ndim == 1 else X
+        mask = np.empty(matrix.shape[0], dtype=bool)
+
+        for i, col in enumerate(self.columns):
+            values = matrix[:, col]
+            np.less(values, self.low[i], out=mask)
+            np.copyto(values, self.low_replacement[i], where=mask)
+            np.greater(values, self.high[i], out=mask)
+            np.copyto(values, self.high_replacement[i], where=mask)
+
+        return X
@@ -0,0 +1,177 @@
+"""
+Ingestion groupée des lectures capteurs (passerelles ESP32)
+
+Les passerelles accumulent les lectures et les envoient par paquets.
+Trois formats sont acceptés et convertis en une matrice NumPy (N x 4):
+- JSON par lignes:   {"readings": [{"temperature": 22.5, ...}, ...]}
+- JSON en colonnes:  {"columns": {"temperature": [...], "humidity": [...], ...}}
+- binaire compact:   enregistrements struct '<dffff' (timestamp, T, H, PM2.5, FR)
+
+La validation, le bornage et l'estimation de la fréquence respiratoire sont
+appliqués sur tout le paquet en une seule fois.
+"""
+import numpy as np
+from sensor_cleaning import CleaningTable
+from sensor_store import HISTORY_CHANNELS
+
+# Nom des canaux dans les requêtes JSON (même ordre que HISTORY_CHANNELS)
+JSON_CHANNELS = ('temperature', 'humidity', 'pm25', 'respiratoryRate')
+
+# Enregistrement binaire little-endian: timestamp epoch (float64) + 4 canaux (float32), NaN = absent
+BINARY_RECORD = np.dtype([
+    ('timestamp', '<f8'),
+    ('temperature', '<f4'),
+    ('humidity', '<f4'),
+    ('pm25', '<f4'),
+    ('respiratory_rate', '<f4'),
+])
+
+# Plages physiques des capteurs (DHT22, PMS5003): les valeurs hors plage sont bornées
+SENSOR_VALID_RANGES = {
+    'temperature': (-40.0, 80.0),
+    'humidity': (0.0, 100.0),
+    'pm25': (0.0, 1000.0),
+    'respiratory_rate': (0.0, 60.0),
+}
+
+# Même table déclarative que le nettoyage du modèle, remplacement = borne
+SENSOR_CLAMP = CleaningTable(
+    HISTORY_CHANNELS,
+    rules=[(channel, low, high, low, high) for channel, (low, high) in SENSOR_VALID_RANGES.items()]
+)
+
+
+def estimate_respiratory_rates(pm25, humidity, rng=None):
+    """
+    Génère des fréquences respiratoires réalistes quand l'ESP32 ne les mesure pas
+
+    Plage normale : 12-20 respirations/minute, ajustée selon la qualité de
+    l'air et l'humidité (valeurs NaN = pas d'ajustement).
+
+    Args:
+        pm25: Tableau des PM2.5
+        humidity: Tableau des humidités
+        rng: Générateur aléatoire NumPy (optionnel)
+
+    Returns:
+        Tableau des fréquences respiratoires (arrondies à 0.1)
+    """
+    rng = rng or np.random.default_rng()
+    pm25 = np.asarray(pm25, dtype=np.float64)
+    humidity = np.asarray(humidity, dtype=np.float64)
+    n = len(pm25)
+
+    base_rate = np.full(n, 16.0)  # Fréquence normale au repos
+
+    # Ajuster selon la qualité de l'air (PM2.5)
+    base_rate += np.where(pm25 > 55, rng.uniform(2.0, 4.0, n),  # Très mauvais
+                          np.where(pm25 > 35, rng.uniform(1.0, 2.5, n), 0.0))  # Mauvais
+
+    # Ajuster selon l'humidité
+    base_rate += np.where(humidity > 70, rng.uniform(0.5, 1.5, n),  # Trop humide
+                          np.where(humidity < 30, rng.uniform(0.5, 1.0, n), 0.0))  # Trop sec
+
+    # Ajouter une petite variation naturelle
+    return np.round(base_rate + rng.uniform(-1.0, 1.0, n), 1)
+
+
+def _to_float_column(values, n):
+    """Convertit une colonne JSON (None autorisé) en float64, NaN si absente"""
+    if values is None:
+        return np.full(n, np.nan)
+    if len(values) != n:
+        raise ValueError("Toutes les colonnes doivent avoir la même longueur")
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def parse_json_rows(readings, default_device_id):
+    """
+    Convertit une liste de lectures JSON en colonnes
+
+    Returns:
+        (device_ids, values (N x 4), timestamps (NaN si absent))
+    """
+    if not isinstance(readings, list) or not all(isinstance(r, dict) for r in readings):
+        raise ValueError('"readings" doit être une liste d\'objets')
+
+    n = len(readings)
+    columns = {
+        name: [r.get(name, r.get('pm1') if name == 'pm25' else None) for r in readings]
+        for name in JSON_CHANNELS
+    }
+    values = np.column_stack([_to_float_column(columns[name], n) for name in JSON_CHANNELS]) \
+        if n else np.empty((0, len(JSON_CHANNELS)))
+    timestamps = _to_float_column([r.get('timestamp') for r in readings], n)
+    device_ids = [str(r.get('device_id', default_device_id)) for r in readings]
+    return device_ids, values, timestamps
+
+
+def parse_json_columns(columns, default_device_id):
+    """
+    Convertit un paquet JSON en colonnes
+
+    Returns:
+        (device_ids, values (N x 4), timestamps (NaN si absent))
+    """
+    if not isinstance(columns, dict) or not columns:
+        raise ValueError('"columns" doit être un objet de listes')
+
+    n = max(len(v) for v in columns.values() if isinstance(v, list))
+    values = np.column_stack([_to_float_column(columns.get(name), n) for name in JSON_CHANNELS])
+    timestamps = _to_float_column(columns.get('timestamp'), n)
+
+    device_column = columns.get('device_id')
+    if device_column is None:
+        device_ids = [default_device_id] * n
+    else:
+        if len(device_column) != n:
+            raise ValueError("Toutes les colonnes doivent avoir la même longueur")
+        device_ids = [str(d) for d in device_column]
+    return device_ids, values, timestamps
+
+
+def parse_binary(payload, device_id):
+    """
+    Décode un paquet binaire d'enregistrements BINARY_RECORD
+
+    Returns:
+        (device_ids, values (N x 4), timestamps)
+    """
+    if len(payload) % BINARY_RECORD.itemsize:
+        raise ValueError(f"Taille du paquet binaire invalide (multiple de {BINARY_RECORD.itemsize} octets attendu)")
+
+    records = np.frombuffer(payload, dtype=BINARY_RECORD)
+    values = np.column_stack([records[name].astype(np.float64) for name in HISTORY_CHANNELS]) \
+        if len(records) else np.empty((0, len(HISTORY_CHANNELS)))
+    return [device_id] * len(records), values, records['timestamp'].astype(np.float64)
+
+
+def clean_readings(values, timestamps, received_at, rng=None):
+    """
+    Valide, borne et complète un paquet de lectures en place
+
+    Args:
+        values: Matrice (N x 4) dans l'ordre de HISTORY_CHANNELS (NaN = absent)
+        timestamps: Dates epoch (NaN = date de réception)
+        received_at: Date de réception epoch
+        rng: Générateur aléatoire pour l'estimation de fréquence respiratoire
+
+    Returns:
+        accepted: Masque des lectures conservées (au moins un canal présent)
+    """
+    values[~np.isfinite(values)] = np.nan
+
+    SENSOR_CLAMP.apply(values)
+
+    # Fréquence respiratoire absente ou nulle: estimation comme /api/sensors
+    rr_col = HISTORY_CHANNELS.index('respiratory_rate')
+    missing_rr = np.isnan(values[:, rr_col]) | (values[:, rr_col] == 0)
+    if missing_rr.any():
+        pm25 = values[missing_rr, HISTORY_CHANNELS.index('pm25')]
+        humidity = values[missing_rr, HISTORY_CHANNELS.index('humidity')]
+        values[missing_rr, rr_col] = estimate_respiratory_rates(pm25, humidity, rng)
+
+    timestamps[~np.isfinite(timestamps)] = received_at
+
+    # Une lecture sans aucun capteur environnemental est rejetée
+    return ~np.isnan(values[:, :rr_col]).all(axis=1)
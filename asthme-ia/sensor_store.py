@@ -0,0 +1,349 @@
+"""
+Stockage en mémoire des données capteurs, par appareil ESP32
+
+Chaque appareil possède sa dernière lecture, indexée par son identifiant
+(accès O(1)). Une lecture n'est jamais modifiée après création: une
+nouvelle lecture remplace simplement l'ancienne dans le dictionnaire,
+les lectures sont donc sans verrou. Les écritures sont protégées par un
+jeu de verrous répartis par appareil pour éviter la contention globale.
+
+Chaque appareil garde aussi un historique circulaire (SensorHistory) des N
+dernières lectures, avec des agrégats glissants mis à jour en O(1).
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import numpy as np
+
+# Appareil utilisé lorsque la requête ne précise pas d'identifiant
+DEFAULT_DEVICE_ID = 'default'
+
+# Nombre de verrous répartis entre les appareils
+LOCK_STRIPES = 64
+
+# Taille par défaut de l'historique par appareil et coefficient de l'EWMA
+HISTORY_SIZE = 120
+EWMA_ALPHA = 0.3
+
+# Canaux de l'historique (ordre des colonnes) et attribut SensorReading associé
+HISTORY_CHANNELS = ('temperature', 'humidity', 'pm25', 'respiratory_rate')
+
+
+class SensorReading:
+    """Lecture capteurs d'un appareil (immuable par convention)"""
+
+    __slots__ = ('device_id', 'temperature', 'humidity', 'pm25', 'respiratory_rate', 'timestamp')
+
+    def __init__(self, device_id, temperature, humidity, pm25, respiratory_rate, timestamp):
+        """
+        Args:
+            device_id: Identifiant de l'appareil ESP32
+            temperature: Température (°C)
+            humidity: Humidité (%)
+            pm25: Particules fines PM2.5 (µg/m³)
+            respiratory_rate: Fréquence respiratoire (respirations/min)
+            timestamp: Date de réception (ISO 8601)
+        """
+        self.device_id = device_id
+        self.temperature = temperature
+        self.humidity = humidity
+        self.pm25 = pm25
+        self.respiratory_rate = respiratory_rate
+        self.timestamp = timestamp
+
+    def to_dict(self):
+        """Format JSON renvoyé à l'app Flutter"""
+        return {
+            'device_id': self.device_id,
+            'humidity': self.humidity,
+            'temperature': self.temperature,
+            'pm25': self.pm25,
+            'respiratoryRate': self.respiratory_rate,
+            'timestamp': self.timestamp
+        }
+
+
+class SensorHistory:
+    """
+    Tampon circulaire NumPy des dernières lectures d'un appareil
+
+    Les agrégats sur la fenêtre (moyenne, max, EWMA) sont maintenus à chaque
+    insertion: somme glissante pour la moyenne, file monotone pour le max
+    (O(1) amorti), récurrence pour l'EWMA. Les valeurs manquantes (None)
+    sont stockées en NaN et ignorées par les agrégats.
+    """
+
+    __slots__ = ('capacity', 'alpha', 'values', 'timestamps', 'count', '_next',
+                 '_sums', '_counts', '_max_queues', '_ewma', '_seq')
+
+    def __init__(self, capacity=HISTORY_SIZE, alpha=EWMA_ALPHA):
+        """
+        Args:
+            capacity: Nombre de lectures conservées
+            alpha: Coefficient de lissage de l'EWMA (0 < alpha <= 1)
+        """
+        n_channels = len(HISTORY_CHANNELS)
+        self.capacity = capacity
+        self.alpha = alpha
+        self.values = np.full((capacity, n_channels), np.nan, dtype=np.float64)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+        self._next = 0  # Prochaine position d'écriture
+        self._seq = 0  # Numéro de séquence de la prochaine lecture
+        self._sums = np.zeros(n_channels, dtype=np.float64)
+        self._counts = np.zeros(n_channels, dtype=np.int64)
+        self._max_queues = [deque() for _ in range(n_channels)]  # (séquence, valeur) décroissantes
+        self._ewma = np.full(n_channels, np.nan, dtype=np.float64)
+
+    def append(self, values, timestamp):
+        """
+        Ajoute une lecture et met à jour les agrégats en O(1)
+
+        Args:
+            values: Valeurs dans l'ordre de HISTORY_CHANNELS (None = manquante)
+            timestamp: Date de réception (secondes epoch)
+        """
+        new = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        pos = self._next
+
+        # Retirer la lecture écrasée de la somme glissante
+        if self.count == self.capacity:
+            old = self.values[pos]
+            present = ~np.isnan(old)
+            self._sums[present] -= old[present]
+            self._counts[present] -= 1
+
+        self.values[pos] = new
+        self.timestamps[pos] = timestamp
+        self._next = (pos + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+        present = ~np.isnan(new)
+        self._sums[present] += new[present]
+        self._counts[present] += 1
+        self._ewma = np.where(
+            present,
+            np.where(np.isnan(self._ewma), new, self.alpha * new + (1 - self.alpha) * self._ewma),
+            self._ewma
+        )
+
+        # File monotone décroissante par canal; on expire les éléments sortis de la fenêtre
+        oldest_seq = self._seq - self.capacity + 1
+        for channel, queue in enumerate(self._max_queues):
+            while queue and queue[0][0] < oldest_seq:
+                queue.popleft()
+            if present[channel]:
+                value = new[channel]
+                while queue and queue[-1][1] <= value:
+                    queue.pop()
+                queue.append((self._seq, value))
+        self._seq += 1
+
+    @property
+    def last_timestamp(self):
+        """Date de la lecture la plus récente du tampon (-inf s'il est vide)"""
+        if self.count == 0:
+            return -np.inf
+        return float(self.timestamps[(self._next - 1) % self.capacity])
+
+    def extend(self, values, timestamps):
+        """
+        Ajoute plusieurs lectures (ordre chronologique)
+
+        Args:
+            values: Matrice (N x n_canaux), NaN = valeur manquante
+            timestamps: Dates de réception (secondes epoch)
+        """
+        for row, timestamp in zip(values.tolist(), timestamps.tolist()):
+            self.append(row, timestamp)
+
+    def aggregates(self):
+        """
+        Agrégats sur la fenêtre courante
+
+        Returns:
+            Dictionnaire {'mean', 'max', 'ewma'} -> valeurs par canal (None si aucune donnée)
+        """
+        def to_channels(array):
+            return {
+                name: (None if np.isnan(value) else float(value))
+                for name, value in zip(HISTORY_CHANNELS, array)
+            }
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(self._counts > 0, self._sums / self._counts, np.nan)
+        maximum = np.array([queue[0][1] if queue else np.nan for queue in self._max_queues])
+
+        return {
+            'count': self.count,
+            'mean': to_channels(mean),
+            'max': to_channels(maximum),
+            'ewma': to_channels(self._ewma)
+        }
+
+    def recent(self, limit=None):
+        """
+        Dernières lectures sans copier le tampon
+
+        Args:
+            limit: Nombre maximal de lectures (défaut: toute la fenêtre)
+
+        Returns:
+            Liste de segments (timestamps, values) en ordre chronologique;
+            ce sont des vues sur le tampon (au plus 2 segments)
+        """
+        n = self.count if limit is None else max(0, min(limit, self.count))
+        if n == 0:
+            return []
+
+        start = (self._next - n) % self.capacity
+        if start + n <= self.capacity:
+            return [(self.timestamps[start:start + n], self.values[start:start + n])]
+        split = self.capacity - start
+        return [
+            (self.timestamps[start:], self.values[start:]),
+            (self.timestamps[:n - split], self.values[:n - split])
+        ]
+
+
+class SensorStore:
+    """Dernière lecture et historique capteurs de chaque appareil"""
+
+    def __init__(self, lock_stripes=LOCK_STRIPES, history_size=HISTORY_SIZE, ewma_alpha=EWMA_ALPHA):
+        """
+        Args:
+            lock_stripes: Nombre de verrous répartis entre les appareils
+            history_size: Nombre de lectures conservées par appareil
+            ewma_alpha: Coefficient de lissage de l'EWMA
+        """
+        self._readings = {}
+        self._histories = {}
+        self._locks = [threading.Lock() for _ in range(lock_stripes)]
+        self.history_size = history_size
+        self.ewma_alpha = ewma_alpha
+
+    def _lock_for(self, device_id):
+        """Verrou associé à un appareil"""
+        return self._locks[hash(device_id) % len(self._locks)]
+
+    def get(self, device_id=DEFAULT_DEVICE_ID):
+        """
+        Dernière lecture d'un appareil (sans verrou)
+
+        Returns:
+            SensorReading ou None si l'appareil n'a encore rien envoyé
+        """
+        return self._readings.get(device_id)
+
+    def put(self, reading, received_at=None):
+        """
+        Enregistre la dernière lecture d'un appareil et l'ajoute à son historique
+
+        Args:
+            reading: SensorReading
+            received_at: Date de réception en secondes epoch (défaut: maintenant)
+        """
+        received_at = time.time() if received_at is None else received_at
+        values = [getattr(reading, channel) for channel in HISTORY_CHANNELS]
+
+        with self._lock_for(reading.device_id):
+            history = self._histories.get(reading.device_id)
+            if history is None:
+                history = SensorHistory(self.history_size, self.ewma_alpha)
+                self._histories[reading.device_id] = history
+            history.append(values, received_at)
+            self._readings[reading.device_id] = reading
+
+    def put_many(self, device_ids, values, timestamps):
+        """
+        Applique un paquet de lectures à l'état des appareils en une passe
+
+        Les lectures sont regroupées par appareil: chaque appareil ne prend
+        son verrou qu'une fois. Les lectures plus anciennes que la fin de son
+        historique (ex: tampon d'une passerelle vidé après une lecture en
+        direct) sont ignorées: l'historique reste chronologique et la
+        dernière lecture n'est remplacée que par une lecture plus récente.
+
+        Args:
+            device_ids: Identifiant d'appareil de chaque lecture
+            values: Matrice (N x 4) dans l'ordre de HISTORY_CHANNELS (NaN = absent)
+            timestamps: Dates de réception (secondes epoch)
+
+        Returns:
+            (nombre d'appareils mis à jour, nombre de lectures ignorées car trop anciennes)
+        """
+        groups = {}
+        for i, device_id in enumerate(device_ids):
+            groups.setdefault(device_id, []).append(i)
+
+        n_updated, n_stale = 0, 0
+        for device_id, indices in groups.items():
+            order = np.asarray(indices)[np.argsort(timestamps[indices], kind='stable')]
+            rows, row_timestamps = values[order], timestamps[order]
+
+            with self._lock_for(device_id):
+                history = self._histories.get(device_id)
+                if history is None:
+                    history = SensorHistory(self.history_size, self.ewma_alpha)
+                    self._histories[device_id] = history
+
+                fresh = row_timestamps >= history.last_timestamp
+                n_stale += int(len(fresh) - fresh.sum())
+                if not fresh.any():
+                    continue
+                rows, row_timestamps = rows[fresh], row_timestamps[fresh]
+
+                last = [None if value != value else value for value in rows[-1].tolist()]  # NaN -> None
+                history.extend(rows, row_timestamps)
+                self._readings[device_id] = SensorReading(
+                    device_id,
+                    *last,
+                    timestamp=datetime.fromtimestamp(row_timestamps[-1]).isoformat()
+                )
+                n_updated += 1
+
+        return n_updated, n_stale
+
+    def aggregates(self, device_id=DEFAULT_DEVICE_ID):
+        """
+        Agrégats glissants d'un appareil (None si inconnu)
+        """
+        history = self._histories.get(device_id)
+        if history is None:
+            return None
+        with self._lock_for(device_id):
+            return history.aggregates()
+
+    def recent(self, device_id=DEFAULT_DEVICE_ID, limit=None):
+        """
+        Dernières lectures d'un appareil, sérialisées sous le verrou de l'appareil
+
+        Seules les lignes demandées sont lues (via des vues sur le tampon).
+
+        Returns:
+            Liste de dictionnaires {timestamp, temperature, humidity, pm25,
+            respiratory_rate} ou None si l'appareil est inconnu
+        """
+        history = self._histories.get(device_id)
+        if history is None:
+            return None
+
+        with self._lock_for(device_id):
+            rows = []
+            for timestamps, values in history.recent(limit):
+                for timestamp, row in zip(timestamps.tolist(), values.tolist()):
+                    entry = {'timestamp': timestamp}
+                    entry.update(
+                        (name, None if value != value else value)  # NaN -> None
+                        for name, value in zip(HISTORY_CHANNELS, row)
+                    )
+                    rows.append(entry)
+            return rows
+
+    def devices(self):
+        """Identifiants des appareils connus"""
+        return list(self._readings)
+
+    def __len__(self):
+        return len(self._readings)
@@ -0,0 +1,167 @@
+"""
+Chargement en flux d'un dataset CSV plus grand que la mémoire disponible
+
+Le CSV est lu par morceaux; chaque morceau est nettoyé (mêmes règles que
+AsthmaPredictor._clean_sensor_data) puis copié dans une matrice float32
+préallouée (le type utilisé par les arbres de scikit-learn: aucune
+conversion au fit). Seul un morceau à la fois existe au format pandas.
+
+Échantillonnage stratifié en flux: avec max_per_class, chaque classe garde
+un réservoir de taille fixe (algorithme R): chaque ligne d'une classe a la
+même probabilité d'être retenue, quel que soit l'ordre du fichier, et la
+matrice finale ne dépasse jamais n_classes x max_per_class lignes.
+"""
+import resource
+import numpy as np
+from dataset_cache import count_rows, TARGET_COLUMN, CHUNK_ROWS
+from sensor_cleaning import CleaningTable, SENSOR_CLEANING_RULES
+
+
+def peak_rss_mb():
+    """
+    Pic de mémoire résidente du processus en Mo
+
+    VmHWM (/proc, Linux) de préférence: contrairement à ru_maxrss, il n'hérite
+    pas du pic du processus parent après un exec.
+    """
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Ko sous Linux
+
+
+def reset_peak_rss():
+    """
+    Remet le pic de mémoire résidente (VmHWM) au niveau actuel
+
+    Permet de mesurer le pic d'une étape dans un processus réutilisé (ex:
+    worker d'un pool). Linux uniquement (/proc/self/clear_refs).
+
+    Returns:
+        Vrai si le pic a été remis à zéro: peak_rss_mb() ne mesure alors
+        que ce qui suit l'appel
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='ascii') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class _ClassReservoir:
+    """Réservoir de taille fixe des lignes d'une classe"""
+
+    __slots__ = ('X', 'size', 'seen')
+
+    def __init__(self, capacity, n_features):
+        self.X = np.empty((capacity, n_features), dtype=np.float32)
+        self.size = 0
+        self.seen = 0
+
+    def add(self, rows, rng):
+        """Ajoute les lignes d'un morceau (algorithme R vectorisé)"""
+        capacity = len(self.X)
+
+        # Remplissage initial
+        fill = min(capacity - self.size, len(rows))
+        self.X[self.size:self.size + fill] = rows[:fill]
+        self.size += fill
+
+        # Ensuite la ligne numéro t (0-based) remplace une case tirée dans [0, t]
+        # si ce tirage tombe dans le réservoir (probabilité capacity / (t + 1))
+        rest = rows[fill:]
+        if len(rest):
+            t = self.seen + fill + np.arange(len(rest))
+            slots = (rng.random(len(rest)) * (t + 1)).astype(np.int64)
+            kept = np.flatnonzero(slots < capacity)
+            # Dans l'ordre: une case remplacée deux fois garde la dernière ligne
+            for i in kept:
+                self.X[slots[i]] = rest[i]
+        self.seen += len(rows)
+
+
+def stream_training_matrix(csv_path, feature_names=None, target=TARGET_COLUMN,
+                           chunk_rows=CHUNK_ROWS, max_per_class=None, random_state=42):
+    """
+    Lit, nettoie et encode un CSV par morceaux dans une matrice float32
+
+    Args:
+        csv_path: CSV du dataset
+        feature_names: Colonnes de features (défaut: toutes sauf la cible)
+        target: Colonne cible
+        chunk_rows: Lignes lues par morceau
+        max_per_class: Taille de l'échantillon stratifié par classe
+                       (None: toutes les lignes)
+        random_state: Seed de l'échantillonnage
+
+    Returns:
+        (X, y, feature_names, stats): matrice float32 (lignes x features),
+        cible int8, noms des colonnes et statistiques (lignes lues/retenues,
+        octets de la matrice, pic de mémoire)
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(random_state)
+    X = y = None
+    reservoirs = {}
+    offset = rows_read = 0
+    cleaning = sensor_columns = None
+
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        if cleaning is None:
+            feature_names = list(feature_names or [c for c in chunk.columns if c != target])
+            sensor_columns = [rule[0] for rule in SENSOR_CLEANING_RULES if rule[0] in feature_names]
+            cleaning = CleaningTable(sensor_columns)
+            if max_per_class is None:
+                # Matrice finale préallouée: une seule copie du dataset en mémoire
+                n_rows = count_rows(csv_path)
+                X = np.empty((n_rows, len(feature_names)), dtype=np.float32)
+                y = np.empty(n_rows, dtype=np.int8)
+
+        # Nettoyage en float64 (identique à l'entraînement sur le CSV complet)
+        if sensor_columns:
+            values = np.array(chunk[sensor_columns], dtype=np.float64)
+            cleaning.apply(values)
+            chunk[sensor_columns] = values
+
+        labels = chunk[target].to_numpy()
+        rows_read += len(chunk)
+
+        if max_per_class is None:
+            end = offset + len(chunk)
+            X[offset:end] = chunk[feature_names].to_numpy(np.float32)
+            y[offset:end] = labels
+            offset = end
+        else:
+            values = chunk[feature_names].to_numpy(np.float32)
+            for label in np.unique(labels):
+                reservoir = reservoirs.get(label)
+                if reservoir is None:
+                    reservoir = reservoirs[label] = _ClassReservoir(max_per_class, len(feature_names))
+                reservoir.add(values[labels == label], rng)
+
+    if max_per_class is None:
+        if X is None:
+            X, y = np.empty((0, len(feature_names or [])), dtype=np.float32), np.empty(0, dtype=np.int8)
+        X, y = X[:offset], y[:offset]
+    else:
+        labels = sorted(reservoirs)
+        X = np.concatenate([reservoirs[label].X[:reservoirs[label].size] for label in labels])
+        y = np.concatenate([np.full(reservoirs[label].size, label, dtype=np.int8) for label in labels])
+        # Mélange: les classes ne restent pas regroupées
+        order = rng.permutation(len(y))
+        X, y = X[order], y[order]
+
+    stats = {
+        'rows_read': rows_read,
+        'rows_kept': len(y),
+        'class_counts': {int(c): int(n) for c, n in zip(*np.unique(y, return_counts=True))},
+        'matrix_mb': (X.nbytes + y.nbytes) / 2**20,
+        'peak_rss_mb': peak_rss_mb()
+    }
+    return X, y, feature_names, stats
@@ -0,0 +1,651 @@
+#!/usr/bin/env python3
+"""
+Tests hors-ligne du prédicteur (aucun backend requis)
+
+Exécution: python -m pytest test_model.py  ou  python test_model.py
+"""
+import os
+import numpy as np
+import pandas as pd
+from model import AsthmaPredictor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, 'models', 'asthma_model.pkl')
+DATA_PATH = os.path.join(BASE_DIR, 'data', 'asthma_detection_final.csv')
+
+_predictor = None
+
+
+def get_predictor():
+    """Charge le modèle une seule fois pour tous les tests"""
+    global _predictor
+    if _predictor is None:
+        _predictor = AsthmaPredictor(model_path=MODEL_PATH, high_risk_threshold=0.443)
+        _predictor.load_model()
+    return _predictor
+
+
+def load_samples(n=None):
+    """Retourne les features du dataset (n premières lignes si précisé)"""
+    X = pd.read_csv(DATA_PATH).drop('Asthma', axis=1)
+    return X if n is None else X.head(n)
+
+
+def test_compiled_forest_matches_sklearn():
+    """Les probabilités du moteur compilé sont identiques à celles de sklearn"""
+    predictor = get_predictor()
+    X = load_samples()
+    
+    expected = predictor.model.predict_proba(X)
+    actual = predictor.engine.predict_proba(X.to_numpy())
+    
+    assert np.allclose(actual, expected, rtol=0, atol=1e-12)
+
+
+def test_single_pass_matches_reference():
+    """Le chemin à un seul passage donne le même résultat que l'ancien double appel"""
+    predictor = get_predictor()
+    
+    for record in load_samples(100).to_dict('records'):
+        fast = predictor.predict(record)
+        reference = predictor._predict_reference(record)
+        
+        assert fast['risk_level'] == reference['risk_level']
+        assert fast['recommendations'] == reference['recommendations']
+        assert np.isclose(fast['risk_score'], reference['risk_score'], rtol=0, atol=1e-12)
+        for cls, prob in reference['probabilities'].items():
+            assert np.isclose(fast['probabilities'][cls], prob, rtol=0, atol=1e-12)
+
+
+def test_dict_fast_path_validation():
+    """Le chemin sans DataFrame signale les features manquantes et accepte un DataFrame"""
+    predictor = get_predictor()
+    record = load_samples(1).to_dict('records')[0]
+    
+    assert predictor.predict(record) == predictor.predict(pd.DataFrame([record]))
+    
+    incomplete = dict(record)
+    del incomplete['PM25']
+    try:
+        predictor.predict(incomplete)
+    except ValueError as e:
+        assert 'PM25' in str(e)
+    else:
+        raise AssertionError("Une feature manquante doit lever ValueError")
+
+
+def test_predict_batch_matches_predict():
+    """predict_batch donne les mêmes résultats que predict et isole les erreurs"""
+    predictor = get_predictor()
+    records = load_samples(50).to_dict('records')
+    records.insert(10, {'Tiredness': 1})
+    
+    results = predictor.predict_batch(records)
+    
+    assert len(results) == len(records)
+    assert 'error' in results[10]
+    for record, result in zip(records, results):
+        if 'error' not in result:
+            assert result == predictor.predict(record)
+
+
+def test_lookup_index_matches_forest():
+    """L'index précalculé concorde avec la forêt sur tout le dataset d'entraînement"""
+    predictor = AsthmaPredictor(model_path=MODEL_PATH, high_risk_threshold=0.443,
+                                inference_mode='lookup')
+    predictor.load_model()
+    predictor.predict_batch(load_samples(20).to_dict('records'))
+    served = predictor.lookup_index.stats()
+    
+    report = predictor.verify_lookup_index(load_samples())
+    
+    assert report['mismatches'] == 0, report
+    assert report['table_hits'] == report['rows'], report
+    assert predictor.lookup_index.stats() == served  # Index en service intact
+
+
+def test_prediction_cache():
+    """Le cache sert les requêtes répétées et est vidé au rechargement du modèle"""
+    from prediction_cache import PredictionCache
+    
+    cache = PredictionCache(max_size=2, ttl=None, quantization={'PM25': 1.0})
+    predictor = AsthmaPredictor(model_path=MODEL_PATH, high_risk_threshold=0.443, cache=cache)
+    predictor.load_model()
+    records = load_samples(3).to_dict('records')
+    
+    first = predictor.predict(records[0])
+    assert predictor.predict(records[0]) == first
+    assert cache.hits == 1 and cache.misses == 1
+    
+    # Valeur PM25 proche: même clé quantifiée
+    nearby = dict(records[0], PM25=round(records[0]['PM25']) + 0.2)
+    predictor.predict(nearby)
+    assert cache.hits == 2
+    
+    predictor.predict(records[1])
+    predictor.predict(records[2])
+    assert cache.evictions == 1
+    
+    predictor.load_model()
+    assert cache.stats()['size'] == 0
+
+
+def test_sensor_cleaning_shared_with_serving():
+    """Les mêmes règles de nettoyage s'appliquent à l'entraînement et aux prédictions"""
+    predictor = get_predictor()
+    record = load_samples(1).to_dict('records')[0]
+    
+    df = pd.DataFrame({
+        'Temperature': [20.0, 37.2, 45.0, np.nan],
+        'RespiratoryRate': [5.0, 18.0, 60.0, 20.0],
+        'Symptom': [1, 0, 1, 0]
+    })
+    cleaned = predictor._clean_sensor_data(df)
+    assert cleaned['Temperature'].tolist()[:3] == [36.5, 37.2, 37.0]
+    assert np.isnan(cleaned['Temperature'].iloc[3])
+    assert cleaned['RespiratoryRate'].tolist() == [16.0, 18.0, 25.0, 20.0]
+    assert cleaned['Symptom'].tolist() == [1, 0, 1, 0]
+    
+    # Une lecture hors plage est bornée avant le modèle, comme à l'entraînement
+    outlier = dict(record, Temperature=22.0, RespiratoryRate=55.0)
+    clamped = dict(record, Temperature=36.5, RespiratoryRate=25.0)
+    assert predictor.predict(outlier)['probabilities'] == predictor.predict(clamped)['probabilities']
+    assert predictor.predict_batch([outlier])[0]['probabilities'] == predictor.predict(clamped)['probabilities']
+
+
+def test_micro_batcher_matches_predict():
+    """Les requêtes concurrentes regroupées donnent les mêmes résultats que predict"""
+    import asyncio
+    from micro_batcher import MicroBatcher
+    
+    predictor = get_predictor()
+    records = load_samples(30).to_dict('records')
+    
+    async def run():
+        batcher = MicroBatcher(predictor.predict_batch, max_batch_size=16, max_wait=0.01)
+        await batcher.start()
+        try:
+            results = await asyncio.gather(*(batcher.predict(r) for r in records))
+            try:
+                await batcher.predict({'Tiredness': 1})
+            except ValueError as e:
+                assert 'Features manquantes' in str(e)
+            else:
+                raise AssertionError("Une entrée invalide doit lever ValueError")
+        finally:
+            await batcher.stop()
+        return results, batcher.stats()
+    
+    results, stats = asyncio.run(run())
+    
+    assert stats['requests'] == len(records) + 1
+    assert stats['largest_batch'] == 16
+    for record, result in zip(records, results):
+        assert result == predictor.predict(record)
+    
+    # Arrêt pendant qu'un batch attend un slot: sa requête échoue au lieu de rester bloquée
+    import threading
+    release = threading.Event()
+    
+    def slow_predict_batch(batch):
+        release.wait()
+        return predictor.predict_batch(batch)
+    
+    async def run_stop():
+        batcher = MicroBatcher(slow_predict_batch, max_batch_size=1, max_wait=0, max_concurrency=1)
+        await batcher.start()
+        first = asyncio.ensure_future(batcher.predict(records[0]))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.ensure_future(batcher.predict(records[1]))
+        await asyncio.sleep(0.05)
+        stopping = asyncio.ensure_future(batcher.stop())
+        await asyncio.sleep(0.05)
+        release.set()
+        await stopping
+        try:
+            await asyncio.wait_for(waiting, 1.0)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("La requête en attente doit échouer à l'arrêt")
+        return await first
+    
+    assert asyncio.run(run_stop()) == predictor.predict(records[0])
+
+
+def test_model_bundle_roundtrip():
+    """Le bundle memmap donne les mêmes prédictions que le pickle"""
+    import tempfile
+    
+    predictor = get_predictor()
+    records = load_samples(50).to_dict('records')
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_path = predictor.save_bundle(os.path.join(tmp, 'asthma_model.bundle'))
+        bundle = AsthmaPredictor(model_path=bundle_path, high_risk_threshold=0.443)
+        bundle.load_model()
+        
+        assert bundle.model is None
+        assert isinstance(bundle.engine.value, np.memmap)
+        assert bundle.feature_names == predictor.feature_names
+        assert bundle.risk_labels == predictor.risk_labels
+        for expected, actual in zip(predictor.predict_batch(records), bundle.predict_batch(records)):
+            assert actual.pop('model_version') != expected.pop('model_version')
+            assert actual == expected
+        assert bundle.get_feature_importance().equals(predictor.get_feature_importance())
+        
+        # Réécriture du bundle ouvert: l'ancien reste lisible, le nouveau est publié en entier
+        predictor.save_bundle(bundle_path)
+        assert bundle.predict_batch(records[:5])[0]['risk_level'] == predictor.predict(records[0])['risk_level']
+        assert sorted(os.listdir(tmp)) == ['asthma_model.bundle']
+        del bundle
+
+
+def test_model_hot_reload():
+    """Le rechargement à chaud valide le nouvel artefact et garde l'ancien en cas d'échec"""
+    import tempfile
+    from model_manager import ModelManager
+    
+    record = load_samples(1).to_dict('records')[0]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_path = get_predictor().save_bundle(os.path.join(tmp, 'asthma_model.bundle'))
+        broken_path = os.path.join(tmp, 'broken.pkl')
+        with open(broken_path, 'wb') as f:
+            f.write(b'not a pickle')
+        
+        manager = ModelManager(MODEL_PATH, lambda path: AsthmaPredictor(model_path=path, high_risk_threshold=0.5))
+        old = manager.current()
+        old_result = old.predict(record)
+        
+        new = manager.reload(bundle_path)
+        assert manager.current() is new and new is not old
+        assert new.high_risk_threshold == 0.443  # Seuil enregistré avec le modèle
+        assert old.predict(record) == old_result  # Une requête en cours garde l'ancien modèle
+        assert new.predict(record)['model_version'] == new.model_version != old.model_version
+        
+        try:
+            manager.reload(broken_path)
+        except Exception:
+            pass
+        else:
+            raise AssertionError("Un artefact invalide doit être refusé")
+        assert manager.current() is new
+        assert manager.status()['failures'] == 1 and manager.status()['reloads'] == 1
+        del new, manager
+
+
+def test_recall_at_fpr_matches_roc_curve():
+    """Le critère de sélection de la recherche = meilleur point de la courbe ROC sklearn"""
+    from sklearn.metrics import roc_curve
+    from hyperparameter_search import recall_at_fpr, expand_search_space
+    
+    rng = np.random.default_rng(0)
+    y_true = rng.random(2000) < 0.3
+    scores = np.round(np.clip(y_true * 0.3 + rng.random(2000) * 0.7, 0, 1), 2)  # Nombreuses égalités
+    
+    fpr, tpr, thresholds = roc_curve(y_true, scores)
+    for max_fpr in (0.0, 0.01, 0.05, 0.2):
+        recall, threshold = recall_at_fpr(y_true, scores, max_fpr)
+        assert np.isclose(recall, tpr[fpr <= max_fpr].max())
+        assert np.mean(scores[~y_true] >= threshold) <= max_fpr
+        assert np.isclose(np.mean(scores[y_true] >= threshold), recall)
+    
+    configs = expand_search_space({'max_depth': [8, 12], 'critical_weight': [1.0, 2.0]})
+    assert len(configs) == 4
+    assert all(c['n_estimators'] == 151 and 'critical_weight' not in c for c in configs)
+    assert {c['class_weight'][3] for c in configs} == {1.0, 2.0}
+
+
+def test_threshold_curve_matches_sklearn():
+    """Balayage vectorisé des seuils = roc_auc_score + matrice de confusion par seuil"""
+    from sklearn.metrics import roc_auc_score, confusion_matrix
+    from threshold_eval import ThresholdCurve, bootstrap
+    
+    rng = np.random.default_rng(1)
+    y_true = rng.random(1500) < 0.3
+    for scores in (rng.random(1500), np.round(y_true * 0.2 + rng.random(1500) * 0.8, 2)):
+        curve = ThresholdCurve(y_true, scores)
+        assert np.isclose(curve.auc(), roc_auc_score(y_true, scores))
+        
+        for threshold in (0.0, 0.2, 0.443, 0.65, 1.5):
+            tn, fp, fn, tp = confusion_matrix(y_true, scores >= threshold, labels=[False, True]).ravel()
+            point = curve.at(threshold)
+            assert (point['tp'], point['fp'], point['fn'], point['tn']) == (tp, fp, fn, tn)
+        
+        youden = curve.youden()
+        predicted = scores >= youden['threshold']
+        assert np.isclose(youden['sensitivity'] - (1 - youden['specificity']),
+                          predicted[y_true].mean() - predicted[~y_true].mean())
+        cost = curve.min_cost(cost_fn=10.0)
+        assert cost['cost'] == min(10 * (~(scores >= t) & y_true).sum() + ((scores >= t) & ~y_true).sum()
+                                   for t in np.append(scores, np.inf))
+        
+        intervals = bootstrap(y_true, scores, thresholds=(0.443,), n_resamples=200)
+        low, high = intervals['auc']
+        assert low <= curve.auc() <= high
+        low, high = intervals['sensitivity@0.443']
+        assert low <= curve.at(0.443)['sensitivity'] <= high
+
+
+def test_oob_evaluation():
+    """L'évaluation out-of-bag vient du seul entraînement et approche le test set"""
+    predictor = AsthmaPredictor(model_path=os.path.join(BASE_DIR, 'models', 'unused.pkl'))
+    X, y = predictor.load_data(DATA_PATH, use_cache=False)
+    
+    metrics = predictor.train(X, y, forest_params={'n_estimators': 31}, evaluation='oob', oob_repeats=2)
+    oob = metrics['oob']
+    assert metrics['cv_mean'] is None and oob['repeats'] == 2
+    assert abs(oob['accuracy'] - metrics['accuracy']) < 0.05
+    assert 0.9 < oob['roc_auc_critical'] <= 1.0 and 0.0 < oob['youden_threshold'] <= 1.0
+    assert set(oob['classification_report']) >= {'1', '2', '3'}
+    
+    try:
+        predictor.train(X, y, evaluation='bootstrap')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Un mode d'évaluation inconnu doit être refusé")
+
+
+def test_evaluation_bundle():
+    """Les probabilités de l'entraînement sont relues telles quelles, liées au modèle sauvegardé"""
+    import tempfile
+    from sklearn.model_selection import train_test_split
+    from evaluation_bundle import load_evaluation, critical_scores
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = AsthmaPredictor(model_path=os.path.join(tmp, 'model.pkl'))
+        X, y = predictor.load_data(DATA_PATH, use_cache=False)
+        predictor.train(X, y, forest_params={'n_estimators': 31}, evaluation='oob')
+        assert load_evaluation(predictor.model_path) is None
+        predictor.save_model()
+        
+        header, arrays = load_evaluation(predictor.model_path)
+        assert header['training_hash'] == predictor.training_hash and header['n_rows'] == len(y)
+        
+        # Même découpe que train_test_split sur les données
+        _, X_test, _, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+        assert np.array_equal(X.iloc[arrays['test_indices']].index, X_test.index)
+        assert np.array_equal(arrays['y_test'], y_test.to_numpy())
+        assert np.allclose(arrays['test_proba'], predictor.model.predict_proba(X_test))
+        assert np.allclose(critical_scores(header, arrays), predictor.model.predict_proba(X_test)[:, 2])
+        assert np.array_equal(arrays['oob_proba'], predictor.model.oob_decision_function_, equal_nan=True)
+        assert np.allclose(arrays['feature_importances'], predictor.model.feature_importances_)
+        
+        # Modèle modifié: l'évaluation enregistrée est périmée
+        df = pd.read_csv(DATA_PATH).sample(60, random_state=0)
+        predictor.update(df[predictor.feature_names], df['Asthma'], n_new_trees=5)
+        predictor.save_model()
+        assert load_evaluation(predictor.model_path) is None
+
+
+def test_report_generation():
+    """Rapport rendu sans affichage, figures inchangées non régénérées"""
+    import tempfile
+    from generate_report import generate_report, FIGURES
+    
+    rng = np.random.default_rng(0)
+    y_test = rng.integers(1, 4, 300)
+    proba = rng.dirichlet(np.ones(3), 300) + np.eye(3)[y_test - 1]
+    header = {'classes': [1, 2, 3], 'feature_names': ['Tiredness', 'Age_0-9', 'PM25', 'RespiratoryRate']}
+    arrays = {
+        'y_test': y_test,
+        'test_proba': proba / proba.sum(axis=1, keepdims=True),
+        'y_train': rng.integers(1, 4, 1200),
+        'feature_importances': np.array([0.3, 0.1, 0.4, 0.2])
+    }
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        report = generate_report(header, arrays, tmp, workers=2, dpi=20)
+        assert set(report['rendered']) == set(FIGURES)
+        assert all(os.path.getsize(os.path.join(tmp, name)) > 0 for name in FIGURES)
+        
+        report = generate_report(header, arrays, tmp, workers=2, dpi=20)
+        assert report['rendered'] == {} and set(report['up_to_date']) == set(FIGURES)
+        
+        # Seules les figures dépendant de l'importance des features changent
+        arrays['feature_importances'] = np.array([0.1, 0.3, 0.4, 0.2])
+        report = generate_report(header, arrays, tmp, workers=2, dpi=20)
+        assert set(report['rendered']) == {'2_feature_importance.png', '3_category_contribution.png'}
+
+
+def test_incremental_update():
+    """Les cas labellisés ajoutent des arbres sans réentraîner la forêt existante"""
+    import tempfile
+    from labeled_store import LabeledCaseStore
+    
+    df = pd.read_csv(DATA_PATH).sample(60, random_state=0)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = AsthmaPredictor(model_path=MODEL_PATH)
+        predictor.load_model()
+        old_trees = list(predictor.model.estimators_)
+        old_version = predictor.model_version
+        
+        store = LabeledCaseStore(os.path.join(tmp, 'labeled_cases.csv'), predictor.feature_names)
+        for record in df.to_dict('records'):
+            store.append(record, int(record['Asthma']))
+        assert store.count() == 60 and store.trained_rows() == 0
+        
+        X_new, y_new, end = store.read(store.trained_rows())
+        assert end == 60 and np.allclose(X_new.to_numpy(), df[predictor.feature_names].to_numpy())
+        
+        update = predictor.update(X_new, y_new, n_new_trees=10, max_trees=len(old_trees))
+        store.mark_trained(end)
+        assert update['trees_added'] == 10 and update['trees_retired'] == 10
+        assert predictor.model.estimators_[:-10] == old_trees[10:]  # Anciens arbres conservés tels quels
+        assert predictor.model_version != old_version
+        assert store.read(store.trained_rows())[2] == 60 and len(store.read(60)[0]) == 0
+        
+        # Une deuxième mise à jour (même taille de forêt) ne réutilise pas les seeds
+        first_seeds = [tree.random_state for tree in predictor.model.estimators_[-10:]]
+        predictor.update(X_new, y_new, n_new_trees=10, max_trees=len(old_trees))
+        assert not set(first_seeds) & {tree.random_state for tree in predictor.model.estimators_[-10:]}
+        
+        # Moteur compilé recompilé sur la nouvelle forêt
+        X = load_samples(200)
+        assert np.allclose(predictor.engine.predict_proba(X.to_numpy()), predictor.model.predict_proba(X))
+        
+        try:
+            predictor.update(X_new[y_new != 3], y_new[y_new != 3])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Des nouvelles données sans classe critique doivent être refusées")
+
+
+def test_dataset_cache():
+    """Le cache colonnaire redonne le CSV nettoyé et se reconstruit quand le CSV change"""
+    import shutil
+    import tempfile
+    from dataset_cache import DatasetCache
+    
+    predictor = AsthmaPredictor()
+    X_csv, y_csv = predictor.load_data(DATA_PATH, use_cache=False)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'dataset.csv')
+        shutil.copy(DATA_PATH, csv_path)
+        
+        X, y = predictor.load_data(csv_path)
+        assert X.columns.tolist() == X_csv.columns.tolist()
+        assert X['Tiredness'].dtype == np.int8 and X['PM25'].dtype == np.float32 and y.dtype == np.int8
+        assert np.array_equal(X.to_numpy(np.float32), X_csv.to_numpy(np.float32))
+        assert np.array_equal(y.to_numpy(), y_csv.to_numpy())
+        
+        cache = DatasetCache(csv_path).open()
+        assert isinstance(cache.column('PM25'), np.memmap)
+        chunks = list(cache.iter_chunks(chunk_rows=1000))
+        assert len(chunks) == 4 and np.array_equal(np.vstack([c[0] for c in chunks]), X.to_numpy(np.float32))
+        
+        # Une ligne ajoutée au CSV invalide le cache (empreinte de la source)
+        with open(csv_path, 'a') as f:
+            f.write('1,0,0,0,0,0,0,0,0,0,1,0,1,0,50.0,20.0,10.0,18.0,1\n')
+        assert not cache.is_valid()
+        X, y = predictor.load_data(csv_path)
+        assert len(X) == len(X_csv) + 1 and X['Temperature'].iloc[-1] == 36.5  # Nettoyée
+        
+        # Colonne entière élargie quand un morceau dépasse int8 puis int16
+        wide_path = os.path.join(tmp, 'wide.csv')
+        pd.DataFrame({'Age': [25, 40, 200, 70000, -3], 'Asthma': [1, 2, 3, 1, 2]}).to_csv(wide_path, index=False)
+        cache = DatasetCache(wide_path)
+        cache.build(chunk_rows=2)
+        cache.open()
+        assert cache.column('Age').dtype == np.int32 and cache.column('Asthma').dtype == np.int8
+        assert cache.column('Age').tolist() == [25, 40, 200, 70000, -3]
+
+
+def test_streaming_loader():
+    """Le chargement par morceaux = load_data, et l'échantillon stratifié couvre tout le fichier"""
+    predictor = AsthmaPredictor()
+    X_ref, y_ref = predictor.load_data(DATA_PATH, use_cache=False)
+    
+    X, y = predictor.load_data_streaming(DATA_PATH, chunk_rows=500)
+    assert X.to_numpy().dtype == np.float32 and y.dtype == np.int8
+    assert np.array_equal(X.to_numpy(), X_ref.to_numpy(np.float32))
+    assert np.array_equal(y.to_numpy(), y_ref.to_numpy())
+    
+    X_sample, y_sample = predictor.load_data_streaming(DATA_PATH, chunk_rows=500, max_per_class=100)
+    assert y_sample.value_counts().to_dict() == {1: 100, 2: 100, 3: 100}
+    
+    # Lignes retenues tirées dans tout le fichier, pas seulement dans les premiers morceaux
+    ref_rows = {row.tobytes(): i for i, row in enumerate(X_ref.to_numpy(np.float32))}
+    positions = [ref_rows[row.tobytes()] for row in X_sample.to_numpy()]
+    assert min(positions) < len(X_ref) * 0.2 and max(positions) > len(X_ref) * 0.8
+    
+    # Empreinte par blocs = empreinte de la matrice float64 complète
+    import hashlib
+    from model_bundle import hash_training_data
+    full = hashlib.sha256(np.asarray(X, dtype=np.float64).tobytes() + np.asarray(y, dtype=np.int64).tobytes())
+    assert hash_training_data(X, y, block_rows=333) == hash_training_data(X.to_numpy(), y) == full.hexdigest()
+
+
+def test_instrumentation():
+    """Latence par étape de predict, format Prometheus et journal échantillonné"""
+    import io
+    from instrumentation import metrics, ServiceMetrics, SampledLogger
+    
+    predictor = get_predictor()
+    record = load_samples(1).to_dict('records')[0]
+    before = {stage: metrics.stages[stage].count if stage in metrics.stages else 0
+              for stage in ('feature_encoding', 'forest_evaluation', 'recommendations')}
+    predictor.predict(record)
+    for stage, count in before.items():
+        assert metrics.stages[stage].count == count + 1
+    
+    service = ServiceMetrics()
+    service.observe_stage('json_parse', 0.0003)
+    service.observe_request('/api/predict', 'POST', 200, 0.002)
+    service.observe_request('/api/predict', 'POST', 503, 0.001)
+    text = service.render([('asthma_sensor_devices', 'Appareils', [({}, 2)])])
+    assert 'asthma_stage_latency_seconds_bucket{le="0.0005",stage="json_parse"} 1' in text
+    assert 'asthma_stage_latency_seconds_bucket{le="0.00025",stage="json_parse"} 0' in text
+    assert 'asthma_stage_latency_seconds_count{stage="json_parse"} 1' in text
+    assert 'asthma_requests_total{endpoint="/api/predict",method="POST",status="503"} 1' in text
+    assert 'asthma_request_errors_total{endpoint="/api/predict",status="503"} 1' in text
+    assert 'asthma_sensor_devices 2' in text
+    
+    # Échantillonnage à 0: seules les alertes (always=True) sont écrites
+    stream = io.StringIO()
+    log = SampledLogger(sample_rate=0.0, stream=stream)
+    for _ in range(100):
+        log.log('prediction_request', device_id='esp32')
+    log.log('critical_alert', always=True, probability=0.9)
+    log.flush()
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1 and '"critical_alert"' in lines[0]
+    
+    disabled = SampledLogger(sample_rate=1.0, enabled=False, stream=stream)
+    disabled.log('critical_alert', always=True)
+    assert disabled.logged == 0
+
+
+def test_request_profiler():
+    """Profils cProfile, échantillonné et tracemalloc d'une prédiction"""
+    import tempfile
+    import time
+    import tracemalloc
+    from request_profiler import RequestProfiler
+    
+    predictor = get_predictor()
+    record = load_samples(1).to_dict('records')[0]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = RequestProfiler(output_dir=tmp)
+        assert profiler.begin('/api/predict') is None  # Non armé: aucune session
+        
+        profiler.arm('cprofile', requests=1)
+        assert profiler.begin('/api/sensors') is None  # Chemin non surveillé
+        session = profiler.begin('/api/predict')
+        predictor.predict(record)
+        profile_id = profiler.end(session, path='/api/predict')
+        assert not profiler.armed and profiler.begin('/api/predict') is None
+        report = profiler.get(profile_id)
+        assert 'predict' in report['text'] and os.path.getsize(report['file']) > 0
+        
+        session = profiler.begin('/api/predict', mode='tracemalloc')
+        assert profiler.begin('/api/predict', mode='cprofile') is None  # Une session à la fois
+        predictor.predict(record)
+        report = profiler.get(profiler.end(session))
+        assert report['peak_bytes'] > 0 and not tracemalloc.is_tracing()
+        
+        session = profiler.begin('/api/predict', mode='sampling')
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            predictor.predict(record)
+        report = profiler.get(profiler.end(session))
+        assert report['samples'] > 0 and 'test_model.py:test_request_profiler' in report['text']
+        
+        assert profiler.status()['profiled'] == 3 and profiler.skipped == 1
+        assert len(os.listdir(tmp)) == 3
+        
+        # Écriture impossible: le rapport reste en mémoire, la requête n'échoue pas
+        blocked = os.path.join(tmp, 'fichier')
+        open(blocked, 'w').close()
+        profiler.output_dir = blocked
+        session = profiler.begin('/api/predict', mode='cprofile')
+        predictor.predict(record)
+        report = profiler.get(profiler.end(session))
+        assert report['file'] is None and report['write_error'] and 'predict' in report['text']
+
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("Moteur compilé = sklearn", test_compiled_forest_matches_sklearn),
+        ("Un passage = référence", test_single_pass_matches_reference),
+        ("Chemin sans DataFrame", test_dict_fast_path_validation),
+        ("Batch = prédictions unitaires", test_predict_batch_matches_predict),
+        ("Index précalculé = forêt", test_lookup_index_matches_forest),
+        ("Cache LRU des prédictions", test_prediction_cache),
+        ("Nettoyage capteurs partagé", test_sensor_cleaning_shared_with_serving),
+        ("Micro-batching = prédictions unitaires", test_micro_batcher_matches_predict),
+        ("Bundle memmap = pickle", test_model_bundle_roundtrip),
+        ("Rechargement à chaud du modèle", test_model_hot_reload),
+        ("Rappel à FPR fixé = courbe ROC", test_recall_at_fpr_matches_roc_curve),
+        ("Seuils vectorisés = sklearn", test_threshold_curve_matches_sklearn),
+        ("Évaluation out-of-bag", test_oob_evaluation),
+        ("Évaluation enregistrée avec le modèle", test_evaluation_bundle),
+        ("Rapport de visualisations", test_report_generation),
+        ("Entraînement incrémental", test_incremental_update),
+        ("Cache colonnaire du dataset", test_dataset_cache),
+        ("Chargement en flux", test_streaming_loader),
+        ("Métriques et journal des requêtes", test_instrumentation),
+        ("Profilage des prédictions", test_request_profiler),
+    ]
+    
+    failed = 0
+    for name, test in tests:
+        try:
+            test()
+            print(f"✅ PASS | {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ FAIL | {name} {e}")
+    
+    print(f"Résultat: {len(tests) - failed}/{len(tests)} tests réussis")
+
+
+if __name__ == '__main__':
+    main()
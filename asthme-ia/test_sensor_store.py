@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Tests hors-ligne du stockage capteurs par appareil
+
+Exécution: python -m pytest test_sensor_store.py  ou  python test_sensor_store.py
+"""
+import numpy as np
+import sensor_ingest
+from sensor_store import SensorHistory, SensorReading, SensorStore
+
+
+def test_history_aggregates_match_window():
+    """Moyenne et max glissants égaux à un recalcul complet de la fenêtre"""
+    history = SensorHistory(capacity=5, alpha=0.5)
+    data = np.random.default_rng(0).normal(20, 5, size=(23, 4))
+    
+    for i, values in enumerate(data):
+        history.append(values.tolist(), float(i))
+        window = data[max(0, i - 4):i + 1]
+        aggregates = history.aggregates()
+        assert np.allclose(list(aggregates['mean'].values()), window.mean(axis=0))
+        assert np.allclose(list(aggregates['max'].values()), window.max(axis=0))
+    
+    # Les 3 dernières lectures, en ordre chronologique, sur 2 segments du tampon
+    segments = history.recent(3)
+    timestamps = np.concatenate([ts for ts, _ in segments])
+    assert timestamps.tolist() == [20.0, 21.0, 22.0]
+
+
+def test_store_keeps_devices_separate():
+    """Chaque appareil a sa propre dernière lecture et son historique"""
+    store = SensorStore(history_size=3)
+    store.put(SensorReading('a', 36.5, 40.0, 10.0, 16.0, 't1'), received_at=1.0)
+    store.put(SensorReading('b', 37.0, 80.0, 60.0, None, 't2'), received_at=2.0)
+    store.put(SensorReading('a', 36.7, 44.0, 20.0, 18.0, 't3'), received_at=3.0)
+    
+    assert store.get('a').pm25 == 20.0
+    assert store.get('b').humidity == 80.0
+    assert store.get('inconnu') is None
+    assert store.aggregates('a')['mean']['pm25'] == 15.0
+    assert store.aggregates('b')['mean']['respiratory_rate'] is None
+    assert [row['timestamp'] for row in store.recent('a')] == [1.0, 3.0]
+
+
+def test_bulk_ignores_readings_older_than_history():
+    """Un paquet de lectures anciennes ne remplace pas une lecture plus récente"""
+    store = SensorStore(history_size=5)
+    store.put(SensorReading('a', 36.5, 40.0, 10.0, 16.0, 't10'), received_at=10.0)
+    
+    values = np.array([[36.0, 30.0, 5.0, 15.0], [36.1, 31.0, 6.0, 15.0], [36.9, 50.0, 30.0, 17.0]])
+    assert store.put_many(['a', 'a', 'a'], values, np.array([4.0, 5.0, 12.0])) == (1, 2)
+    assert store.get('a').pm25 == 30.0
+    assert [row['timestamp'] for row in store.recent('a')] == [10.0, 12.0]
+    
+    # Paquet entièrement ancien: ni l'historique ni la dernière lecture ne changent
+    assert store.put_many(['a'], values[:1], np.array([11.0])) == (0, 1)
+    assert store.get('a').pm25 == 30.0 and len(store.recent('a')) == 2
+
+
+
+def _raises_value_error(fn, *args):
+    """Vrai si fn(*args) lève ValueError"""
+    try:
+        fn(*args)
+    except ValueError:
+        return True
+    return False
+
+
+def test_binary_packet_roundtrip():
+    """Enregistrements '<dffff' décodés à l'identique, taille invalide rejetée"""
+    records = np.zeros(3, dtype=sensor_ingest.BINARY_RECORD)
+    records['timestamp'] = [1.5e9, 1.5e9 + 1, 1.5e9 + 2]
+    records['temperature'] = [36.5, 37.0, np.nan]
+    records['humidity'] = [40.0, 55.5, 60.0]
+    records['pm25'] = [10.0, 12.5, 80.0]
+    records['respiratory_rate'] = [16.0, np.nan, 18.0]
+    payload = records.tobytes()
+    assert sensor_ingest.BINARY_RECORD.itemsize == 24 and len(payload) == 72
+    
+    device_ids, values, timestamps = sensor_ingest.parse_binary(payload, 'esp')
+    assert device_ids == ['esp'] * 3
+    assert values.dtype == np.float64 and values.shape == (3, 4)
+    expected = np.column_stack([records[name] for name in ('temperature', 'humidity', 'pm25', 'respiratory_rate')])
+    assert np.array_equal(values, expected.astype(np.float64), equal_nan=True)
+    assert timestamps.tolist() == records['timestamp'].tolist()
+    
+    assert sensor_ingest.parse_binary(b'', 'esp')[1].shape == (0, 4)
+    assert _raises_value_error(sensor_ingest.parse_binary, payload[:-1], 'esp')
+    assert _raises_value_error(sensor_ingest.parse_binary, payload + b'\x00', 'esp')
+
+
+def test_json_formats():
+    """Lignes et colonnes JSON donnent la même matrice, entrées invalides rejetées"""
+    rows = [
+        {'temperature': 36.5, 'humidity': 40, 'pm25': 10, 'respiratoryRate': 16, 'timestamp': 1.0},
+        {'temperature': 37.0, 'humidity': 50, 'pm1': 12, 'device_id': 'b'},
+    ]
+    device_ids, values, timestamps = sensor_ingest.parse_json_rows(rows, 'a')
+    assert device_ids == ['a', 'b']
+    assert np.array_equal(values, [[36.5, 40, 10, 16], [37.0, 50, 12, np.nan]], equal_nan=True)
+    assert np.array_equal(timestamps, [1.0, np.nan], equal_nan=True)
+    
+    columns = {'temperature': [36.5, 37.0], 'humidity': [40, 50], 'pm25': [10, 12],
+               'respiratoryRate': [16, None], 'timestamp': [1.0, None], 'device_id': ['a', 'b']}
+    column_result = sensor_ingest.parse_json_columns(columns, 'a')
+    assert column_result[0] == device_ids
+    assert np.array_equal(column_result[1], values, equal_nan=True)
+    assert np.array_equal(column_result[2], timestamps, equal_nan=True)
+    
+    # Longueurs différentes (canal ou device_id) et valeurs non numériques
+    assert _raises_value_error(sensor_ingest.parse_json_columns, dict(columns, humidity=[40]), 'a')
+    assert _raises_value_error(sensor_ingest.parse_json_columns, dict(columns, device_id=['a']), 'a')
+    assert _raises_value_error(sensor_ingest.parse_json_columns, dict(columns, pm25=[10, 'beaucoup']), 'a')
+    assert _raises_value_error(sensor_ingest.parse_json_rows, [dict(rows[0], temperature='chaud')], 'a')
+    assert _raises_value_error(sensor_ingest.parse_json_rows, [1, 2], 'a')
+    assert _raises_value_error(sensor_ingest.parse_json_columns, {}, 'a')
+
+
+def test_clean_readings_estimates_respiratory_rate():
+    """Fréquence respiratoire absente estimée, valeurs bornées, lectures vides rejetées"""
+    values = np.array([
+        [36.5, 40.0, 10.0, 16.0],
+        [37.0, 80.0, 60.0, np.nan],  # Air très pollué et humide: fréquence plus élevée
+        [36.8, 50.0, 20.0, 0.0],
+        [np.inf, 150.0, -5.0, np.nan],  # Hors plage: bornée
+        [np.nan, np.nan, np.nan, 18.0],  # Aucun capteur environnemental
+    ])
+    timestamps = np.array([1.0, np.nan, 3.0, 4.0, 5.0])
+    
+    accepted = sensor_ingest.clean_readings(values, timestamps, received_at=100.0, rng=np.random.default_rng(0))
+    
+    assert accepted.tolist() == [True, True, True, True, False]
+    assert values[0, 3] == 16.0
+    assert not np.isnan(values[:, 3]).any()
+    assert 12.0 <= values[2, 3] <= 20.0
+    assert values[1, 3] > 17.0  # PM2.5 > 55 et humidité > 70
+    assert np.isnan(values[3, 0]) and values[3, 1] == 100.0 and values[3, 2] == 0.0
+    assert timestamps.tolist() == [1.0, 100.0, 3.0, 4.0, 5.0]
+    
+    # Même estimation que /api/sensors pour un générateur identique
+    expected = sensor_ingest.estimate_respiratory_rates([60.0, 20.0, 0.0], [80.0, 50.0, 100.0],
+                                                        np.random.default_rng(0))
+    assert values[1:4, 3].tolist() == expected.tolist()
+
+
+def main():
+    """Exécuter tous les tests"""
+    tests = [
+        ("Agrégats glissants", test_history_aggregates_match_window),
+        ("Appareils séparés", test_store_keeps_devices_separate),
+        ("Paquets anciens ignorés", test_bulk_ignores_readings_older_than_history),
+        ("Paquet binaire '<dffff'", test_binary_packet_roundtrip),
+        ("Formats JSON lignes et colonnes", test_json_formats),
+        ("Estimation de la fréquence respiratoire", test_clean_readings_estimates_respiratory_rate),
+    ]
+    
+    failed = 0
+    for name, test in tests:
+        try:
+            test()
+            print(f"✅ PASS | {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ FAIL | {name} {e}")
+    
+    print(f"Résultat: {len(tests) - failed}/{len(tests)} tests réussis")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""
+Évaluation vectorisée des seuils d'alerte critique (classe 3)
+
+Les scores (probabilité de la classe Élevé) sont triés une seule fois; une
+somme cumulée donne ensuite VP/FP/FN/VN pour tous les seuils possibles (un
+par valeur de score distincte) en un seul passage, au lieu d'une matrice de
+confusion par seuil.
+
+Le bootstrap réutilise ce tri: un rééchantillonnage est un tirage
+multinomial du nombre de patients par (score distinct, classe), et les
+sommes cumulées de milliers de rééchantillonnages sont calculées par blocs
+matriciels.
+"""
+import numpy as np
+
+# Taille maximale (rééchantillonnages x cellules) d'un bloc du bootstrap
+BOOTSTRAP_BLOCK_CELLS = 1_000_000
+
+
+def _trapezoid(y, x, axis=-1):
+    """Intégrale par trapèzes (np.trapezoid, np.trapz avant NumPy 2.0)"""
+    return (np.trapezoid if hasattr(np, 'trapezoid') else np.trapz)(y, x, axis=axis)
+
+
+class ThresholdCurve:
+    """VP/FP/FN/VN pour tous les seuils (score >= seuil => alerte)"""
+
+    def __init__(self, y_true, scores):
+        """
+        Args:
+            y_true: Vrai si le patient est de la classe critique
+            scores: Probabilité de la classe critique
+        """
+        y_true = np.asarray(y_true, dtype=bool)
+        scores = np.asarray(scores, dtype=np.float64)
+
+        self.order = np.argsort(-scores, kind='stable')
+        self.sorted_scores = scores[self.order]
+        self.sorted_true = y_true[self.order]
+
+        # Fin de chaque groupe de scores égaux: seuils atteignables
+        self.group_ends = np.flatnonzero(np.append(self.sorted_scores[1:] != self.sorted_scores[:-1], True))
+
+        self.n_pos = int(y_true.sum())
+        self.n_neg = len(y_true) - self.n_pos
+
+        # Premier point (seuil infini): aucune alerte
+        tp = np.cumsum(self.sorted_true)[self.group_ends]
+        fp = self.group_ends + 1 - tp
+        self.thresholds = np.concatenate(([np.inf], self.sorted_scores[self.group_ends]))
+        self.tp = np.concatenate(([0], tp))
+        self.fp = np.concatenate(([0], fp))
+        self.fn = self.n_pos - self.tp
+        self.tn = self.n_neg - self.fp
+        self.tpr = self.tp / max(self.n_pos, 1)
+        self.fpr = self.fp / max(self.n_neg, 1)
+
+    def __len__(self):
+        return len(self.thresholds)
+
+    def point(self, i):
+        """Métriques du seuil numéro i"""
+        return {
+            'threshold': float(self.thresholds[i]),
+            'sensitivity': float(self.tpr[i]),
+            'specificity': float(1 - self.fpr[i]),
+            'fpr': float(self.fpr[i]),
+            'tp': int(self.tp[i]),
+            'fp': int(self.fp[i]),
+            'fn': int(self.fn[i]),
+            'tn': int(self.tn[i])
+        }
+
+    def index_of(self, thresholds):
+        """
+        Position dans la courbe de seuils quelconques (ex: 0.443, 0.65)
+
+        Le seuil t déclenche les patients de score >= t: même point que le plus
+        petit score distinct >= t.
+        """
+        thresholds = np.atleast_1d(np.asarray(thresholds, dtype=np.float64))
+        # Nombre de scores distincts >= t (scores triés par ordre décroissant)
+        distinct = self.thresholds[1:]
+        return np.searchsorted(-distinct, -thresholds, side='right')
+
+    def at(self, threshold):
+        """Métriques d'un seuil quelconque (le seuil demandé est conservé)"""
+        return dict(self.point(int(self.index_of(threshold)[0])), threshold=float(threshold))
+
+    def auc(self):
+        """Aire sous la courbe ROC (trapèzes, égalités comprises)"""
+        return float(_trapezoid(self.tpr, self.fpr))
+
+    def youden(self):
+        """Seuil maximisant sensibilité + spécificité - 1"""
+        i = int(np.argmax(self.tpr - self.fpr))
+        return dict(self.point(i), youden=float(self.tpr[i] - self.fpr[i]))
+
+    def best_at_fpr(self, max_fpr):
+        """
+        Seuil de sensibilité maximale sous une contrainte de faux positifs
+
+        Returns:
+            Métriques du seuil, None si aucun seuil ne respecte la contrainte
+        """
+        allowed = np.flatnonzero(self.fpr <= max_fpr)
+        # En cas d'égalité: le seuil le plus haut
+        i = int(allowed[np.argmax(self.tpr[allowed])])
+        return self.point(i) if self.tpr[i] > 0 else None
+
+    def min_cost(self, cost_fn, cost_fp=1.0):
+        """
+        Seuil de coût total minimal
+
+        Args:
+            cost_fn: Coût d'un cas critique manqué (faux négatif)
+            cost_fp: Coût d'une fausse alerte (faux positif)
+        """
+        cost = cost_fn * self.fn + cost_fp * self.fp
+        i = int(np.argmin(cost))
+        return dict(self.point(i), cost=float(cost[i]))
+
+
+def bootstrap(y_true, scores, thresholds=(), n_resamples=2000, confidence=0.95, random_state=42):
+    """
+    Intervalles de confiance bootstrap (percentiles), vectorisés
+
+    Un rééchantillonnage avec remise des patients revient à tirer, pour
+    chaque cellule (score distinct, classe), le nombre de patients retenus:
+    loi multinomiale sur les cellules. Le coût ne dépend donc que du nombre
+    de scores distincts, pas du nombre de patients, et VP/FP de tous les
+    seuils sont des sommes cumulées sur un bloc de rééchantillonnages.
+
+    Args:
+        y_true: Vrai si le patient est de la classe critique
+        scores: Probabilité de la classe critique
+        thresholds: Seuils fixes dont on veut l'intervalle de sensibilité/spécificité
+        n_resamples: Nombre de rééchantillonnages
+        confidence: Niveau de confiance
+        random_state: Seed
+
+    Returns:
+        Dictionnaire {métrique: (borne basse, borne haute)}: 'auc',
+        'youden_threshold', et 'sensitivity@t' / 'specificity@t' par seuil
+    """
+    curve = ThresholdCurve(y_true, scores)
+    rng = np.random.default_rng(random_state)
+    fixed = curve.index_of(thresholds) if len(thresholds) else np.empty(0, dtype=np.intp)
+
+    # Patients par cellule (score distinct, classe), dans l'ordre des seuils
+    n_groups = len(curve) - 1
+    pos_counts = np.diff(curve.tp)
+    neg_counts = np.diff(curve.fp)
+    n = curve.n_pos + curve.n_neg
+    pvals = np.concatenate((pos_counts, neg_counts)) / n
+
+    # Tirage multinomial par cellule, ou par patient s'il y a peu d'ex aequo
+    by_patient = n < 4 * n_groups
+    width = n if by_patient else 2 * n_groups
+
+    auc, youden = [], []
+    sens, spec = [], []
+    block = max(1, BOOTSTRAP_BLOCK_CELLS // max(width, 1))
+    for start in range(0, n_resamples, block):
+        b = min(block, n_resamples - start)
+
+        if by_patient:
+            # Peu de patients par score distinct: tirage direct des patients
+            draws = rng.integers(0, n, size=(b, n)) + (np.arange(b) * n)[:, None]
+            weights = np.bincount(draws.ravel(), minlength=b * n).reshape(b, n)
+            tp = np.cumsum(weights * curve.sorted_true, axis=1)[:, curve.group_ends]
+            fp = np.cumsum(weights, axis=1)[:, curve.group_ends] - tp
+        else:
+            counts = rng.multinomial(n, pvals, size=b)
+            tp = np.cumsum(counts[:, :n_groups], axis=1)
+            fp = np.cumsum(counts[:, n_groups:], axis=1)
+        tpr = np.hstack([np.zeros((b, 1)), tp / np.maximum(tp[:, -1:], 1)])
+        fpr = np.hstack([np.zeros((b, 1)), fp / np.maximum(fp[:, -1:], 1)])
+
+        auc.append(_trapezoid(tpr, fpr, axis=1))
+        youden.append(curve.thresholds[np.argmax(tpr - fpr, axis=1)])
+        sens.append(tpr[:, fixed])
+        spec.append(1 - fpr[:, fixed])
+
+    alpha = (1 - confidence) / 2 * 100
+
+    def bounds(values):
+        low, high = np.percentile(values, [alpha, 100 - alpha])
+        return float(low), float(high)
+
+    intervals = {
+        'auc': bounds(np.concatenate(auc)),
+        'youden_threshold': bounds(np.concatenate(youden)),
+    }
+    sens, spec = np.vstack(sens), np.vstack(spec)
+    for j, threshold in enumerate(thresholds):
+        intervals[f'sensitivity@{threshold}'] = bounds(sens[:, j])
+        intervals[f'specificity@{threshold}'] = bounds(spec[:, j])
+    return intervals
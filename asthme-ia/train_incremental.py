@@ -0,0 +1,117 @@
+"""
+Entraînement incrémental sur les cas labellisés collectés en production
+
+Usage: python train_incremental.py [--trees 25] [--max-trees N] [--min-cases 30] [--compare]
+
+Lit les cas ajoutés à data/labeled_cases.csv depuis la dernière mise à jour
+(POST /api/labels), ajoute des arbres entraînés sur ces seuls cas au modèle
+actuel (warm_start), retire éventuellement les plus anciens, puis publie un
+nouvel artefact versionné (pickle + bundle): le service le recharge à chaud.
+
+--compare mesure aussi un réentraînement complet (dataset initial + tous les
+cas labellisés) pour comparer les durées.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+import pandas as pd
+from model import AsthmaPredictor
+from labeled_store import LabeledCaseStore
+from train_model import save_metrics
+
+DATA_PATH = 'data/asthma_detection_final.csv'
+STORE_PATH = 'data/labeled_cases.csv'
+
+
+def parse_args():
+    """Options de la mise à jour incrémentale"""
+    parser = argparse.ArgumentParser(description="Mise à jour incrémentale du modèle de prédiction d'asthme")
+    parser.add_argument('--model', default='models/asthma_model.pkl', help="Modèle pickle à mettre à jour")
+    parser.add_argument('--store', default=os.environ.get('ASTHMA_LABELED_CASES_PATH', STORE_PATH),
+                        help="Dataset des cas labellisés")
+    parser.add_argument('--trees', type=int, default=25, help="Arbres ajoutés")
+    parser.add_argument('--max-trees', type=int, default=None, help="Taille maximale de la forêt (retrait des plus anciens)")
+    parser.add_argument('--min-cases', type=int, default=30, help="Nombre minimal de nouveaux cas")
+    parser.add_argument('--compare', action='store_true', help="Mesurer aussi un réentraînement complet")
+    return parser.parse_args()
+
+
+def time_full_rebuild(store, n_estimators):
+    """Durée d'un réentraînement complet (dataset initial + tous les cas labellisés)"""
+    predictor = AsthmaPredictor(model_path=os.devnull)
+    with contextlib.redirect_stdout(io.StringIO()):
+        X, y = predictor.load_data(DATA_PATH)
+    X_cases, y_cases, _ = store.read()
+    X = pd.concat([X, X_cases[X.columns]], ignore_index=True)
+    y = pd.concat([y, y_cases], ignore_index=True)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        predictor.train(X, y, test_size=0.2, random_state=42,
+                        forest_params={'n_estimators': n_estimators}, evaluation='none')
+    return time.perf_counter() - start, len(X)
+
+
+def main():
+    args = parse_args()
+
+    print("="*60)
+    print("ENTRAÎNEMENT INCRÉMENTAL DU MODÈLE")
+    print("="*60)
+
+    predictor = AsthmaPredictor(model_path=args.model)
+    predictor.load_model()
+    if predictor.artifact_threshold is not None:
+        predictor.high_risk_threshold = predictor.artifact_threshold
+    previous_version = predictor.model_version
+
+    store = LabeledCaseStore(args.store, predictor.feature_names)
+    start = store.trained_rows()
+    X_new, y_new, end = store.read(start)
+    print(f"Cas labellisés: {end} au total, {len(X_new)} nouveaux depuis la dernière mise à jour")
+    if len(X_new) < args.min_cases:
+        print(f"⏸️  Moins de {args.min_cases} nouveaux cas: modèle inchangé")
+        return
+
+    try:
+        update = predictor.update(X_new, y_new, n_new_trees=args.trees, max_trees=args.max_trees)
+    except ValueError as e:
+        print(f"⏸️  Mise à jour impossible: {e}")
+        return
+
+    predictor.save_model()
+    predictor.save_bundle()
+    # Progression enregistrée après publication: en cas d'échec, les cas seront relus
+    store.mark_trained(end)
+
+    update.update({
+        'previous_version': previous_version,
+        'training_hash': predictor.training_hash,
+        'store_rows': [start, end],
+        'updated_at': time.time()
+    })
+
+    if args.compare:
+        full_time, n_rows = time_full_rebuild(store, update['n_estimators'])
+        update['full_rebuild_time'] = full_time
+        print(f"\n⏱️  Mise à jour incrémentale: {update['fit_time']:.2f} s | réentraînement complet "
+              f"({n_rows} lignes, {update['n_estimators']} arbres): {full_time:.2f} s "
+              f"(x{full_time / update['fit_time']:.1f})")
+
+    # Historique des mises à jour ajouté aux métriques du modèle
+    metrics_path = os.path.splitext(args.model)[0] + '.metrics.json'
+    metrics = {}
+    if os.path.exists(metrics_path):
+        with open(metrics_path, encoding='utf-8') as f:
+            metrics = json.load(f)
+    metrics.setdefault('incremental_updates', []).append(update)
+    save_metrics(metrics, metrics_path)
+
+    print(f"\n✅ Nouveau modèle publié (données {predictor.training_hash[:12]}, précédent {previous_version})")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,65 @@
 """
 Script d'entraînement du modèle Random Forest pour la prédiction d'asthme
+
+Usage: python train_model.py [--search-space espace.json] [--folds 5] [--workers N]
+                             [--max-fpr 0.02] [--no-search] [--oob-repeats R] [--cv-folds K]
+                             [--data dataset.csv] [--streaming] [--chunk-rows N] [--max-per-class N]
+
+Pipeline: recherche d'hyperparamètres en parallèle (hyperparameter_search.py)
+sur le train set, entraînement de la meilleure configuration, puis sauvegarde
+du modèle (pickle + bundle), de ses métriques (models/asthma_model.metrics.json)
+et de son évaluation (models/asthma_model.evaluation/: probabilités test et
+out-of-bag, relues par les scripts d'analyse).
+Le modèle retenu est évalué out-of-bag (un seul entraînement); la
+cross-validation k-fold complète reste disponible avec --cv-folds.
+
+Pour un dataset plus grand que la mémoire (ex: logs capteurs de production),
+--streaming lit le CSV par morceaux dans une matrice float32 préallouée
+(streaming_loader.py), avec échantillonnage stratifié optionnel
+(--max-per-class). Le pic de mémoire est affiché et enregistré.
 """
-from model import AsthmaPredictor
+from model import AsthmaPredictor, DEFAULT_FOREST_PARAMS
+from hyperparameter_search import run_search, recall_at_fpr, CRITICAL_CLASS, MAX_FPR
+from streaming_loader import peak_rss_mb
+import argparse
+import json
 import os
+import time
+
+DATA_PATH = 'data/asthma_detection_final.csv'
+METRICS_PATH = 'models/asthma_model.metrics.json'
+
+
+def parse_args():
+    """Options de la recherche d'hyperparamètres"""
+    parser = argparse.ArgumentParser(description="Entraînement du modèle de prédiction d'asthme")
+    parser.add_argument('--search-space', help="Fichier JSON {hyperparamètre: [valeurs]} (défaut: DEFAULT_SEARCH_SPACE)")
+    parser.add_argument('--folds', type=int, default=5, help="Nombre de folds de la recherche")
+    parser.add_argument('--workers', type=int, default=None, help="Processus de la recherche (défaut: nombre de coeurs)")
+    parser.add_argument('--max-fpr', type=float, default=MAX_FPR, help="FPR de référence du rappel de la classe critique")
+    parser.add_argument('--no-search', action='store_true', help="Entraîner DEFAULT_FOREST_PARAMS sans recherche")
+    parser.add_argument('--oob-repeats', type=int, default=1, help="Forêts OOB (seeds) pour la variance des métriques")
+    parser.add_argument('--cv-folds', type=int, default=0, help="Cross-validation k-fold au lieu de l'OOB (k réentraînements)")
+    parser.add_argument('--data', default=DATA_PATH, help="Dataset CSV")
+    parser.add_argument('--streaming', action='store_true', help="Lire le dataset par morceaux (plus grand que la mémoire)")
+    parser.add_argument('--chunk-rows', type=int, default=100_000, help="Lignes par morceau en mode --streaming")
+    parser.add_argument('--max-per-class', type=int, default=None,
+                        help="Échantillon stratifié par classe en mode --streaming")
+    return parser.parse_args()
+
+
+def save_metrics(metrics, path=METRICS_PATH):
+    """Écrit les métriques du modèle à côté de l'artefact (écriture atomique)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, indent=2, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+    print(f"Métriques sauvegardées dans: {path}")
+
 
 def main():
     """Fonction principale d'entraînement"""
+    args = parse_args()
     
     print("="*60)
     print("ENTRAÎNEMENT DU MODÈLE DE PRÉDICTION D'ASTHME")
@@ -21,18 +75,100 @@ def main():
     
     # Charger les données
     print("\nChargement des données...")
-    X, y = predictor.load_data('data/asthma_detection_final.csv')
-    print(f"Dataset chargé: {X.shape[0]} échantillons, {X.shape[1]} features")
+    if args.streaming:
+        X, y = predictor.load_data_streaming(args.data, chunk_rows=args.chunk_rows,
+                                             max_per_class=args.max_per_class)
+    else:
+        X, y = predictor.load_data(args.data)
+    load_peak_mb = peak_rss_mb()
+    print(f"Dataset chargé: {X.shape[0]} échantillons, {X.shape[1]} features (pic mémoire {load_peak_mb:.0f} Mo)")
     print(f"Distribution des classes:")
     print(y.value_counts().sort_index())
     
-    # Entraîner le modèle
+    # Recherche d'hyperparamètres sur le train set uniquement (le test set reste intact)
+    # Positions seulement: le train set n'est copié que pendant la recherche
+    train_idx, test_idx = predictor.split_indices(y, test_size=0.2, random_state=42)
+    y_test = y.iloc[test_idx]
+    search = None
+    forest_params = DEFAULT_FOREST_PARAMS
+    if not args.no_search:
+        print("\n" + "="*60)
+        print("RECHERCHE D'HYPERPARAMÈTRES")
+        print("="*60)
+        search_space = None
+        if args.search_space:
+            with open(args.search_space, encoding='utf-8') as f:
+                search_space = json.load(f)
+        
+        start = time.perf_counter()
+        best, summary, runs = run_search(
+            X.iloc[train_idx], y.iloc[train_idx], search_space, n_splits=args.folds, random_state=42,
+            n_jobs=args.workers, max_fpr=args.max_fpr
+        )
+        search = {
+            'n_folds': args.folds,
+            'max_fpr': args.max_fpr,
+            'wall_time': time.perf_counter() - start,
+            'best': best,
+            'configurations': summary,
+            'runs': runs
+        }
+        forest_params = best['params']
+        
+        print(f"\n{'Rappel@FPR':>12} {'Accuracy':>9} {'Temps (s)':>10} {'RSS (Mo)':>9}  Paramètres")
+        for s in summary:
+            rss = 'n/a' if s['peak_rss_mb'] is None else f"{s['peak_rss_mb']:.0f}"
+            print(f"{s['recall_at_fpr_mean']:>8.4f}±{s['recall_at_fpr_std']:.3f} {s['accuracy_mean']:>9.4f} "
+                  f"{s['fit_time_total']:>10.1f} {rss:>9}  "
+                  f"depth={s['params']['max_depth']} split={s['params']['min_samples_split']} "
+                  f"trees={s['params']['n_estimators']} w3={s['params']['class_weight'][CRITICAL_CLASS]}")
+    
+    # Entraîner le modèle retenu, évalué out-of-bag sans réentraînement
     print("\n" + "="*60)
-    metrics = predictor.train(X, y, test_size=0.2, random_state=42)
+    metrics = predictor.train(X, y, test_size=0.2, random_state=42, forest_params=forest_params,
+                              evaluation='cv' if args.cv_folds else 'oob',
+                              cv_folds=args.cv_folds, oob_repeats=args.oob_repeats)
+    
+    train_peak_mb = peak_rss_mb()
+    print(f"\n💾 Pic mémoire: {load_peak_mb:.0f} Mo après chargement, {train_peak_mb:.0f} Mo après entraînement")
+    
+    # Critère de sélection mesuré sur le test set
+    # Probabilités du test set déjà calculées par train (pas de nouveau passage)
+    critical_scores = predictor.evaluation['test_proba'][:, list(predictor.model.classes_).index(CRITICAL_CLASS)]
+    test_recall, test_threshold = recall_at_fpr(y_test == CRITICAL_CLASS, critical_scores, args.max_fpr)
+    print(f"\nRappel classe {CRITICAL_CLASS} à FPR <= {args.max_fpr:.0%} (test set): {test_recall:.4f} "
+          f"(seuil {test_threshold:.3f})")
     
-    # Sauvegarder le modèle
+    # Sauvegarder le modèle et ses métriques
     print("\n" + "="*60)
     predictor.save_model()
+    predictor.save_bundle()  # Artefact memmap chargé par les workers de production
+    save_metrics({
+        'model_version': predictor.model_version,
+        'training_hash': predictor.training_hash,
+        'forest_params': forest_params,
+        'high_risk_threshold': predictor.high_risk_threshold,
+        'test': {
+            'accuracy': metrics['accuracy'],
+            'recall_at_fpr': test_recall,
+            'threshold_at_fpr': test_threshold,
+            'max_fpr': args.max_fpr,
+            'classification_report': metrics['classification_report']
+        },
+        'data': {
+            'path': args.data,
+            'rows': len(y),
+            'streaming': args.streaming,
+            'max_per_class': args.max_per_class,
+            'peak_rss_mb_load': load_peak_mb,
+            'peak_rss_mb_train': train_peak_mb
+        },
+        'evaluation': metrics['evaluation'],
+        'oob': metrics['oob'],
+        'cv_mean': metrics['cv_mean'],
+        'cv_std': metrics['cv_std'],
+        'search': search
+    })
     
     # Afficher l'importance des features
     print("\n" + "="*60)